@@ -1,9 +1,16 @@
 # Register your models here.
 from django.contrib import admin
-from .models import Employee, Team, TeamEmployee, TeamLeader, WorkArrangement
+from .models import (
+    Employee, PayrollRun, PayrollRunChunk, PayrollRunEntry, PayrollSnapshot,
+    Team, TeamEmployee, TeamLeader, WorkArrangement
+)
 
 admin.site.register(Employee)
 admin.site.register(Team)
 admin.site.register(TeamEmployee)
 admin.site.register(TeamLeader)
 admin.site.register(WorkArrangement)
+admin.site.register(PayrollSnapshot)
+admin.site.register(PayrollRun)
+admin.site.register(PayrollRunChunk)
+admin.site.register(PayrollRunEntry)
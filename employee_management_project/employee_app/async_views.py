@@ -0,0 +1,141 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import (
+    APIException, AuthenticationFailed, NotAuthenticated, NotFound
+)
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import (
+    JWTStatelessUserAuthentication
+)
+
+from .caching import (
+    CACHE_CONTROL, aget_versions, etag_matches, response_cache_key,
+    response_cache_timeout, response_digest
+)
+from .renderers import FastJSONRenderer
+from .serializers import parse_field_list
+from .views import EmployeeViewSet, TeamViewSet, WorkArrangementViewSet
+
+authenticator = JWTStatelessUserAuthentication()
+renderer = FastJSONRenderer()
+
+
+def authenticate(request):
+    """Authenticate the request with an access token, as the DRF views
+    do. The token is checked from its signature alone, so there is no
+    query to run outside the event loop."""
+    authenticated = authenticator.authenticate(request)
+    if authenticated is None:
+        raise NotAuthenticated
+    request.user, request.auth = authenticated
+
+
+def error_response(request, error):
+    """Render an APIException the way DRF's exception handler does."""
+    response = HttpResponse(
+        renderer.render(error.detail if isinstance(error.detail, dict)
+                        else {'detail': error.detail}),
+        status=error.status_code, content_type=renderer.media_type,
+    )
+    if isinstance(error, (AuthenticationFailed, NotAuthenticated)):
+        response['WWW-Authenticate'] = (
+            authenticator.authenticate_header(request)
+        )
+    return response
+
+
+class AsyncReadEndpoint:
+    """Async list and retrieve of a viewset's resource.
+
+    Rows are read with the async ORM through the viewset's queryset,
+    filter backends and paginator, and serialized by its serializer in a
+    thread, where serializer fields may still run queries. Responses are
+    cached and tagged like the viewset's, so both return the same JSON,
+    ``?fields=``, ``?expand=``, filters and cursors included.
+    """
+    def __init__(self, viewset):
+        self.viewset = viewset
+        self.queryset = viewset.queryset
+        self.serializer_class = viewset.serializer_class
+        self.cache_models = viewset.cache_models
+        # Read by the filter backends and the paginator
+        self.filter_backends = viewset.filter_backends
+        self.filterset_class = getattr(viewset, 'filterset_class', None)
+        self.list = require_GET(self.view(self.list_data))
+        self.retrieve = require_GET(self.view(self.retrieve_data))
+
+    def view(self, get_data):
+        async def view(request, *args, **kwargs):
+            try:
+                authenticate(request)
+                return await self.cached_response(get_data, request,
+                                                  *args, **kwargs)
+            except APIException as error:
+                return error_response(request, error)
+        return view
+
+    async def cached_response(self, get_data, request, *args, **kwargs):
+        digest = response_digest(request.get_full_path(),
+                                 renderer.media_type,
+                                 await aget_versions(self.cache_models))
+        etag = f'"{digest}"'
+        if etag_matches(etag, request.headers.get('If-None-Match')):
+            response = HttpResponseNotModified()
+        else:
+            key = response_cache_key(digest)
+            data = await cache.aget(key)
+            if data is None:
+                data = await get_data(request, *args, **kwargs)
+                await cache.aset(key, data, response_cache_timeout())
+            response = HttpResponse(renderer.render(data),
+                                    content_type=renderer.media_type)
+        response['ETag'] = etag
+        response['Cache-Control'] = CACHE_CONTROL
+        return response
+
+    def get_serializer(self, request, *args, **kwargs):
+        return self.serializer_class(
+            *args, fields=parse_field_list(request.GET.get('fields')),
+            expand=parse_field_list(request.GET.get('expand')), **kwargs
+        )
+
+    def get_queryset(self, request):
+        return self.viewset.plan_queryset(self.queryset.all(),
+                                          self.get_serializer(request))
+
+    async def list_data(self, request):
+        # Filtered and paged like the viewset's list, the page is then
+        # read with the async ORM
+        request = Request(request)
+        queryset = self.get_queryset(request)
+        for backend in self.filter_backends:
+            queryset = backend().filter_queryset(request, queryset, self)
+        paginator = self.viewset.pagination_class()
+        page = await paginator.apaginate_queryset(queryset, request,
+                                                  view=self)
+        return paginator.get_paginated_response(
+            await self.serialize(request, page, many=True)
+        ).data
+
+    async def retrieve_data(self, request, pk):
+        model = self.queryset.model
+        try:
+            instance = await self.get_queryset(request).aget(pk=pk)
+        except model.DoesNotExist:
+            raise NotFound(f'No {model._meta.object_name} matches the '
+                           'given query.')
+        return await self.serialize(request, instance)
+
+    @sync_to_async
+    def serialize(self, request, *args, **kwargs):
+        # In a thread: serializer fields may still run queries, like the
+        # pay computed from the arrangements of employees without a
+        # payroll snapshot
+        return self.get_serializer(request, *args, **kwargs).data
+
+
+employees = AsyncReadEndpoint(EmployeeViewSet)
+teams = AsyncReadEndpoint(TeamViewSet)
+work_arrangements = AsyncReadEndpoint(WorkArrangementViewSet)
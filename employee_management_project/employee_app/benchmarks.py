@@ -0,0 +1,45 @@
+import json
+import statistics
+import time
+
+
+def percentile(samples, percent):
+    """Nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1,
+                      round(percent / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples):
+    """Timing statistics, in milliseconds, for samples in seconds."""
+    return {
+        'count': len(samples),
+        'mean_ms': statistics.fmean(samples) * 1000,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+        'max_ms': max(samples) * 1000,
+    }
+
+
+def time_calls(function, iterations, warmup=1):
+    """Call function repeatedly and summarize how long each call took."""
+    for _ in range(warmup):
+        function()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def write_report(stdout, report, output=None):
+    """Write a benchmark report as JSON to stdout or to the output file."""
+    content = json.dumps(report, indent=2, sort_keys=True, default=str)
+    if output is None:
+        stdout.write(content)
+        return
+    with open(output, 'w', encoding='utf-8') as report_file:
+        report_file.write(content + '\n')
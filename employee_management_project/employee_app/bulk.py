@@ -0,0 +1,204 @@
+from django.db import transaction
+from django.db.models import Sum
+from rest_framework import serializers
+
+from .models import Employee, Team, WorkArrangement
+
+EMPLOYEE_UPDATE_FIELDS = ['name', 'hourly_rate', 'is_team_leader']
+ARRANGEMENT_UPDATE_FIELDS = ['employee', 'team', 'percentage']
+
+
+class EmployeeBulkItemSerializer(serializers.ModelSerializer):
+    """Validates one employee of a bulk payload without touching
+    the database."""
+    class Meta:
+        model = Employee
+        fields = ['name', 'employee_id', 'hourly_rate', 'is_team_leader']
+        # Existing employee_ids are updated, not rejected
+        extra_kwargs = {'employee_id': {'validators': []}}
+
+
+class WorkArrangementBulkItemSerializer(serializers.ModelSerializer):
+    """Validates one work arrangement of a bulk payload without touching
+    the database. Items with an id update that arrangement."""
+    id = serializers.IntegerField(required=False)
+    # Plain ids, checked against the database once for the whole batch
+    employee = serializers.IntegerField()
+    team = serializers.IntegerField()
+
+    class Meta:
+        model = WorkArrangement
+        fields = ['id', 'employee', 'team', 'percentage']
+
+
+def _item_error(index, errors):
+    return {'index': index, 'errors': errors}
+
+
+def _non_field_error(index, message):
+    return _item_error(index, {'non_field_errors': [message]})
+
+
+def bulk_upsert_employees(items):
+    """Create or update employees by employee_id in one transaction.
+
+    Returns ``(employees, errors)``. Invalid items are reported in
+    ``errors`` by their index in ``items`` and the rest are still saved.
+    """
+    lookup_ids = [str(item['employee_id']) for item in items
+                  if isinstance(item, dict) and 'employee_id' in item]
+    existing = Employee.objects.in_bulk(lookup_ids, field_name='employee_id')
+
+    employees, errors, seen = [], [], set()
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append(_non_field_error(index, 'Expected an object.'))
+            continue
+        instance = existing.get(str(item.get('employee_id')))
+        # Existing employees only need the fields that change
+        serializer = EmployeeBulkItemSerializer(instance, data=item,
+                                                partial=instance is not None)
+        if not serializer.is_valid():
+            errors.append(_item_error(index, serializer.errors))
+            continue
+        employee_id = serializer.validated_data['employee_id']
+        if employee_id in seen:
+            errors.append(_item_error(index, {
+                'employee_id': ['Duplicate employee_id in this batch.']
+            }))
+            continue
+        seen.add(employee_id)
+        if instance is None:
+            instance = Employee()
+        for attr, value in serializer.validated_data.items():
+            setattr(instance, attr, value)
+        employees.append(instance)
+
+    with transaction.atomic():
+        # One INSERT ... ON CONFLICT (employee_id) DO UPDATE for the batch
+        Employee.objects.bulk_create(
+            employees,
+            update_conflicts=True,
+            unique_fields=['employee_id'],
+            update_fields=EMPLOYEE_UPDATE_FIELDS,
+        )
+    return employees, errors
+
+
+def bulk_save_work_arrangements(items):
+    """Create or update work arrangements in one transaction.
+
+    The 100% cap is checked per employee against the whole batch: items
+    are applied in order on top of the current totals, and an item that
+    would push its employee over 100% is reported in ``errors`` (by its
+    index in ``items``) while the rest are still saved.
+    Returns ``(arrangements, errors)``.
+    """
+    errors, valid = [], []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append(_non_field_error(index, 'Expected an object.'))
+            continue
+        serializer = WorkArrangementBulkItemSerializer(
+            data=item, partial='id' in item
+        )
+        if not serializer.is_valid():
+            errors.append(_item_error(index, serializer.errors))
+            continue
+        valid.append((index, serializer.validated_data))
+
+    with transaction.atomic():
+        arrangement_ids = [data['id'] for _, data in valid if 'id' in data]
+        batch_employee_ids = {data['employee'] for _, data in valid
+                              if 'employee' in data}
+        # Lock the employees (in pk order, so batches can't deadlock) for
+        # the rest of the transaction, like WorkArrangement.save does.
+        # The arrangements are read again once their employees are
+        # locked, as another transaction may have changed them in between
+        # (and employees they were moved to get locked as well)
+        locked, known_employees = set(), set()
+        while True:
+            existing = WorkArrangement.objects.in_bulk(arrangement_ids)
+            employee_ids = batch_employee_ids.union(
+                arrangement.employee_id for arrangement in existing.values()
+            )
+            if employee_ids <= locked:
+                break
+            known_employees.update(
+                Employee.objects.select_for_update()
+                .filter(pk__in=employee_ids - locked)
+                .order_by('pk').values_list('pk', flat=True)
+            )
+            locked |= employee_ids
+        team_ids = {data['team'] for _, data in valid if 'team' in data}
+        team_ids.update(arrangement.team_id
+                        for arrangement in existing.values())
+        known_teams = set(Team.objects.filter(
+            pk__in=team_ids
+        ).values_list('pk', flat=True))
+        # Current total percentage of every employee in the batch
+        totals = dict(WorkArrangement.objects.filter(
+            employee_id__in=known_employees
+        ).values('employee_id').annotate(
+            total=Sum('percentage')
+        ).values_list('employee_id', 'total'))
+
+        to_create, to_update, saved, seen = [], [], [], set()
+        for index, data in valid:
+            if 'id' in data:
+                arrangement = existing.get(data['id'])
+                if arrangement is None:
+                    errors.append(_item_error(index, {
+                        'id': ['Work arrangement does not exist.']
+                    }))
+                    continue
+                if arrangement.pk in seen:
+                    errors.append(_item_error(index, {
+                        'id': ['Duplicate id in this batch.']
+                    }))
+                    continue
+            else:
+                arrangement = WorkArrangement()
+            employee_id = data.get('employee', arrangement.employee_id)
+            team_id = data.get('team', arrangement.team_id)
+            percentage = data.get('percentage', arrangement.percentage)
+            if employee_id not in known_employees:
+                errors.append(_item_error(index, {
+                    'employee': [f'Invalid pk "{employee_id}" - '
+                                 'object does not exist.']
+                }))
+                continue
+            if team_id not in known_teams:
+                errors.append(_item_error(index, {
+                    'team': [f'Invalid pk "{team_id}" - '
+                             'object does not exist.']
+                }))
+                continue
+
+            # Free the arrangement's current share before adding the new one
+            if arrangement.pk is not None:
+                totals[arrangement.employee_id] -= arrangement.percentage
+            if totals.get(employee_id, 0) + percentage > 100:
+                if arrangement.pk is not None:
+                    totals[arrangement.employee_id] += arrangement.percentage
+                errors.append(_non_field_error(
+                    index, 'Total work percentage cannot exceed 100%.'
+                ))
+                continue
+            totals[employee_id] = totals.get(employee_id, 0) + percentage
+
+            arrangement.employee_id = employee_id
+            arrangement.team_id = team_id
+            arrangement.percentage = percentage
+            if arrangement.pk is None:
+                to_create.append(arrangement)
+            else:
+                seen.add(arrangement.pk)
+                to_update.append(arrangement)
+            saved.append(arrangement)
+
+        WorkArrangement.objects.bulk_create(to_create)
+        WorkArrangement.objects.bulk_update(to_update,
+                                            ARRANGEMENT_UPDATE_FIELDS)
+    errors.sort(key=lambda error: error['index'])
+    return saved, errors
@@ -0,0 +1,136 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from .db_routers import reads_from_primary, replica_used
+
+# Clients must revalidate every time, which costs a cache lookup
+CACHE_CONTROL = 'private, no-cache'
+
+
+def _version_key(model):
+    return f'employee_app:version:{model._meta.label_lower}'
+
+
+def _new_version():
+    # Versions lost from the cache restart from a value never used before,
+    # so responses cached under an old version can't be served again
+    return time.time_ns()
+
+
+def get_versions(models):
+    """Current version of each model, in the order given."""
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version())
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+async def aget_versions(models):
+    """Async get_versions(), for the async views."""
+    keys = [_version_key(model) for model in models]
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await cache.aadd(key, _new_version())
+            versions[key] = await cache.aget(key)
+    return [versions[key] for key in keys]
+
+
+def response_digest(path, media_type, versions):
+    """Key of a cached response, also used as its ETag."""
+    # Responses read from replicas may miss the latest writes, so clients
+    # pinned to the primary after writing don't share them
+    return hashlib.sha256('|'.join(map(str, [
+        path, media_type, *versions,
+        'primary' if reads_from_primary() else 'replica',
+    ])).encode()).hexdigest()
+
+
+def response_cache_timeout():
+    """Seconds the response just built may be cached. One read from a
+    replica is only kept as long as the replicas may lag behind."""
+    if replica_used():
+        return min(settings.API_CACHE_TIMEOUT,
+                   settings.DATABASE_REPLICA_MAX_LAG)
+    return settings.API_CACHE_TIMEOUT
+
+
+def response_cache_key(digest):
+    return f'employee_app:response:{digest}'
+
+
+def etag_matches(etag, if_none_match):
+    """Whether an If-None-Match header value matches etag."""
+    if not if_none_match:
+        return False
+    # Weak comparison, as RFC 9110 asks for If-None-Match
+    client_etags = [tag.removeprefix('W/')
+                    for tag in parse_etags(if_none_match)]
+    return etag in client_etags or '*' in client_etags
+
+
+def _increment(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version())
+
+
+def bump_version(model):
+    """Invalidate every cached response that depends on model.
+
+    The version is bumped right away and again when the transaction
+    commits, so a response cached from not yet committed data in
+    between is invalidated too.
+    """
+    key = _version_key(model)
+    _increment(key)
+    transaction.on_commit(lambda: _increment(key))
+
+
+class VersionedCacheMixin:
+    """Serve list and retrieve from a response cache with strong ETags.
+
+    Viewsets list the models their responses are built from in
+    ``cache_models``. The ETag is derived from the request and those
+    models' versions, so an unchanged poll with ``If-None-Match`` gets
+    ``304 Not Modified`` from one cache lookup, without database work.
+    """
+    cache_models = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request,
+                                    *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        digest = response_digest(request.get_full_path(),
+                                 request.accepted_media_type,
+                                 get_versions(self.cache_models))
+        etag = f'"{digest}"'
+        headers = {'ETag': etag, 'Cache-Control': CACHE_CONTROL}
+        if etag_matches(etag, request.headers.get('If-None-Match')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED,
+                            headers=headers)
+
+        key = response_cache_key(digest)
+        data = cache.get(key)
+        if data is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            data = response.data
+            cache.set(key, data, response_cache_timeout())
+        return Response(data, headers=headers)
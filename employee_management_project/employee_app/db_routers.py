@@ -0,0 +1,130 @@
+import contextlib
+import contextvars
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Set after a request writes, so the client's next requests read from
+# the primary until the replicas have caught up
+PIN_COOKIE = 'db_primary_pin'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class _Routing:
+    """Where the reads of a request or a read_from_replica() block go."""
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.wrote = False
+        self.replica_used = False
+
+
+_routing = contextvars.ContextVar('db_routing', default=None)
+
+
+@contextlib.contextmanager
+def read_from_replica():
+    """Send the reads in the block to a replica, until it writes."""
+    token = _routing.set(_Routing(use_replica=True))
+    try:
+        yield
+    finally:
+        _routing.reset(token)
+
+
+def reads_from_primary():
+    """Whether reads in the current context go to the primary."""
+    state = _routing.get()
+    return (state is None or not state.use_replica or state.wrote or
+            not settings.DATABASE_REPLICAS)
+
+
+def replica_used():
+    """Whether the current request read from a replica so far."""
+    state = _routing.get()
+    return state is not None and state.replica_used
+
+
+class ReplicaRouter:
+    """Send reads to a random replica in ``DATABASE_REPLICAS`` inside
+    safe requests and read_from_replica() blocks, everything else to
+    the primary.
+
+    Once something was written, reads go to the primary for the rest of
+    the request, as they do inside transactions. Migrations only run on
+    the primary, replicas get them through replication.
+    """
+    def db_for_read(self, model, **hints):
+        if (reads_from_primary() or
+                connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        _routing.get().replica_used = True
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    """Let ReplicaRouter send the reads of safe requests to a replica.
+
+    A request that writes sets a cookie for ``DATABASE_REPLICA_MAX_LAG``
+    seconds, and the client's requests carrying it read from the
+    primary, so they see their own writes. Django drops the middleware
+    at startup when no replica is configured.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.routing(request)
+        token = _routing.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.pin(state, response)
+
+    async def __acall__(self, request):
+        state = self.routing(request)
+        token = _routing.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.pin(state, response)
+
+    @staticmethod
+    def routing(request):
+        return _Routing(use_replica=request.method in SAFE_METHODS and
+                        PIN_COOKIE not in request.COOKIES)
+
+    @staticmethod
+    def pin(state, response):
+        if state.wrote:
+            response.set_cookie(PIN_COOKIE, '1',
+                                max_age=settings.DATABASE_REPLICA_MAX_LAG,
+                                httponly=True, samesite='Lax')
+        return response
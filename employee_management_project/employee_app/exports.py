@@ -0,0 +1,87 @@
+import csv
+
+from django.db.models import Prefetch
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Employee, TeamEmployee, WorkArrangement
+from .serializers import EmployeeSerializer
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+CSV_COLUMNS = [
+    'id', 'employee_id', 'name', 'hourly_rate', 'is_team_leader',
+    'teams', 'work_arrangements', 'weekly_hours', 'monthly_pay',
+]
+
+
+def export_queryset(using=None):
+    """Employees with the relations the export reads, in id order, read
+    from the database alias using (default: the router's choice)."""
+    return Employee.objects.using(using).select_related(
+        'payroll_snapshot'
+    ).prefetch_related(
+        Prefetch('work_arrangements',
+                 queryset=WorkArrangement.objects.using(using)),
+        Prefetch('team_membership',
+                 queryset=TeamEmployee.objects.using(using)
+                 .select_related('team')),
+    ).order_by('id')
+
+
+def iter_employee_rows(chunk_size=EXPORT_CHUNK_SIZE, using=None):
+    """Yield EmployeeSerializer representations one employee at a time.
+
+    ``iterator()`` reads from a server-side cursor on PostgreSQL and runs
+    the prefetch queries per chunk, so only one chunk is held in memory.
+    """
+    serializer = EmployeeSerializer()
+    for employee in export_queryset(using).iterator(chunk_size=chunk_size):
+        yield serializer.to_representation(employee)
+
+
+def iter_ndjson(rows):
+    """Encode each row as one line of JSON."""
+    encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+class _Echo:
+    """File-like object handing back what csv.writer writes to it."""
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    """Flatten each row into a CSV line, teams and arrangements
+    joined with ';'."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for row in rows:
+        arrangements = row['work_arrangements']
+        yield writer.writerow([
+            row['id'],
+            row['employee_id'],
+            row['name'],
+            row['hourly_rate'],
+            row['is_team_leader'],
+            ';'.join(team['name'] for team in row['teams']),
+            ';'.join(f"{arrangement['team']}:{arrangement['percentage']}"
+                     for arrangement in arrangements),
+            sum(arrangement['weekly_hours'] for arrangement in arrangements),
+            row['monthly_pay'],
+        ])
+
+
+def iter_export(export_format, chunk_size=EXPORT_CHUNK_SIZE, using=None):
+    """Stream every employee encoded in export_format."""
+    rows = iter_employee_rows(chunk_size, using)
+    if export_format == 'csv':
+        return iter_csv(rows)
+    return iter_ndjson(rows)
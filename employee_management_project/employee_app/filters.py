@@ -0,0 +1,59 @@
+import django_filters
+from django.db import connections
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.functions import Upper
+
+from .models import Employee, TeamEmployee, WorkArrangement
+
+
+class EmployeeFilter(django_filters.FilterSet):
+    """Query parameters filtering the employee list.
+
+    Every filter is served by an index: team membership and arrangement
+    lookups by their team indexes, ``employee_id_prefix`` by the
+    employee_id index and ``search`` by a trigram index on PostgreSQL.
+    """
+    team = django_filters.NumberFilter(method='filter_team',
+                                       label='Member of the team')
+    arrangement_team = django_filters.NumberFilter(
+        method='filter_arrangement_team',
+        label='Has a work arrangement in the team',
+    )
+    is_team_leader = django_filters.BooleanFilter()
+    hourly_rate_min = django_filters.NumberFilter(field_name='hourly_rate',
+                                                  lookup_expr='gte')
+    hourly_rate_max = django_filters.NumberFilter(field_name='hourly_rate',
+                                                  lookup_expr='lte')
+    employee_id_prefix = django_filters.CharFilter(field_name='employee_id',
+                                                   lookup_expr='startswith')
+    search = django_filters.CharFilter(
+        method='filter_search',
+        label='Name containing the text, or similar to it on PostgreSQL',
+    )
+
+    class Meta:
+        model = Employee
+        fields = []
+
+    def filter_team(self, queryset, name, value):
+        return queryset.filter(Exists(TeamEmployee.objects.filter(
+            employee=OuterRef('pk'), team=value
+        )))
+
+    def filter_arrangement_team(self, queryset, name, value):
+        return queryset.filter(Exists(WorkArrangement.objects.filter(
+            employee=OuterRef('pk'), team=value
+        )))
+
+    def filter_search(self, queryset, name, value):
+        value = value.strip()
+        if not value:
+            return queryset
+        condition = Q(name__icontains=value)
+        if connections[queryset.db].vendor == 'postgresql':
+            from django.contrib.postgres.lookups import TrigramSimilar
+
+            # Both match the trigram index on UPPER(name): icontains
+            # compares upper cased, so the fuzzy match does too
+            condition |= Q(TrigramSimilar(Upper('name'), value.upper()))
+        return queryset.filter(condition)
@@ -0,0 +1,367 @@
+"""Set-based import of the HR system's CSV feed.
+
+Every file is loaded into a temporary staging table (with ``COPY`` on
+PostgreSQL), validated with one UPDATE per rule that records why rows
+are rejected, and merged into the employee_app tables with INSERT ...
+SELECT statements. Nothing is read into Python row by row.
+
+Files and columns, in any order:
+
+- teams: ``name``. Teams that don't exist yet are created.
+- employees: ``employee_id, name, hourly_rate, is_team_leader``.
+  Created or updated by ``employee_id``. Team leader rows follow
+  ``is_team_leader``.
+- memberships: ``employee_id, team``. These replace the team memberships
+  of every employee listed.
+- arrangements: ``employee_id, team, percentage``. These replace the
+  work arrangements of every employee listed.
+
+Teams are referred to by name, employees by ``employee_id``.
+"""
+import csv
+
+from django.db import connection, transaction
+
+from .models import Employee, Team, TeamEmployee, TeamLeader, WorkArrangement
+from .signals import send_rows_changed
+
+FEED_COLUMNS = {
+    'teams': ['name'],
+    'employees': ['employee_id', 'name', 'hourly_rate', 'is_team_leader'],
+    'memberships': ['employee_id', 'team'],
+    'arrangements': ['employee_id', 'team', 'percentage'],
+}
+
+TRUE_VALUES = ('true', 't', 'yes', 'y', '1')
+FALSE_VALUES = ('false', 'f', 'no', 'n', '0')
+
+
+class FeedError(Exception):
+    """A feed file can't be imported at all, e.g. wrong columns."""
+
+
+def _q(name):
+    return connection.ops.quote_name(name)
+
+
+def _table(model):
+    return _q(model._meta.db_table)
+
+
+def _column(model, field):
+    return _q(model._meta.get_field(field).column)
+
+
+def _staging(name):
+    return _q(f'hr_feed_{name}')
+
+
+def _regex(column, pattern):
+    return f"{column} {connection.operators['regex'] % repr(pattern)}"
+
+
+def _in(values):
+    return '(' + ', '.join(f"'{value}'" for value in values) + ')'
+
+
+def _read_header(feed_file, name):
+    """Read the header line, returning the columns in file order."""
+    header = next(csv.reader([feed_file.readline()]), [])
+    if sorted(header) != sorted(FEED_COLUMNS[name]):
+        raise FeedError(
+            f'The {name} file needs the columns '
+            f'{", ".join(FEED_COLUMNS[name])}, got {", ".join(header)}.'
+        )
+    return header
+
+
+def _create_staging_table(cursor, name):
+    row_number = ('bigserial' if connection.vendor == 'postgresql'
+                  else 'integer PRIMARY KEY')
+    columns = ', '.join(f'{_q(column)} text'
+                        for column in FEED_COLUMNS[name])
+    cursor.execute(
+        f'CREATE TEMPORARY TABLE {_staging(name)} '
+        f'(row_number {row_number}, {columns}, rejected text)'
+    )
+
+
+def _load(cursor, name, feed_file):
+    """Load the rows of feed_file into the staging table of name."""
+    header = _read_header(feed_file, name)
+    columns = ', '.join(_q(column) for column in header)
+    if connection.vendor == 'postgresql':
+        # Rows are numbered in file order as COPY inserts them
+        sql = (f'COPY {_staging(name)} ({columns}) FROM STDIN '
+               'WITH (FORMAT csv)')
+        raw_cursor = cursor.cursor
+        if hasattr(raw_cursor, 'copy_expert'):
+            raw_cursor.copy_expert(sql, feed_file)
+        else:
+            # psycopg 3
+            with raw_cursor.copy(sql) as copy:
+                while data := feed_file.read(64 * 1024):
+                    copy.write(data)
+    else:
+        placeholders = ', '.join(['%s'] * len(header))
+        cursor.executemany(
+            f'INSERT INTO {_staging(name)} ({columns}) '
+            f'VALUES ({placeholders})',
+            # COPY reads empty unquoted fields as NULL, so do the same
+            ([value or None for value in row]
+             for row in csv.reader(feed_file) if row),
+        )
+
+
+def _reject(cursor, name, reason, condition):
+    """Reject the rows of name's staging table matching condition."""
+    cursor.execute(
+        f'UPDATE {_staging(name)} SET rejected = %s '
+        f'WHERE rejected IS NULL AND ({condition})',
+        [reason],
+    )
+
+
+def _duplicates(name, columns):
+    """Condition matching every row whose columns appear more than once."""
+    key = ' || \'|\' || '.join(f'COALESCE({column}, \'\')'
+                               for column in columns)
+    return (f'{key} IN (SELECT {key} FROM {_staging(name)} '
+            f'GROUP BY {", ".join(columns)} HAVING COUNT(*) > 1)')
+
+
+def _employee_known(alias):
+    return (
+        f'EXISTS (SELECT 1 FROM {_table(Employee)} e '
+        f'WHERE e.{_column(Employee, "employee_id")} = {alias}.employee_id)'
+        f' OR EXISTS (SELECT 1 FROM {_staging("employees")} s '
+        f'WHERE s.employee_id = {alias}.employee_id AND s.rejected IS NULL)'
+    )
+
+
+def _team_known(alias):
+    return (
+        f'EXISTS (SELECT 1 FROM {_table(Team)} t '
+        f'WHERE t.{_column(Team, "name")} = {alias}.team)'
+        f' OR EXISTS (SELECT 1 FROM {_staging("teams")} s '
+        f'WHERE s.name = {alias}.team AND s.rejected IS NULL)'
+    )
+
+
+def _validate(cursor):
+    """Mark invalid staging rows with the reason they are rejected."""
+    _reject(cursor, 'teams', 'name is required and at most 100 characters',
+            'name IS NULL OR length(name) > 100')
+    _reject(cursor, 'teams', 'Duplicate team name in this file',
+            _duplicates('teams', ['name']))
+
+    _reject(cursor, 'employees',
+            'employee_id is required and at most 10 characters',
+            'employee_id IS NULL OR length(employee_id) > 10')
+    _reject(cursor, 'employees',
+            'name is required and at most 100 characters',
+            'name IS NULL OR length(name) > 100')
+    _reject(cursor, 'employees',
+            'hourly_rate must be a number with at most 4 digits and '
+            '2 decimal places',
+            f'hourly_rate IS NULL OR NOT '
+            f'{_regex("hourly_rate", "^[0-9]{1,4}([.][0-9]{1,2})?$")}')
+    _reject(cursor, 'employees', 'is_team_leader must be true or false',
+            f'is_team_leader IS NOT NULL AND lower(is_team_leader) '
+            f'NOT IN {_in(TRUE_VALUES + FALSE_VALUES)}')
+    _reject(cursor, 'employees', 'Duplicate employee_id in this file',
+            _duplicates('employees', ['employee_id']))
+
+    for name in ('memberships', 'arrangements'):
+        _reject(cursor, name, 'Unknown employee_id',
+                f'NOT ({_employee_known(_staging(name))})')
+        _reject(cursor, name, 'Unknown team',
+                f'NOT ({_team_known(_staging(name))})')
+    _reject(cursor, 'memberships', 'Duplicate membership in this file',
+            _duplicates('memberships', ['employee_id', 'team']))
+    _reject(cursor, 'arrangements',
+            'percentage must be a whole number from 1 to 100',
+            f'percentage IS NULL OR NOT '
+            f'{_regex("percentage", "^(100|[1-9][0-9]?)$")}')
+    staging = _staging('arrangements')
+    _reject(cursor, 'arrangements',
+            'Total work percentage of the employee exceeds 100%',
+            f'employee_id IN (SELECT employee_id FROM {staging} '
+            f'WHERE rejected IS NULL GROUP BY employee_id '
+            f'HAVING SUM(CAST(percentage AS integer)) > 100)')
+
+    # Rows of these files replace all of an employee's rows, so an
+    # employee is only imported if none of their rows were rejected
+    for name in ('memberships', 'arrangements'):
+        _reject(cursor, name,
+                'Another row of this employee was rejected',
+                f'employee_id IN (SELECT employee_id FROM {_staging(name)} '
+                f'WHERE rejected IS NOT NULL)')
+
+
+def _merge(cursor):
+    """Merge the valid staging rows, returning row counts written."""
+    written = {}
+    employee = _table(Employee)
+    employee_pk = _column(Employee, 'id')
+    employee_id = _column(Employee, 'employee_id')
+    team = _table(Team)
+    team_pk = _column(Team, 'id')
+    team_name = _column(Team, 'name')
+
+    def execute(key, sql):
+        cursor.execute(sql)
+        written[key] = cursor.rowcount
+
+    def team_of(alias):
+        # Names are not unique in the table, the oldest team wins
+        return (f'(SELECT MIN(t.{team_pk}) FROM {team} t '
+                f'WHERE t.{team_name} = {alias}.team)')
+
+    def employee_of(alias):
+        return (f'(SELECT e.{employee_pk} FROM {employee} e '
+                f'WHERE e.{employee_id} = {alias}.employee_id)')
+
+    execute('teams_created', (
+        f'INSERT INTO {team} ({team_name}) '
+        f'SELECT s.name FROM {_staging("teams")} s '
+        f'WHERE s.rejected IS NULL AND NOT EXISTS '
+        f'(SELECT 1 FROM {team} t WHERE t.{team_name} = s.name)'
+    ))
+
+    name, rate, leader = (_column(Employee, field) for field in
+                          ('name', 'hourly_rate', 'is_team_leader'))
+    execute('employees_written', (
+        f'INSERT INTO {employee} ({employee_id}, {name}, {rate}, {leader}) '
+        f'SELECT s.employee_id, s.name, CAST(s.hourly_rate AS numeric), '
+        f'lower(COALESCE(s.is_team_leader, \'false\')) '
+        f'IN {_in(TRUE_VALUES)} '
+        f'FROM {_staging("employees")} s WHERE s.rejected IS NULL '
+        f'ON CONFLICT ({employee_id}) DO UPDATE SET '
+        f'{name} = EXCLUDED.{name}, {rate} = EXCLUDED.{rate}, '
+        f'{leader} = EXCLUDED.{leader}'
+    ))
+
+    leaders = _table(TeamLeader)
+    leader_employee = _column(TeamLeader, 'employee')
+    feed_employees = (f'SELECT e.{employee_pk} FROM {employee} e '
+                      f'JOIN {_staging("employees")} s '
+                      f'ON s.employee_id = e.{employee_id} '
+                      f'WHERE s.rejected IS NULL')
+    execute('leaders_removed', (
+        f'DELETE FROM {leaders} WHERE {leader_employee} IN '
+        f'({feed_employees} AND NOT e.{leader})'
+    ))
+    execute('leaders_created', (
+        f'INSERT INTO {leaders} ({leader_employee}) '
+        f'{feed_employees} AND e.{leader} AND NOT EXISTS '
+        f'(SELECT 1 FROM {leaders} l '
+        f'WHERE l.{leader_employee} = e.{employee_pk})'
+    ))
+
+    for key, model, name, columns in (
+        ('memberships', TeamEmployee, 'memberships', []),
+        ('arrangements', WorkArrangement, 'arrangements', ['percentage']),
+    ):
+        staging = _staging(name)
+        table = _table(model)
+        row_employee = _column(model, 'employee')
+        row_team = _column(model, 'team')
+        execute(f'{key}_removed', (
+            f'DELETE FROM {table} WHERE {row_employee} IN '
+            f'(SELECT {employee_of("s")} FROM {staging} s '
+            f'WHERE s.rejected IS NULL)'
+        ))
+        extra_columns = ''.join(f', {_column(model, column)}'
+                                for column in columns)
+        extra_values = ''.join(f', CAST(s.{column} AS integer)'
+                               for column in columns)
+        execute(f'{key}_created', (
+            f'INSERT INTO {table} ({row_employee}, {row_team}'
+            f'{extra_columns}) '
+            f'SELECT {employee_of("s")}, {team_of("s")}{extra_values} '
+            f'FROM {staging} s WHERE s.rejected IS NULL '
+            f'ORDER BY s.row_number'
+        ))
+    return written
+
+
+def _changed_employee_ids(cursor):
+    """Primary keys of the employees any valid feed row refers to."""
+    employee = _table(Employee)
+    feed_ids = ' UNION '.join(
+        f'SELECT employee_id FROM {_staging(name)} WHERE rejected IS NULL'
+        for name in ('employees', 'memberships', 'arrangements')
+    )
+    cursor.execute(
+        f'SELECT {_column(Employee, "id")} FROM {employee} '
+        f'WHERE {_column(Employee, "employee_id")} IN ({feed_ids})'
+    )
+    return {pk for pk, in cursor.fetchall()}
+
+
+def _rejections(cursor):
+    """Rejected rows as (file, line, reason), in file and line order."""
+    rejected = []
+    for name in FEED_COLUMNS:
+        cursor.execute(
+            f'SELECT row_number, rejected FROM {_staging(name)} '
+            f'WHERE rejected IS NOT NULL ORDER BY row_number'
+        )
+        # Line 1 is the header
+        rejected += [(name, row_number + 1, reason)
+                     for row_number, reason in cursor.fetchall()]
+    return rejected
+
+
+def import_hr_feed(files, dry_run=False):
+    """Import the feed files, a dict of name to open text file.
+
+    Everything is merged in one transaction, rolled back again when
+    dry_run is true. Returns ``(summary, rejections)``: row counts per
+    file and written per table, and the rejected rows as
+    ``(file, line, reason)``.
+    """
+    unknown = set(files) - set(FEED_COLUMNS)
+    if unknown:
+        raise FeedError(f'Unknown feed files: {", ".join(sorted(unknown))}')
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        raise FeedError('The HR feed import needs PostgreSQL.')
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        for name in FEED_COLUMNS:
+            # Files that aren't given stay empty
+            _create_staging_table(cursor, name)
+            if name in files:
+                _load(cursor, name, files[name])
+        _validate(cursor)
+
+        summary = {}
+        for name in FEED_COLUMNS:
+            cursor.execute(
+                f'SELECT COUNT(*), COUNT(rejected) FROM {_staging(name)}'
+            )
+            rows, rejected = cursor.fetchone()
+            summary[f'{name}_rows'] = rows
+            summary[f'{name}_rejected'] = rejected
+        rejections = _rejections(cursor)
+        summary.update(_merge(cursor))
+
+        # Derived data (payroll snapshots, response cache versions)
+        employee_ids = _changed_employee_ids(cursor)
+        for model in (Team, Employee, TeamLeader, TeamEmployee,
+                      WorkArrangement):
+            send_rows_changed(model, employee_ids)
+
+        for name in FEED_COLUMNS:
+            cursor.execute(f'DROP TABLE {_staging(name)}')
+        if dry_run:
+            transaction.set_rollback(True)
+    return summary, rejections
+
+
+def write_rejections(rejections, output):
+    """Write rejections as CSV to the output text file."""
+    writer = csv.writer(output)
+    writer.writerow(['file', 'line', 'reason'])
+    writer.writerows(rejections)
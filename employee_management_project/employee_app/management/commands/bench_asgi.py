@@ -0,0 +1,179 @@
+import asyncio
+import random
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import AsyncClient, Client, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from employee_app.benchmarks import summarize, write_report
+from employee_app.models import Employee, Team, WorkArrangement
+from employee_app.synthetic import generate_company
+
+RESOURCES = {
+    'employees': Employee,
+    'teams': Team,
+    'work-arrangements': WorkArrangement,
+}
+
+
+class Command(BaseCommand):
+    help = ('Compares concurrent read throughput of the DRF views served '
+            'by the WSGI handler with the async views served by the ASGI '
+            'handler, with the same number of workers. Requests go '
+            'through the handlers in-process, without an HTTP server. '
+            'Seeds a synthetic company when the database is empty.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8,
+                            help='WSGI threads, and requests the ASGI '
+                                 'event loop keeps in flight (default: 8)')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requests per endpoint and handler '
+                                 '(default: 200)')
+        parser.add_argument('--employees', type=int, default=1000,
+                            help='Employees to seed into an empty database '
+                                 '(default: 1000)')
+        parser.add_argument('--no-cache', action='store_true',
+                            help='Build every response from the database '
+                                 'instead of the response cache')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Seed for the synthetic data and the '
+                                 'requested rows')
+        parser.add_argument('--output',
+                            help='File to write the JSON report to')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['requests'] < 1:
+            raise CommandError('--workers and --requests must be positive')
+        if not Employee.objects.exists():
+            generate_company(teams=max(1, options['employees'] // 20),
+                             employees=options['employees'],
+                             seed=options['seed'])
+
+        rng = random.Random(options['seed'])
+        ids = {
+            prefix: list(model.objects.values_list('pk', flat=True))
+            for prefix, model in RESOURCES.items()
+        }
+        user, _ = get_user_model().objects.get_or_create(username='loadtest')
+        self.headers = {
+            'Authorization': f'Bearer {AccessToken.for_user(user)}'
+        }
+
+        overrides = {
+            # The test clients send requests for the testserver host
+            'ALLOWED_HOSTS': ['testserver'],
+        }
+        if options['no_cache']:
+            # Cached responses expire right away
+            overrides['API_CACHE_TIMEOUT'] = 0
+        with override_settings(**overrides):
+            results = self.run_benchmark(ids, rng, options)
+
+        write_report(self.stdout, {
+            'vendor': connection.vendor,
+            'employees': Employee.objects.count(),
+            'workers': options['workers'],
+            'requests': options['requests'],
+            'cached': not options['no_cache'],
+            'results': results,
+        }, options['output'])
+
+    def run_benchmark(self, ids, rng, options):
+        """Request list and retrieve of each resource through both
+        handlers."""
+        results = {}
+        for prefix in RESOURCES:
+            if not ids[prefix]:
+                raise CommandError(f'No {prefix} to request')
+            scenarios = {
+                'list': [f'/{prefix}/'] * options['requests'],
+                'retrieve': [f'/{prefix}/{rng.choice(ids[prefix])}/'
+                             for _ in range(options['requests'])],
+            }
+            for operation, paths in scenarios.items():
+                wsgi = self.run_wsgi(paths, options['workers'])
+                asgi = asyncio.run(self.run_asgi(
+                    [f'/async{path}' for path in paths], options['workers']
+                ))
+                # The DRF views under ASGI run in a thread per request
+                asgi_sync = asyncio.run(self.run_asgi(
+                    paths, options['workers']
+                ))
+                results[f'{prefix} {operation}'] = {
+                    'wsgi': wsgi,
+                    'asgi': asgi,
+                    'asgi_sync_views': asgi_sync,
+                    'speedup': (asgi['requests_per_second'] /
+                                wsgi['requests_per_second']),
+                }
+        return results
+
+    def run_wsgi(self, paths, workers):
+        """Request paths from workers threads, each with its own
+        WSGI test client."""
+        pending = iter(paths)
+        lock = threading.Lock()
+        latencies, errors = [], {}
+
+        def worker():
+            client = Client(headers=self.headers)
+            try:
+                while True:
+                    with lock:
+                        path = next(pending, None)
+                    if path is None:
+                        return
+                    started = time.perf_counter()
+                    response = client.get(path)
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        self.record(latencies, errors, elapsed, response)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(workers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.result(latencies, errors,
+                           time.perf_counter() - started)
+
+    async def run_asgi(self, paths, workers):
+        """Request paths from workers tasks on one event loop."""
+        pending = iter(paths)
+        latencies, errors = [], {}
+
+        async def worker():
+            client = AsyncClient()
+            for path in pending:
+                started = time.perf_counter()
+                response = await client.get(path, headers=self.headers)
+                self.record(latencies, errors,
+                            time.perf_counter() - started, response)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        return self.result(latencies, errors,
+                           time.perf_counter() - started)
+
+    @staticmethod
+    def record(latencies, errors, elapsed, response):
+        latencies.append(elapsed)
+        if response.status_code >= 400:
+            errors[response.status_code] = (
+                errors.get(response.status_code, 0) + 1
+            )
+
+    @staticmethod
+    def result(latencies, errors, elapsed):
+        result = summarize(latencies)
+        result['requests_per_second'] = len(latencies) / elapsed
+        result['errors'] = errors
+        return result
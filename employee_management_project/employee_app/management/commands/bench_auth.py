@@ -0,0 +1,70 @@
+import base64
+import secrets
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework.authentication import BasicAuthentication
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import (
+    JWTAuthentication, JWTStatelessUserAuthentication
+)
+from rest_framework_simplejwt.tokens import AccessToken
+
+from employee_app.benchmarks import time_calls, write_report
+
+
+class Command(BaseCommand):
+    help = ('Measures the per-request cost of Basic (password hashing) '
+            'and JWT authentication')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20,
+                            help='Authenticated requests per scheme')
+        parser.add_argument('--output',
+                            help='File to write the JSON report to')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        password = secrets.token_urlsafe()
+        user = User.objects.create_user(
+            f'bench-auth-{secrets.token_hex(4)}', password=password
+        )
+        try:
+            report = self.run_benchmark(user, password,
+                                        options['iterations'])
+        finally:
+            user.delete()
+        write_report(self.stdout, report, options['output'])
+
+    def run_benchmark(self, user, password, iterations):
+        factory = APIRequestFactory()
+        basic_request = factory.get('/employees/')
+        basic_request.META['HTTP_AUTHORIZATION'] = (
+            'Basic ' + self.encode_credentials(user.get_username(), password)
+        )
+        jwt_request = factory.get(
+            '/employees/',
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}'
+        )
+        schemes = {
+            # Before: a user lookup plus PBKDF2 on every request
+            'basic': (BasicAuthentication(), basic_request),
+            # JWT with a user lookup per request
+            'jwt': (JWTAuthentication(), jwt_request),
+            # After: signature check only, the default authentication class
+            'jwt_stateless': (JWTStatelessUserAuthentication(), jwt_request),
+        }
+        report = {}
+        for name, (authenticator, request) in schemes.items():
+            def authenticate():
+                assert authenticator.authenticate(request) is not None
+            report[name] = time_calls(authenticate, iterations)
+        report['speedup'] = (report['basic']['mean_ms'] /
+                             report['jwt_stateless']['mean_ms'])
+        return report
+
+    @staticmethod
+    def encode_credentials(username, password):
+        return base64.b64encode(
+            f'{username}:{password}'.encode()
+        ).decode()
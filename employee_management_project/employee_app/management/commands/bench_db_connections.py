@@ -0,0 +1,93 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client
+
+from employee_app.benchmarks import summarize, write_report
+
+
+class Command(BaseCommand):
+    help = ('Measures requests per second of a one-query endpoint with a '
+            'new database connection per request, persistent connections '
+            'and, when DB_POOL is enabled, the connection pool. Requests '
+            'go through the in-process test client from threads of this '
+            'one process, not through an application server with several '
+            'workers, so the numbers compare connection handling only.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500,
+                            help='Requests per worker thread and mode')
+        parser.add_argument('--threads', type=int, default=4,
+                            help='Concurrent worker threads')
+        parser.add_argument('--path', default='/health/ready/',
+                            help='Endpoint to request')
+        parser.add_argument('--output',
+                            help='File to write the JSON report to')
+
+    def handle(self, *args, **options):
+        database = connections.settings['default']
+        configured = {
+            'CONN_MAX_AGE': database['CONN_MAX_AGE'],
+            'OPTIONS': dict(database['OPTIONS']),
+        }
+        modes = {
+            'connection_per_request': {'CONN_MAX_AGE': 0, 'pool': None},
+            'persistent': {
+                'CONN_MAX_AGE': configured['CONN_MAX_AGE'] or 600,
+                'pool': None,
+            },
+        }
+        if configured['OPTIONS'].get('pool'):
+            modes['pool'] = {'CONN_MAX_AGE': 0,
+                             'pool': configured['OPTIONS']['pool']}
+
+        report = {'vendor': connection.vendor, 'threads': options['threads']}
+        try:
+            for name, mode in modes.items():
+                database['CONN_MAX_AGE'] = mode['CONN_MAX_AGE']
+                database['OPTIONS'].pop('pool', None)
+                if mode['pool']:
+                    database['OPTIONS']['pool'] = mode['pool']
+                report[name] = self.run_mode(options)
+        finally:
+            database['CONN_MAX_AGE'] = configured['CONN_MAX_AGE']
+            database['OPTIONS'].clear()
+            database['OPTIONS'].update(configured['OPTIONS'])
+        write_report(self.stdout, report, options['output'])
+
+    def run_mode(self, options):
+        """Run every worker thread and return the combined statistics"""
+        latencies, failures = [], []
+        lock = threading.Lock()
+
+        def worker():
+            client = Client(HTTP_HOST='localhost')
+            samples = []
+            try:
+                for _ in range(options['requests']):
+                    started = time.perf_counter()
+                    response = client.get(options['path'])
+                    samples.append(time.perf_counter() - started)
+                    if response.status_code != 200:
+                        failures.append(response.status_code)
+            finally:
+                # Hand the thread's connection back before the next mode
+                connection.close()
+            with lock:
+                latencies.extend(samples)
+
+        threads = [threading.Thread(target=worker)
+                   for _ in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        result = summarize(latencies)
+        result['requests_per_second'] = len(latencies) / elapsed
+        result['failures'] = len(failures)
+        return result
@@ -0,0 +1,84 @@
+import io
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from employee_app import renderers
+from employee_app.benchmarks import time_calls, write_report
+from employee_app.models import Employee
+from employee_app.synthetic import generate_company
+from employee_app.values_serializers import EmployeeValuesSerializer
+
+
+def peak_allocation(function):
+    """Peak memory, in KiB, allocated while function runs."""
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+class Command(BaseCommand):
+    help = ('Compares render and parse time and peak allocations of the '
+            'DRF and the orjson backed JSON renderer and parser on a list '
+            'of full employee representations. Seeds a synthetic company '
+            'of --employees employees when the database has none, and '
+            'stops when it has fewer.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=10000,
+                            help='Employees in the payload (default: '
+                                 '10000)')
+        parser.add_argument('--iterations', type=int, default=20,
+                            help='Renders and parses per implementation')
+        parser.add_argument('--output',
+                            help='File to write the JSON report to')
+
+    def handle(self, *args, **options):
+        if renderers.orjson is None:
+            raise CommandError('orjson is not installed, the renderer '
+                               'falls back to the DRF one')
+        size = options['employees']
+        if not Employee.objects.exists():
+            generate_company(teams=max(1, size // 20), employees=size)
+        serializer = EmployeeValuesSerializer()
+        payload = serializer.to_representations(serializer.values(
+            Employee.objects.order_by('id')[:size]
+        ))
+        if len(payload) < size:
+            raise CommandError(f'Only {len(payload)} employees in the '
+                               'database')
+
+        implementations = {
+            'drf': (JSONRenderer(), JSONParser()),
+            'orjson': (renderers.FastJSONRenderer(),
+                       renderers.FastJSONParser()),
+        }
+        content = implementations['drf'][0].render(payload)
+        if implementations['orjson'][0].render(payload) != content:
+            raise CommandError('The renderers wrote different JSON')
+
+        report = {'employees': size, 'bytes': len(content)}
+        for name, (renderer, parser) in implementations.items():
+            def render():
+                renderer.render(payload)
+
+            def parse():
+                parser.parse(io.BytesIO(content))
+
+            report[name] = {
+                'render': time_calls(render, options['iterations']),
+                'render_peak_kib': peak_allocation(render),
+                'parse': time_calls(parse, options['iterations']),
+                'parse_peak_kib': peak_allocation(parse),
+            }
+        for operation in ('render', 'parse'):
+            report[f'{operation}_speedup'] = (
+                report['drf'][operation]['mean_ms'] /
+                report['orjson'][operation]['mean_ms']
+            )
+        write_report(self.stdout, report, options['output'])
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from employee_app.benchmarks import time_calls, write_report
+from employee_app.models import Employee
+from employee_app.synthetic import generate_company
+from employee_app.views import EmployeeViewSet, WorkArrangementViewSet
+
+
+class Command(BaseCommand):
+    help = ('Measures the per-row cost of building employee and work '
+            'arrangement list responses with the DRF serializers and with '
+            'the values() serializers, queries included. Seeds a synthetic '
+            'company when the database is empty.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500,
+                            help='Rows per response (default: 500)')
+        parser.add_argument('--iterations', type=int, default=20,
+                            help='Responses built per serializer')
+        parser.add_argument('--employees', type=int, default=1000,
+                            help='Employees to seed into an empty database '
+                                 '(default: 1000)')
+        parser.add_argument('--output',
+                            help='File to write the JSON report to')
+
+    def handle(self, *args, **options):
+        if not Employee.objects.exists():
+            generate_company(teams=max(1, options['employees'] // 20),
+                             employees=options['employees'])
+        report = {'rows': options['rows']}
+        for name, viewset in [('employees', EmployeeViewSet),
+                              ('work-arrangements', WorkArrangementViewSet)]:
+            report[name] = self.compare(viewset, options['rows'],
+                                        options['iterations'])
+        write_report(self.stdout, report, options['output'])
+
+    def compare(self, viewset, rows, iterations):
+        serializer = viewset.serializer_class()
+        queryset = viewset.plan_queryset(viewset.queryset.all(), serializer)
+        values_serializer = viewset.values_serializer_class()
+        renderer = JSONRenderer()
+
+        def serialize():
+            return viewset.serializer_class(
+                queryset.all()[:rows], many=True
+            ).data
+
+        def serialize_values():
+            return values_serializer.to_representations(
+                values_serializer.values(viewset.queryset.all()[:rows])
+            )
+
+        if renderer.render(serialize()) != renderer.render(
+            serialize_values()
+        ):
+            raise CommandError(f'{viewset.__name__}: the values() '
+                               'serializer renders different JSON')
+        count = len(serialize_values())
+        result = {
+            'serializer': time_calls(serialize, iterations),
+            'values': time_calls(serialize_values, iterations),
+        }
+        for timings in result.values():
+            timings['per_row_us'] = timings['mean_ms'] * 1000 / count
+        result['speedup'] = (result['serializer']['mean_ms'] /
+                             result['values']['mean_ms'])
+        return result
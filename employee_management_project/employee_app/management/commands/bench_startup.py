@@ -0,0 +1,73 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from employee_app.benchmarks import summarize, write_report
+
+# Runs in a fresh interpreter, like a newly booted worker
+STARTUP_SCRIPT = '''
+import json
+import time
+
+started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+imported = time.perf_counter()
+
+from wsgiref.util import setup_testing_defaults
+environ = {'PATH_INFO': '/health/'}
+setup_testing_defaults(environ)
+statuses = []
+body = b''.join(application(environ,
+                            lambda status, headers: statuses.append(status)))
+finished = time.perf_counter()
+
+print(json.dumps({
+    'import_s': imported - started,
+    'first_request_s': finished - imported,
+    'status': statuses[0],
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = ('Measures worker boot time: importing the WSGI application '
+            'and serving its first request, in fresh processes')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5,
+                            help='Number of processes to start')
+        parser.add_argument('--output',
+                            help='File to write the JSON report to')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        env.setdefault('DJANGO_SETTINGS_MODULE',
+                       'employee_management_project.settings')
+        imports, first_requests, totals = [], [], []
+        for _ in range(options['runs']):
+            result = subprocess.run(
+                [sys.executable, '-c', STARTUP_SCRIPT],
+                cwd=settings.BASE_DIR, env=env,
+                capture_output=True, text=True,
+            )
+            if result.returncode != 0:
+                raise CommandError(f'Worker failed to start:\n'
+                                   f'{result.stderr}')
+            timings = json.loads(result.stdout.strip().splitlines()[-1])
+            if not timings['status'].startswith('200'):
+                raise CommandError(f"First request returned "
+                                   f"{timings['status']}")
+            imports.append(timings['import_s'])
+            first_requests.append(timings['first_request_s'])
+            totals.append(timings['import_s'] + timings['first_request_s'])
+
+        write_report(self.stdout, {
+            'import': summarize(imports),
+            'first_request': summarize(first_requests),
+            'total': summarize(totals),
+        }, options['output'])
@@ -0,0 +1,74 @@
+import time
+
+import psycopg
+from psycopg import sql
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ('Creates the database if needed, applies migrations, '
+            'generates the OpenAPI schema and seeds initial data. Run once '
+            'per deployment, not per process.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wait', type=int, default=30,
+                            help='Seconds to wait for PostgreSQL to accept '
+                                 'connections (default: 30)')
+        parser.add_argument('--skip-seed', action='store_true',
+                            help='Only create the database and migrate')
+
+    def handle(self, *args, **options):
+        database = settings.DATABASES['default']
+        if database['ENGINE'] == 'django.db.backends.postgresql':
+            self.create_database(database, options['wait'])
+
+        self.stdout.write(self.style.SUCCESS('Applying migrations...'))
+        call_command('migrate', interactive=False)
+        # Fill snapshots for rows written before they were maintained
+        call_command('rebuild_payroll_snapshots')
+        # Workers serve the schema from disk instead of generating it
+        call_command('generate_openapi')
+
+        if not options['skip_seed']:
+            call_command('seed_data')
+
+    def create_database(self, database, wait):
+        """Create the configured database if it doesn't exist, waiting up
+        to wait seconds for the server to come up."""
+        deadline = time.monotonic() + wait
+        while True:
+            try:
+                conn = psycopg.connect(
+                    dbname='postgres',
+                    user=database['USER'],
+                    password=database['PASSWORD'],
+                    host=database['HOST'],
+                    port=database['PORT'],
+                )
+                break
+            except psycopg.OperationalError as e:
+                if time.monotonic() >= deadline:
+                    raise CommandError(f'Database is not available: {e}')
+                time.sleep(1)  # Wait for the database to be available
+
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM pg_catalog.pg_database WHERE datname = %s",
+                    (database['NAME'], )
+                )
+                if cursor.fetchone() is None:
+                    cursor.execute(sql.SQL('CREATE DATABASE {}').format(
+                        sql.Identifier(database['NAME'])
+                    ))
+                    self.stdout.write(
+                        self.style.SUCCESS(
+                            f"Database {database['NAME']} "
+                            "created successfully."
+                        )
+                    )
+        finally:
+            conn.close()
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from employee_app.payroll import (
+    diff_payroll_snapshots, refresh_payroll_snapshots
+)
+
+
+class Command(BaseCommand):
+    help = ('Compares every payroll snapshot with '
+            'Employee.calculate_monthly_pay and reports differences')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true',
+                            help='Recompute the snapshots that differ')
+
+    def handle(self, *args, **options):
+        stale = []
+        for employee, snapshot_pay, expected in diff_payroll_snapshots():
+            stale.append(employee.pk)
+            self.stdout.write(
+                f'{employee}: snapshot {snapshot_pay}, expected {expected}'
+            )
+
+        if not stale:
+            self.stdout.write(self.style.SUCCESS(
+                'All payroll snapshots are up to date'
+            ))
+            return
+        if options['fix']:
+            refresh_payroll_snapshots(stale)
+            self.stdout.write(self.style.SUCCESS(
+                f'Fixed {len(stale)} payroll snapshots'
+            ))
+            return
+        raise CommandError(f'{len(stale)} payroll snapshots are out of date')
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from employee_app.db_routers import read_from_replica
+
+from employee_app.exports import (
+    EXPORT_CHUNK_SIZE, EXPORT_FORMATS, iter_export
+)
+
+
+class Command(BaseCommand):
+    help = ('Streams every employee with teams, work arrangements and '
+            'monthly pay as NDJSON or CSV')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS),
+                            default='ndjson',
+                            help='Output format (default: ndjson)')
+        parser.add_argument('--output',
+                            help='File to write to (default: stdout)')
+        parser.add_argument('--chunk-size', type=int,
+                            default=EXPORT_CHUNK_SIZE,
+                            help='Rows fetched per database round trip')
+
+    def handle(self, *args, **options):
+        # A report, read from a replica when there is one
+        with read_from_replica():
+            self.export(options)
+
+    def export(self, options):
+        lines = iter_export(options['format'], options['chunk_size'])
+        if options['output'] is None:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+
+        count = -1 if options['format'] == 'csv' else 0  # CSV header
+        with open(options['output'], 'w', newline='',
+                  encoding='utf-8') as export_file:
+            for line in lines:
+                export_file.write(line)
+                count += 1
+        self.stderr.write(self.style.SUCCESS(
+            f'Exported {count} employees to {options["output"]}'
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from employee_app.openapi import (
+    code_version, remove_stale_schemas, schema_path, write_schema
+)
+
+
+class Command(BaseCommand):
+    help = ('Writes the OpenAPI schema of the current code version to '
+            'OPENAPI_SCHEMA_DIR. Run once per deployment.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate even if the schema of this '
+                                 'code version already exists')
+
+    def handle(self, *args, **options):
+        if schema_path().exists() and not options['force']:
+            self.stdout.write(
+                f'Schema of version {code_version()} is up to date'
+            )
+        else:
+            path = write_schema()
+            self.stdout.write(self.style.SUCCESS(f'Wrote {path}'))
+        remove_stale_schemas()
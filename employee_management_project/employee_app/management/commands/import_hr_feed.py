@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from employee_app.hr_import import (
+    FEED_COLUMNS, FeedError, import_hr_feed, write_rejections
+)
+
+
+class Command(BaseCommand):
+    help = ('Imports the HR system feed from CSV files in one transaction: '
+            'COPY into staging tables, set-based validation, then merge. '
+            'Rejected rows are reported per file and line.')
+
+    def add_arguments(self, parser):
+        for name, columns in FEED_COLUMNS.items():
+            parser.add_argument(f'--{name}', metavar='CSV',
+                                help=f'CSV file with {", ".join(columns)}')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Validate and merge, then roll back')
+        parser.add_argument('--rejects', default='rejects.csv',
+                            help='File to write rejected rows to '
+                                 '(default: rejects.csv)')
+
+    def handle(self, *args, **options):
+        paths = {name: options[name] for name in FEED_COLUMNS
+                 if options[name]}
+        if not paths:
+            raise CommandError('Give at least one of ' + ', '.join(
+                f'--{name}' for name in FEED_COLUMNS
+            ))
+        files = {}
+        try:
+            for name, path in paths.items():
+                files[name] = open(path, newline='', encoding='utf-8')
+            summary, rejections = import_hr_feed(files, options['dry_run'])
+        except (FeedError, OSError) as e:
+            raise CommandError(e)
+        finally:
+            for feed_file in files.values():
+                feed_file.close()
+
+        for key, count in summary.items():
+            self.stdout.write(f'{key}: {count}')
+        if rejections:
+            with open(options['rejects'], 'w', newline='',
+                      encoding='utf-8') as rejects_file:
+                write_rejections(rejections, rejects_file)
+            self.stdout.write(self.style.WARNING(
+                f'Rejected {len(rejections)} rows, see {options["rejects"]}'
+            ))
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry run, rolled back'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Imported HR feed'))
@@ -0,0 +1,313 @@
+import itertools
+import json
+import queue
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import (
+    ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application
+)
+from django.db import connection, connections
+from rest_framework_simplejwt.tokens import AccessToken
+
+from employee_app.benchmarks import summarize, write_report
+from employee_app.models import (
+    Employee, Team, TeamEmployee, TeamLeader, WorkArrangement
+)
+from employee_app.synthetic import create_employees, generate_company
+
+QUERY_COUNT_HEADER = 'X-Query-Count'
+
+
+class QueryCountingApplication:
+    """WSGI application reporting how many SQL queries each request ran
+    in a response header."""
+    def __init__(self, application):
+        self.application = application
+
+    def __call__(self, environ, start_response):
+        executed = []
+
+        def count_query(execute, sql, params, many, context):
+            executed.append(sql)
+            return execute(sql, params, many, context)
+
+        def counted_start_response(status, headers, exc_info=None):
+            # Django renders the whole response before starting it
+            headers = headers + [(QUERY_COUNT_HEADER, str(len(executed)))]
+            return start_response(status, headers, exc_info)
+
+        with connection.execute_wrapper(count_query):
+            return self.application(environ, counted_start_response)
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = ('Seeds a synthetic company, then drives list, retrieve, create '
+            'and update of every API endpoint with concurrent clients and '
+            'reports throughput, latency percentiles and SQL queries per '
+            'request as JSON. Writes to the configured database: use a '
+            'throwaway one.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=1000,
+                            help='Employees to seed (default: 1000)')
+        parser.add_argument('--teams', type=int,
+                            help='Teams to seed (default: employees / 20)')
+        parser.add_argument('--reuse', action='store_true',
+                            help='Benchmark the data already in the '
+                                 'database instead of seeding')
+        parser.add_argument('--clients', type=int, default=8,
+                            help='Concurrent clients (default: 8)')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requests per endpoint and operation '
+                                 '(default: 200)')
+        parser.add_argument('--base-url',
+                            help='Benchmark a running server sharing this '
+                                 'database instead of an in-process one. '
+                                 'Query counts are only reported '
+                                 'in-process.')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Seed for the synthetic data and the '
+                                 'requested rows')
+        parser.add_argument('--output',
+                            help='File to write the JSON report to')
+
+    def handle(self, *args, **options):
+        if options['reuse']:
+            if not Employee.objects.exists():
+                raise CommandError('--reuse needs data in the database')
+        elif Employee.objects.exists():
+            raise CommandError('The database already has employees, '
+                               'pass --reuse to benchmark them as they are')
+        else:
+            started = time.perf_counter()
+            generate_company(
+                teams=options['teams'] or max(1, options['employees'] // 20),
+                employees=options['employees'], seed=options['seed'],
+            )
+            self.stderr.write(
+                f'Seeded in {time.perf_counter() - started:.1f}s'
+            )
+
+        self.random = random.Random(options['seed'])
+        self.prepare_rows(options['requests'])
+        user, _ = get_user_model().objects.get_or_create(username='loadtest')
+        self.headers = {
+            'Authorization': f'Bearer {AccessToken.for_user(user)}',
+            'Content-Type': 'application/json',
+        }
+
+        server = None
+        base_url = options['base_url']
+        if base_url is None:
+            server, base_url = self.start_server()
+        try:
+            results = {}
+            for name, request in self.scenarios():
+                results[name] = self.run_scenario(base_url, request, options)
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+
+        write_report(self.stdout, {
+            'vendor': connection.vendor,
+            'employees': Employee.objects.count(),
+            'teams': Team.objects.count(),
+            'clients': options['clients'],
+            'requests': options['requests'],
+            'results': results,
+        }, options['output'])
+
+    def prepare_rows(self, requests):
+        """Sample existing rows to read and update, and create employees
+        to be used by the create requests that need a free one."""
+        def sample(queryset):
+            ids = list(queryset.values_list('pk', flat=True))
+            if not ids:
+                raise CommandError(
+                    f'No {queryset.model._meta.verbose_name} to request'
+                )
+            return [self.random.choice(ids) for _ in range(requests)]
+
+        self.ids = {
+            'employees': sample(Employee.objects.all()),
+            'teams': sample(Team.objects.all()),
+            'team-leaders': sample(TeamLeader.objects.all()),
+            'team-employees': sample(TeamEmployee.objects.all()),
+            'work-arrangements': sample(WorkArrangement.objects.all()),
+        }
+        self.ids['payroll'] = self.ids['employees']
+        self.leaders = dict(TeamLeader.objects.filter(
+            pk__in=self.ids['team-leaders']
+        ).values_list('pk', 'employee'))
+        self.memberships = dict(TeamEmployee.objects.filter(
+            pk__in=self.ids['team-employees']
+        ).values_list('pk', 'team'))
+        self.percentages = dict(WorkArrangement.objects.filter(
+            pk__in=self.ids['work-arrangements']
+        ).values_list('pk', 'percentage'))
+
+        # Each free employee becomes a leader, joins a team and gets a
+        # half time arrangement, one create request each
+        prefix = 'L'
+        spares = create_employees(requests, prefix=prefix,
+                                  start=Employee.objects.filter(
+                                      employee_id__startswith=prefix
+                                  ).count())
+        self.spares = {
+            name: queue.SimpleQueue()
+            for name in ('team-leaders', 'team-employees',
+                         'work-arrangements')
+        }
+        for employee in spares:
+            for spare_queue in self.spares.values():
+                spare_queue.put(employee.pk)
+        self.created = itertools.count(Employee.objects.filter(
+            employee_id__startswith='P'
+        ).count())
+
+    def scenarios(self):
+        """(name, request factory) of every benchmarked operation. The
+        factory takes the request number and returns method, path and
+        JSON payload."""
+        def read(prefix):
+            yield f'{prefix} list', lambda n: ('GET', f'/{prefix}/', None)
+            yield f'{prefix} retrieve', lambda n: (
+                'GET', f'/{prefix}/{self.ids[prefix][n]}/', None
+            )
+
+        def update(prefix, payload):
+            return f'{prefix} update', lambda n: (
+                'PATCH', f'/{prefix}/{self.ids[prefix][n]}/',
+                payload(self.ids[prefix][n]),
+            )
+
+        yield from read('employees')
+        yield 'employees create', lambda n: ('POST', '/employees/', {
+            'name': f'Load Test {n}',
+            'employee_id': f'P{next(self.created):08}',
+            'hourly_rate': '25.00',
+        })
+        yield update('employees', lambda pk: {
+            'hourly_rate': f'{self.random.randint(15, 60)}.00'
+        })
+
+        yield from read('teams')
+        yield 'teams create', lambda n: ('POST', '/teams/',
+                                         {'name': f'Load Test {n}'})
+        yield update('teams', lambda pk: {'name': f'Team {pk}'})
+
+        yield from read('team-leaders')
+        yield 'team-leaders create', lambda n: ('POST', '/team-leaders/', {
+            'employee': self.spares['team-leaders'].get(),
+        })
+        yield update('team-leaders',
+                     lambda pk: {'employee': self.leaders[pk]})
+
+        yield from read('team-employees')
+        yield 'team-employees create', lambda n: (
+            'POST', '/team-employees/', {
+                'team': self.ids['teams'][n],
+                'employee': self.spares['team-employees'].get(),
+            }
+        )
+        yield update('team-employees',
+                     lambda pk: {'team': self.memberships[pk]})
+
+        yield from read('work-arrangements')
+        yield 'work-arrangements create', lambda n: (
+            'POST', '/work-arrangements/', {
+                'team': self.ids['teams'][n],
+                'employee': self.spares['work-arrangements'].get(),
+                'percentage': 50,
+            }
+        )
+        yield update('work-arrangements',
+                     lambda pk: {'percentage': self.percentages[pk]})
+
+        yield from read('payroll')
+
+    def start_server(self):
+        """Serve the project from a thread on a free local port."""
+        server = ThreadedWSGIServer(('localhost', 0), QuietRequestHandler)
+        server.set_app(QueryCountingApplication(
+            get_internal_wsgi_application()
+        ))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server, f'http://localhost:{server.server_port}'
+
+    def run_scenario(self, base_url, make_request, options):
+        """Send options['requests'] requests from options['clients']
+        threads and summarize them."""
+        numbers = queue.SimpleQueue()
+        for number in range(options['requests']):
+            numbers.put(number)
+        latencies, queries, errors = [], [], {}
+        lock = threading.Lock()
+
+        def client():
+            try:
+                while True:
+                    try:
+                        number = numbers.get_nowait()
+                    except queue.Empty:
+                        return
+                    method, path, payload = make_request(number)
+                    elapsed, status, query_count = self.send(
+                        base_url, method, path, payload
+                    )
+                    with lock:
+                        latencies.append(elapsed)
+                        if query_count is not None:
+                            queries.append(query_count)
+                        if status >= 400:
+                            errors[status] = errors.get(status, 0) + 1
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=client)
+                   for _ in range(options['clients'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        result = summarize(latencies)
+        result['requests_per_second'] = len(latencies) / elapsed
+        result['errors'] = errors
+        if queries:
+            result['queries_mean'] = sum(queries) / len(queries)
+            result['queries_max'] = max(queries)
+        return result
+
+    def send(self, base_url, method, path, payload):
+        """Send one request, returning its latency in seconds, status
+        and query count."""
+        data = None if payload is None else json.dumps(payload).encode()
+        request = urllib.request.Request(base_url + path, data=data,
+                                         method=method, headers=self.headers)
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+        except urllib.error.HTTPError as error:
+            response = error
+            error.read()
+        elapsed = time.perf_counter() - started
+        query_count = response.headers.get(QUERY_COUNT_HEADER)
+        return (elapsed, response.status,
+                None if query_count is None else int(query_count))
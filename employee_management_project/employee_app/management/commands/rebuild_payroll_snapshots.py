@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from employee_app.payroll import (
+    REBUILD_BATCH_SIZE, rebuild_payroll_snapshots
+)
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the payroll snapshot of every employee'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            default=REBUILD_BATCH_SIZE,
+                            help='Employees recomputed per query')
+
+    def handle(self, *args, **options):
+        refreshed = rebuild_payroll_snapshots(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {refreshed} payroll snapshots'
+        ))
@@ -0,0 +1,88 @@
+import datetime
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from employee_app.models import PayrollRun
+from employee_app.payroll import (
+    PAYROLL_CHUNK_SIZE, run_payroll, start_payroll_run
+)
+
+
+def parse_month(value):
+    """First day of a YYYY-MM month."""
+    return datetime.datetime.strptime(value, '%Y-%m').date()
+
+
+class Command(BaseCommand):
+    help = ('Computes the monthly pay of every employee into a payroll '
+            'run, in chunks spread over worker processes on PostgreSQL. '
+            'A run that stopped can be continued with --resume.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', type=parse_month,
+                            default=datetime.date.today().replace(day=1),
+                            help='Month to run, as YYYY-MM (default: the '
+                                 'current month)')
+        parser.add_argument('--chunk-size', type=int,
+                            default=PAYROLL_CHUNK_SIZE,
+                            help='Employees computed per transaction')
+        parser.add_argument('--workers', type=int,
+                            default=os.cpu_count() or 1,
+                            help='Worker processes (default: one per CPU, '
+                                 'PostgreSQL only)')
+        parser.add_argument('--resume', action='store_true',
+                            help="Continue the month's unfinished run from "
+                                 'its last completed chunk')
+
+    def handle(self, *args, **options):
+        month = options['month']
+        run = PayrollRun.objects.filter(month=month).first()
+        if options['resume']:
+            if run is None or run.completed_at is not None:
+                raise CommandError(
+                    f'No unfinished payroll run for {month:%Y-%m}'
+                )
+        elif run is not None:
+            if run.completed_at is not None:
+                raise CommandError(f'Payroll for {month:%Y-%m} was already '
+                                   'run')
+            raise CommandError(f'The payroll run for {month:%Y-%m} is '
+                               'unfinished, continue it with --resume')
+        else:
+            run = start_payroll_run(month, options['chunk_size'])
+
+        chunk_count = run.chunks.count()
+        computed = 0
+
+        def progress(chunk):
+            nonlocal computed
+            computed += chunk.employee_count
+            self.stdout.write(
+                f'Chunk {chunk.number}/{chunk_count}: '
+                f'{chunk.employee_count} employees in '
+                f'{chunk.duration_ms:.0f} ms'
+            )
+
+        started = time.perf_counter()
+        try:
+            run = run_payroll(run, options['workers'], progress)
+        except Exception as error:
+            raise CommandError(
+                f'Payroll run stopped: {error}. Completed chunks are kept, '
+                'continue with --resume'
+            ) from error
+        elapsed = time.perf_counter() - started
+        if run.resumed and run.snapshot_at is not None:
+            self.stdout.write(self.style.WARNING(
+                f'{run} was resumed: chunks completed before read the data '
+                f'as of {run.snapshot_at:%Y-%m-%d %H:%M:%S}, later chunks '
+                'a newer snapshot'
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'{run}: {run.employee_count} employees, total pay '
+            f'{run.total_pay:.2f}. Computed {computed} employees in '
+            f'{elapsed:.1f} s ({computed / max(elapsed, 1e-9):.0f} '
+            'employees/s)'
+        ))
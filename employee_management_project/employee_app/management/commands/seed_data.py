@@ -1,58 +1,38 @@
-from django.core.management.base import BaseCommand
-from django.core.management import call_command
-import psycopg2
+import time
+
+from django.core.management.base import BaseCommand, CommandError
 from employee_app.models import (Employee, Team,
                                  TeamLeader, TeamEmployee, WorkArrangement)
+from employee_app.synthetic import SEED_BATCH_SIZE, generate_company
 from django.contrib.auth import get_user_model
-from django.conf import settings
 
 
 class Command(BaseCommand):
-    help = 'Seeds the database with initial data if empty'
-
-    def handle(self, *args, **options):
-        db_name = settings.DATABASES['default']['NAME']
-
-        # Step 1: Create the database if it doesn't exist
-        try:
-            conn = psycopg2.connect(
-                dbname='postgres',
-                user=settings.DATABASES['default']['USER'],
-                password=settings.DATABASES['default']['PASSWORD'],
-                host=settings.DATABASES['default']['HOST'],
-                port=settings.DATABASES['default']['PORT'],
-            )
-            conn.autocommit = True
-            cursor = conn.cursor()
-
-            cursor.execute(
-                "SELECT 1 FROM pg_catalog.pg_database WHERE datname = %s",
-                (db_name, )
-            )
-            exists = cursor.fetchone()
+    help = ('Seeds the database with initial data if empty, or with a '
+            'synthetic company when --employees is given')
 
-            if not exists:
-                cursor.execute(f'CREATE DATABASE {db_name};')
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f'Database {db_name} created successfully.'
-                    )
-                )
-        except psycopg2.Error as e:
-            self.stdout.write(self.style.ERROR
-                              (f'Error creating database: {e}'))
-        finally:
-            cursor.close()
-            conn.close()
-
-        # Step 2: Make migrations
-        self.stdout.write(self.style.SUCCESS('Making migrations...'))
-        call_command('makemigrations')
-
-        # Step 3: Migrate to apply migrations
-        self.stdout.write(self.style.SUCCESS('Applying migrations...'))
-        call_command('migrate')
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int,
+                            help='Generate a synthetic company with this '
+                                 'many employees')
+        parser.add_argument('--teams', type=int,
+                            help='Teams (default: one per 20 employees)')
+        parser.add_argument('--leaders', type=int,
+                            help='Team leaders (default: one per team)')
+        parser.add_argument('--memberships', type=int,
+                            help='Team memberships (default: one per '
+                                 'employee)')
+        parser.add_argument('--arrangements', type=int,
+                            help='Work arrangements (default: 1.2 per '
+                                 'employee)')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Random seed, the same seed and sizes '
+                                 'generate the same company')
+        parser.add_argument('--batch-size', type=int,
+                            default=SEED_BATCH_SIZE,
+                            help='Rows per bulk insert')
 
+    def handle(self, *args, **options):
         # Seed superuser
         User = get_user_model()
         if not User.objects.filter(is_superuser=True).exists():
@@ -67,7 +47,33 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING('Superuser already exists.'))
 
         # Seed other models as necessary...
-        self.seed_initial_data()
+        if options['employees'] is None:
+            self.seed_initial_data()
+        else:
+            self.seed_synthetic_data(options)
+
+    def seed_synthetic_data(self, options):
+        if Employee.objects.filter(employee_id__startswith='S').exists():
+            raise CommandError('Synthetic employees were already seeded')
+        started = time.perf_counter()
+        try:
+            sizes = generate_company(
+                teams=(options['teams'] or
+                       max(1, options['employees'] // 20)),
+                employees=options['employees'],
+                leaders=options['leaders'],
+                memberships=options['memberships'],
+                arrangements=options['arrangements'],
+                seed=options['seed'],
+                batch_size=options['batch_size'],
+            )
+        except ValueError as e:
+            raise CommandError(e)
+        self.stdout.write(self.style.SUCCESS(
+            'Created ' + ', '.join(f'{count} {name}'
+                                   for name, count in sizes.items()) +
+            f' in {time.perf_counter() - started:.1f}s'
+        ))
 
     def seed_initial_data(self):
         # Your existing seeding logic for Teams, Employees, etc.
@@ -0,0 +1,132 @@
+import contextlib
+import heapq
+import itertools
+import logging
+import time
+
+from asgiref.sync import (
+    iscoroutinefunction, markcoroutinefunction, sync_to_async
+)
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('employee_app.requests')
+
+# Characters of SQL logged per query
+LOGGED_SQL_LENGTH = 500
+
+
+class QueryRecorder:
+    """Database execute wrapper counting and timing queries, keeping the
+    ``keep`` slowest of them."""
+    def __init__(self, keep):
+        self.keep = keep
+        self.count = 0
+        self.duration = 0.0
+        self.slowest = []
+        # Breaks ties between equally slow queries in the heap
+        self.order = itertools.count()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            self.duration += duration
+            entry = (duration, next(self.order), sql)
+            if len(self.slowest) < self.keep:
+                heapq.heappush(self.slowest, entry)
+            elif self.slowest:
+                heapq.heappushpop(self.slowest, entry)
+
+    def slowest_queries(self):
+        """(duration, sql) of the slowest queries, slowest first."""
+        return [(duration, sql) for duration, _, sql
+                in sorted(self.slowest, reverse=True)]
+
+
+class RequestMetricsMiddleware:
+    """Measure wall time, SQL query count and SQL time of every request.
+
+    They are sent back in a ``Server-Timing`` header, and requests over
+    ``REQUEST_METRICS_SLOW_MS`` or ``REQUEST_METRICS_MAX_QUERIES`` are
+    logged with their slowest queries. Django drops the middleware from
+    the chain at startup when ``REQUEST_METRICS_ENABLED`` is off, so it
+    costs nothing then.
+
+    Queries a streaming response runs while it is sent are not counted.
+    The middleware is async capable, so it keeps async views async.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.slow_seconds = settings.REQUEST_METRICS_SLOW_MS / 1000
+        self.max_queries = settings.REQUEST_METRICS_MAX_QUERIES
+        self.logged_queries = settings.REQUEST_METRICS_LOGGED_QUERIES
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder(self.logged_queries)
+        started = time.perf_counter()
+        with self.record_queries(recorder):
+            response = self.get_response(request)
+        return self.report(request, response,
+                           time.perf_counter() - started, recorder)
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder(self.logged_queries)
+        started = time.perf_counter()
+        # The async ORM queries on the request's sync_to_async thread,
+        # whose connections are not the event loop thread's
+        recording = await sync_to_async(self.record_queries)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(recording.close)()
+        return self.report(request, response,
+                           time.perf_counter() - started, recorder)
+
+    @staticmethod
+    def record_queries(recorder):
+        """ExitStack running recorder around every query of the current
+        thread's connections until it is closed."""
+        stack = contextlib.ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        return stack
+
+    def report(self, request, response, duration, recorder):
+        """Add the Server-Timing header, and log the request if slow."""
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={recorder.duration * 1000:.1f};'
+            f'desc="{recorder.count} queries"',
+            f'app;dur={(duration - recorder.duration) * 1000:.1f}',
+            f'total;dur={duration * 1000:.1f}',
+        ])
+        if (duration >= self.slow_seconds or
+                recorder.count > self.max_queries):
+            self.log_slow_request(request, response, duration, recorder)
+        return response
+
+    def log_slow_request(self, request, response, duration, recorder):
+        queries = ''.join(
+            f'\n  {query_duration * 1000:.1f}ms '
+            f'{sql[:LOGGED_SQL_LENGTH]}'
+            for query_duration, sql in recorder.slowest_queries()
+        )
+        logger.warning(
+            'Slow request %s %s: %s in %.1fms, %d queries in %.1fms%s',
+            request.method, request.get_full_path(), response.status_code,
+            duration * 1000, recorder.count, recorder.duration * 1000,
+            queries,
+        )
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.2 on 2026-10-18 12:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee_app', '0004_alter_workarrangement_team'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayrollSnapshot',
+            fields=[
+                ('employee', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='payroll_snapshot', serialize=False, to='employee_app.employee')),
+                ('monthly_pay', models.DecimalField(decimal_places=6, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.2 on 2026-10-18 13:02
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_team_employees(apps, schema_editor):
+    """Keep the oldest row of every (team, employee) pair, so the unique
+    constraint can be added."""
+    TeamEmployee = apps.get_model('employee_app', 'TeamEmployee')
+    duplicates = TeamEmployee.objects.values('team', 'employee').annotate(
+        keep=Min('id'), rows=Count('id')
+    ).filter(rows__gt=1)
+    for duplicate in duplicates:
+        TeamEmployee.objects.filter(
+            team=duplicate['team'], employee=duplicate['employee']
+        ).exclude(id=duplicate['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee_app', '0005_payrollsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(condition=models.Q(('is_team_leader', True)), fields=['is_team_leader'], name='employee_team_leader_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['name'], name='employee_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workarrangement',
+            index=models.Index(fields=['employee', 'team'], name='workarrangement_emp_team_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_team_employees,
+                             migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='teamemployee',
+            constraint=models.UniqueConstraint(fields=('team', 'employee'), name='unique_team_employee'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.2 on 2026-10-18 13:34
+
+from django.db import migrations, models
+
+TRIGRAM_INDEX = 'employee_name_trgm_idx'
+
+
+def create_trigram_index(apps, schema_editor):
+    """Index UPPER(name) for name__icontains and trigram similarity
+    searches. Only PostgreSQL has trigram indexes."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = schema_editor.quote_name(
+        apps.get_model('employee_app', 'Employee')._meta.db_table
+    )
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON {table} '
+        f'USING gin (UPPER("name") gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {TRIGRAM_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee_app', '0006_indexes_and_unique_team_employee'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['hourly_rate'], name='employee_hourly_rate_idx'),
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
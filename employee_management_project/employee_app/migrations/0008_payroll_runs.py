@@ -0,0 +1,58 @@
+# Generated by Django 5.1.2 on 2026-10-18 13:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee_app', '0007_employee_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayrollRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(unique=True)),
+                ('chunk_size', models.PositiveIntegerField()),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('employee_count', models.PositiveIntegerField(blank=True, null=True)),
+                ('total_pay', models.DecimalField(blank=True, decimal_places=6, max_digits=20, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PayrollRunChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('first_employee_pk', models.BigIntegerField()),
+                ('last_employee_pk', models.BigIntegerField()),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('employee_count', models.PositiveIntegerField(blank=True, null=True)),
+                ('total_pay', models.DecimalField(blank=True, decimal_places=6, max_digits=20, null=True)),
+                ('duration_ms', models.FloatField(blank=True, null=True)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='employee_app.payrollrun')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('run', 'number'), name='unique_payroll_run_chunk')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PayrollRunEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('employee_code', models.CharField(max_length=10)),
+                ('hourly_rate', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('is_team_leader', models.BooleanField()),
+                ('monthly_pay', models.DecimalField(decimal_places=6, max_digits=14)),
+                ('employee', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payroll_entries', to='employee_app.employee')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='employee_app.payrollrun')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('run', 'employee_code'), name='unique_payroll_run_entry')],
+            },
+        ),
+    ]
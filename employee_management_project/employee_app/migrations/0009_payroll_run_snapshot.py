@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employee_app', '0008_payroll_runs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payrollrun',
+            name='resumed',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='payrollrun',
+            name='snapshot_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,42 +1,369 @@
+import contextvars
 from decimal import Decimal
-from django.db import models
+from django.db import models, transaction
+from django.db.models import (
+    Case, Count, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value, When
+)
+from django.db.models.functions import Coalesce
 from django.forms import ValidationError
+from .signals import send_rows_changed
 
 # Create your models here.
 
+# Set while bulk_update() runs its per-batch update() calls, which it
+# reports itself
+_in_bulk_update = contextvars.ContextVar('in_bulk_update', default=False)
+
+
+class TrackedQuerySet(models.QuerySet):
+    """QuerySet that sends ``rows_changed`` after bulk writes.
+
+    ``update()``, ``bulk_create()`` and ``bulk_update()`` don't call
+    ``save()`` or send model signals, so derived data (like the payroll
+    snapshots and the response cache versions) is kept in sync through
+    ``rows_changed`` instead.
+    """
+    # Field holding the employee a row belongs to, None for models
+    # not tied to an employee
+    employee_field = 'employee_id'
+
+    def _employee_ids(self):
+        if self.employee_field is None:
+            return set()
+        return set(self.values_list(self.employee_field, flat=True))
+
+    def _object_employee_ids(self, objs):
+        if self.employee_field is None:
+            return set()
+        return {getattr(obj, self.employee_field) for obj in objs}
+
+    def _rows_changed(self, employee_ids):
+        send_rows_changed(self.model, employee_ids)
+
+    def update(self, **kwargs):
+        if _in_bulk_update.get():
+            return super().update(**kwargs)
+        # Collect the rows first, the update may change what they match
+        employee_ids = self._employee_ids()
+        rows = super().update(**kwargs)
+        moved_to = kwargs.get('employee', kwargs.get('employee_id'))
+        if (moved_to is not None and self.employee_field is not None and
+                not hasattr(moved_to, 'resolve_expression')):
+            employee_ids.add(getattr(moved_to, 'pk', moved_to))
+        self._rows_changed(employee_ids)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        self._rows_changed(self._object_employee_ids(objs))
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        # Rows may move to another employee, so old and new ones count
+        employee_ids = self.filter(
+            pk__in=[obj.pk for obj in objs]
+        )._employee_ids()
+        token = _in_bulk_update.set(True)
+        try:
+            rows = super().bulk_update(objs, fields, *args, **kwargs)
+        finally:
+            _in_bulk_update.reset(token)
+        employee_ids.update(self._object_employee_ids(objs))
+        self._rows_changed(employee_ids)
+        return rows
+
+
+# Output type of the pay expressions computed in SQL
+PAY_FIELD = models.DecimalField(max_digits=14, decimal_places=6)
+
+
+def arrangement_pay(percentage, hourly_rate, is_team_leader):
+    """Monthly pay of one work arrangement row as a SQL expression.
+
+    Takes the lookup paths of the arrangement's percentage and of its
+    employee's hourly_rate and is_team_leader. Mirrors
+    ``Employee.calculate_monthly_pay``: the arrangement is worth
+    ``percentage`` % of 160 monthly hours at the hourly rate, with a 10%
+    bonus for team leaders.
+    """
+    hours_per_percent = Value(
+        Decimal(WorkArrangement.FULL_TIME_HOURS *
+                Employee.WEEKS_PER_MONTH) / Decimal('100'),
+        output_field=PAY_FIELD,
+    )
+    bonus = Case(
+        When(**{is_team_leader: True},
+             then=Value(Employee.LEADER_BONUS, output_field=PAY_FIELD)),
+        default=Value(Decimal('1'), output_field=PAY_FIELD),
+        output_field=PAY_FIELD,
+    )
+    return ExpressionWrapper(
+        F(percentage) * F(hourly_rate) * hours_per_percent * bonus,
+        output_field=PAY_FIELD,
+    )
+
+
+def _sum_or_zero(expression, output_field):
+    """SUM of expression, 0 instead of NULL when there are no rows."""
+    return Coalesce(Sum(expression, output_field=output_field),
+                    Value(Decimal('0'), output_field=output_field),
+                    output_field=output_field)
+
+
+class TeamQuerySet(TrackedQuerySet):
+    """QuerySet with database-side labour cost helpers for teams."""
+    employee_field = None
+
+    def with_cost_rollup(self):
+        """Annotate each team with what its work arrangements add up to,
+        in one grouped query.
+
+        Every arrangement counts towards its ``WorkArrangement.team``:
+        ``headcount`` is the number of distinct employees, ``fte`` the sum
+        of percentages / 100, ``weekly_hours`` the sum of weekly hours
+        and ``monthly_cost`` the sum of monthly pay, leader bonus
+        included. Teams without arrangements get zeros.
+        """
+        hours_field = models.DecimalField(max_digits=12, decimal_places=2)
+        return self.annotate(
+            headcount=Count('work_arrangements__employee', distinct=True),
+            fte=_sum_or_zero(
+                F('work_arrangements__percentage') *
+                Value(Decimal('0.01'), output_field=hours_field),
+                hours_field,
+            ),
+            weekly_hours=_sum_or_zero(
+                F('work_arrangements__percentage') *
+                Value(Decimal(WorkArrangement.FULL_TIME_HOURS) /
+                      Decimal('100'), output_field=hours_field),
+                hours_field,
+            ),
+            monthly_cost=_sum_or_zero(
+                arrangement_pay(
+                    'work_arrangements__percentage',
+                    'work_arrangements__employee__hourly_rate',
+                    'work_arrangements__employee__is_team_leader',
+                ),
+                PAY_FIELD,
+            ),
+        )
+
 
 class Team(models.Model):
     """Represents a team in the company."""
     name = models.CharField(max_length=100)
 
+    objects = TeamQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
 
+class EmployeeQuerySet(TrackedQuerySet):
+    """QuerySet with database-side payroll helpers for employees."""
+    employee_field = 'pk'
+
+    def with_monthly_pay(self):
+        """Annotate each employee with ``monthly_pay`` computed in SQL,
+        the same value ``Employee.calculate_monthly_pay`` returns.
+        Employees without arrangements get 0."""
+        return self.annotate(
+            monthly_pay=_sum_or_zero(
+                arrangement_pay('work_arrangements__percentage',
+                                'hourly_rate', 'is_team_leader'),
+                PAY_FIELD,
+            )
+        )
+
+    def with_snapshot_pay(self):
+        """Annotate each employee with ``monthly_pay`` from its payroll
+        snapshot, computed in SQL like ``with_monthly_pay`` for employees
+        without one.
+
+        The fallback is a correlated subquery rather than a join, so
+        filters on other relations can't multiply the arrangements.
+        """
+        computed = WorkArrangement.objects.filter(
+            employee=OuterRef('pk')
+        ).values('employee').annotate(
+            pay=Sum(arrangement_pay('percentage', 'employee__hourly_rate',
+                                    'employee__is_team_leader'),
+                    output_field=PAY_FIELD)
+        ).values('pay')
+        return self.annotate(
+            monthly_pay=Coalesce(
+                'payroll_snapshot__monthly_pay', Subquery(computed),
+                Value(Decimal('0'), output_field=PAY_FIELD),
+                output_field=PAY_FIELD,
+            )
+        )
+
+
+def weekly_hours(percentage):
+    """Weekly hours of an arrangement at percentage of full time."""
+    return (percentage / 100) * WorkArrangement.FULL_TIME_HOURS
+
+
+def monthly_pay(hourly_rate, is_team_leader, percentages):
+    """Monthly pay, computed in Python, of an employee with arrangements
+    at the given percentages, with a 10% bonus for team leaders."""
+    total_pay = Decimal('0.00')
+    for percentage in percentages:
+        # Monthly hours based on percentage
+        hours_worked = (WorkArrangement.FULL_TIME_HOURS *
+                        (percentage / Decimal('100')) *
+                        Employee.WEEKS_PER_MONTH)
+        pay = Decimal(hourly_rate) * hours_worked
+        if is_team_leader:
+            pay *= Employee.LEADER_BONUS
+
+        total_pay += pay
+
+    return total_pay
+
+
 class Employee(models.Model):
     """Represents an employee in the company."""
+    WEEKS_PER_MONTH = 4
+    # 10% bonus for team leaders
+    LEADER_BONUS = Decimal('1.10')
+
     name = models.CharField(max_length=100)
     employee_id = models.CharField(max_length=10, unique=True)
     hourly_rate = models.DecimalField(max_digits=6, decimal_places=2)
     is_team_leader = models.BooleanField(default=False)
 
+    objects = EmployeeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Only a few employees lead a team, so only their rows are
+            # indexed for leader lookups
+            models.Index(fields=['is_team_leader'],
+                         condition=models.Q(is_team_leader=True),
+                         name='employee_team_leader_idx'),
+            models.Index(fields=['name'], name='employee_name_idx'),
+            # Hourly rate range filters
+            models.Index(fields=['hourly_rate'],
+                         name='employee_hourly_rate_idx'),
+        ]
+
     def calculate_monthly_pay(self):
         """Calculate monthly pay with a 10% bonus if
         the employee is a team leader."""
-        total_pay = Decimal('0.00')
-        for arrangement in self.work_arrangements.all():
-            # Monthly hours based on percentage
-            hours_worked = 40 * (arrangement.percentage / Decimal('100')) * 4
-            pay = Decimal(self.hourly_rate) * hours_worked
-            if self.is_team_leader:
-                pay *= Decimal('1.10')  # 10% bonus for team leaders
+        return monthly_pay(
+            self.hourly_rate, self.is_team_leader,
+            [arrangement.percentage
+             for arrangement in self.work_arrangements.all()],
+        )
 
-            total_pay += pay
+    def __str__(self):
+        return f"{self.name} ({self.employee_id})"
 
-        return total_pay
+
+class PayrollSnapshot(models.Model):
+    """Monthly pay of an employee, kept up to date on every write that
+    changes it, so reading it is a primary key lookup."""
+    employee = models.OneToOneField(Employee, primary_key=True,
+                                    related_name='payroll_snapshot',
+                                    on_delete=models.CASCADE)
+    monthly_pay = models.DecimalField(max_digits=14, decimal_places=6)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"{self.name} ({self.employee_id})"
+        return f"{self.employee_id}: {self.monthly_pay}"
+
+
+class PayrollRun(models.Model):
+    """The monthly pay of every employee for a month, computed by the
+    run_payroll command in chunks of ``chunk_size`` employees."""
+    month = models.DateField(unique=True)
+    chunk_size = models.PositiveIntegerField()
+    started_at = models.DateTimeField(auto_now_add=True)
+    # Set once every chunk is completed
+    completed_at = models.DateTimeField(null=True, blank=True)
+    employee_count = models.PositiveIntegerField(null=True, blank=True)
+    total_pay = models.DecimalField(max_digits=20, decimal_places=6,
+                                    null=True, blank=True)
+    # When the database snapshot the first completed chunks read was
+    # exported, None on databases without exported snapshots
+    snapshot_at = models.DateTimeField(null=True, blank=True)
+    # Set when chunks were computed on resume, from a later snapshot
+    # than the ones completed before
+    resumed = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"Payroll {self.month:%Y-%m}"
+
+
+class PayrollRunChunk(models.Model):
+    """The employees of a payroll run with ids from
+    ``first_employee_pk`` to ``last_employee_pk``, computed and stored in
+    one transaction."""
+    run = models.ForeignKey(PayrollRun, related_name='chunks',
+                            on_delete=models.CASCADE)
+    number = models.PositiveIntegerField()
+    first_employee_pk = models.BigIntegerField()
+    last_employee_pk = models.BigIntegerField()
+    completed_at = models.DateTimeField(null=True, blank=True)
+    employee_count = models.PositiveIntegerField(null=True, blank=True)
+    total_pay = models.DecimalField(max_digits=20, decimal_places=6,
+                                    null=True, blank=True)
+    # Time spent computing and storing the chunk
+    duration_ms = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['run', 'number'],
+                                    name='unique_payroll_run_chunk'),
+        ]
+
+    def __str__(self):
+        return f"{self.run} chunk {self.number}"
+
+
+class PayrollRunEntry(models.Model):
+    """Monthly pay of an employee in a payroll run, with the values it
+    was computed from. Kept when the employee is deleted."""
+    run = models.ForeignKey(PayrollRun, related_name='entries',
+                            on_delete=models.CASCADE)
+    employee = models.ForeignKey(Employee, null=True,
+                                 related_name='payroll_entries',
+                                 on_delete=models.SET_NULL)
+    employee_code = models.CharField(max_length=10)
+    hourly_rate = models.DecimalField(max_digits=6, decimal_places=2)
+    is_team_leader = models.BooleanField()
+    monthly_pay = models.DecimalField(max_digits=14, decimal_places=6)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['run', 'employee_code'],
+                                    name='unique_payroll_run_entry'),
+        ]
+
+    def __str__(self):
+        return f"{self.run}: {self.employee_code} {self.monthly_pay}"
+
+
+class TeamLeaderQuerySet(TrackedQuerySet):
+    """Keeps Employee.is_team_leader in sync for bulk writes, like
+    TeamLeader.save and TeamLeader.delete do for single rows."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        Employee.objects.filter(
+            pk__in=[obj.employee_id for obj in objs]
+        ).update(is_team_leader=True)
+        return objs
+
+    def delete(self):
+        employee_ids = self._employee_ids()
+        deleted = super().delete()
+        Employee.objects.filter(pk__in=employee_ids).update(
+            is_team_leader=False
+        )
+        return deleted
 
 
 class TeamLeader(models.Model):
@@ -44,6 +371,8 @@ class TeamLeader(models.Model):
     employee = models.OneToOneField(Employee, related_name='leader_info',
                                     on_delete=models.CASCADE)
 
+    objects = TeamLeaderQuerySet.as_manager()
+
     def save(self, *args, **kwargs):
         """Override save method to update employee's is_team_leader field."""
         self.employee.is_team_leader = True
@@ -67,6 +396,14 @@ class TeamEmployee(models.Model):
     employee = models.ForeignKey(Employee, related_name='team_membership',
                                  on_delete=models.CASCADE)
 
+    objects = TrackedQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['team', 'employee'],
+                                    name='unique_team_employee'),
+        ]
+
     def __str__(self):
         return f"{self.employee.name} in {self.team.name}"
 
@@ -83,24 +420,51 @@ class WorkArrangement(models.Model):
     # e.g., 75% for part-time
     percentage = models.PositiveIntegerField(default=100)
 
+    objects = TrackedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Arrangements of an employee, optionally in one team: the
+            # prefetches, the percentage cap and the payroll joins
+            models.Index(fields=['employee', 'team'],
+                         name='workarrangement_emp_team_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the employee, a save may move the arrangement to another
+        instance._loaded_employee_id = instance.__dict__.get('employee_id')
+        return instance
+
     def weekly_hours(self):
         """Calculate weekly hours based on the percentage of full-time work."""
-        return (self.percentage / 100) * self.FULL_TIME_HOURS
+        return weekly_hours(self.percentage)
 
     def save(self, *args, **kwargs):
-        # Exclude the current arrangement if it's being updated
-        other_arrangement = self.employee.work_arrangements.exclude(pk=self.pk)
+        with transaction.atomic():
+            # Lock the employee row, so concurrent saves for the same
+            # employee check the cap one after another
+            list(Employee.objects.select_for_update().filter(
+                pk=self.employee_id
+            ).values_list('pk', flat=True))
 
-        # Sum percentages of other work arrangements
-        total_percentage = sum(arrangement.percentage for
-                               arrangement in other_arrangement)
+            # Sum percentages of other work arrangements, excluding the
+            # current arrangement if it's being updated
+            total_percentage = WorkArrangement.objects.filter(
+                employee_id=self.employee_id
+            ).exclude(pk=self.pk).aggregate(
+                total=Coalesce(Sum('percentage'), 0)
+            )['total']
 
-        # Add the percentage of the current (new or updated) arrangement
-        total_percentage += self.percentage
+            # Add the percentage of the current (new or updated) arrangement
+            total_percentage += self.percentage
 
-        if total_percentage > 100:
-            raise ValidationError("Total work percentage cannot exceed 100%.")
-        super().save(*args, **kwargs)
+            if total_percentage > 100:
+                raise ValidationError(
+                    "Total work percentage cannot exceed 100%."
+                )
+            super().save(*args, **kwargs)
 
     def __str__(self):
         if self.percentage == 100:
@@ -0,0 +1,78 @@
+import functools
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson
+from drf_yasg.generators import OpenAPISchemaGenerator
+
+API_INFO = openapi.Info(
+    title="Employee Management Api",
+    default_version='v1',
+    description="API for employee management",
+    terms_of_service="https://www.google.com/policies/terms/",
+    contact=openapi.Contact(email="contact@hiew.local"),
+    license=openapi.License(name="BSD License"),
+)
+
+
+@functools.cache
+def code_version():
+    """APP_VERSION if the deployment sets one, otherwise a hash of the
+    project's Python sources."""
+    if settings.APP_VERSION:
+        return settings.APP_VERSION
+    digest = hashlib.sha256()
+    for path in sorted(Path(settings.BASE_DIR).rglob('*.py')):
+        digest.update(str(path.relative_to(settings.BASE_DIR)).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def schema_path(version=None):
+    return (Path(settings.OPENAPI_SCHEMA_DIR) /
+            f'openapi-{version or code_version()}.json')
+
+
+def generate_schema():
+    """Introspect every view and return the schema as JSON bytes."""
+    generator = OpenAPISchemaGenerator(API_INFO)
+    schema = generator.get_schema(request=None, public=True)
+    return OpenAPICodecJson(validators=[]).encode(schema)
+
+
+def write_schema():
+    """Generate the schema of the current code version and write it to
+    disk, returning the path written."""
+    path = schema_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Written next to the target and renamed, so concurrent workers never
+    # read a partial file
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as temp_file:
+        temp_file.write(generate_schema())
+    os.replace(temp_path, path)
+    return path
+
+
+def remove_stale_schemas():
+    """Delete schemas written for other code versions."""
+    current = schema_path()
+    for path in current.parent.glob('openapi-*.json'):
+        if path != current:
+            path.unlink()
+
+
+@functools.cache
+def load_schema():
+    """The schema of the current code version and its ETag, generated
+    and written on first use if no artifact exists yet."""
+    path = schema_path()
+    try:
+        content = path.read_bytes()
+    except FileNotFoundError:
+        content = write_schema().read_bytes()
+    return content, hashlib.sha256(content).hexdigest()
@@ -0,0 +1,114 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+class IdCursorPagination(CursorPagination):
+    """Keyset pagination ordered on the primary key.
+
+    Pages are fetched with ``WHERE id > <cursor>`` on the primary key
+    index, so deep pages cost the same as the first one. Rows inserted
+    while a client is paging get higher ids and never shift earlier pages.
+
+    DRF's paginate_queryset() is split in two around the query, so the
+    async views can run it with the async ORM.
+    """
+    ordering = 'id'
+    # Clients may ask for smaller or larger pages, up to max_page_size
+    page_size_query_param = 'page_size'
+
+    @property
+    def max_page_size(self):
+        return settings.API_MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+        return self.paginate_rows(list(page_queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() reading the page with the async ORM."""
+        page_queryset = self.page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+        return self.paginate_rows([row async for row in page_queryset])
+
+    def page_queryset(self, queryset, request, view=None):
+        """The rows of the page the cursor points to, plus the next one,
+        or None when pagination is off. Runs no query."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            offset, reverse, current_position = 0, False, None
+        else:
+            offset, reverse, current_position = self.cursor
+
+        # Cursor pagination always enforces an ordering
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        # A cursor with a fixed position filters on it
+        if current_position is not None:
+            order = self.ordering[0]
+            is_reversed = order.startswith('-')
+            order_attr = order.lstrip('-')
+            # (cursor reversed) XOR (queryset reversed)
+            if self.cursor.reverse != is_reversed:
+                kwargs = {order_attr + '__lt': current_position}
+            else:
+                kwargs = {order_attr + '__gt': current_position}
+            queryset = queryset.filter(**kwargs)
+
+        # One extra row tells whether another page follows
+        return queryset[offset:offset + self.page_size + 1]
+
+    def paginate_rows(self, results):
+        """The page out of the rows page_queryset() selected, setting the
+        positions of the next and previous links."""
+        if self.cursor is None:
+            offset, reverse, current_position = 0, False, None
+        else:
+            offset, reverse, current_position = self.cursor
+        self.page = list(results[:self.page_size])
+
+        # Position of the row following the page
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            # The query ran in reverse order, the page is put back in order
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        # Page controls in the browsable API when there is another page
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
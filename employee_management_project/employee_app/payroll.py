@@ -0,0 +1,261 @@
+import contextlib
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from decimal import Decimal
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .caching import bump_version
+from .models import (
+    Employee, PayrollRun, PayrollRunChunk, PayrollRunEntry, PayrollSnapshot,
+    WorkArrangement
+)
+from .workers import setup_worker
+
+# Employees recomputed per query by the full rebuild
+REBUILD_BATCH_SIZE = 2000
+
+# Employees computed and stored per transaction by a payroll run
+PAYROLL_CHUNK_SIZE = 1000
+
+PAY_QUANTUM = Decimal(1).scaleb(
+    -PayrollRunEntry._meta.get_field('monthly_pay').decimal_places
+)
+
+
+def _upsert_snapshots(employees):
+    """Write the monthly pay of employees to their snapshots with one
+    ``INSERT ... SELECT ... ON CONFLICT``, without loading any rows.
+
+    Both PostgreSQL and SQLite support the statement. The pay is the
+    ``with_monthly_pay`` annotation, as the API computes it.
+    """
+    select_sql, params = employees.with_monthly_pay().values_list(
+        'pk', 'monthly_pay'
+    ).query.sql_with_params()
+    quote = connection.ops.quote_name
+    meta = PayrollSnapshot._meta
+    employee = quote(meta.get_field('employee').column)
+    monthly_pay = quote(meta.get_field('monthly_pay').column)
+    updated_at = quote(meta.get_field('updated_at').column)
+    # WHERE TRUE keeps SQLite from parsing ON CONFLICT as a join clause
+    sql = (
+        f'INSERT INTO {quote(meta.db_table)} '
+        f'({employee}, {monthly_pay}, {updated_at}) '
+        f'SELECT pay.*, %s FROM ({select_sql}) pay WHERE TRUE '
+        f'ON CONFLICT ({employee}) DO UPDATE SET '
+        f'{monthly_pay} = EXCLUDED.{monthly_pay}, '
+        f'{updated_at} = EXCLUDED.{updated_at}'
+    )
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        cursor.execute(sql, (now, *params))
+        return cursor.rowcount
+
+
+def refresh_payroll_snapshots(employee_ids):
+    """Recompute the payroll snapshots of the given employees.
+
+    Each REBUILD_BATCH_SIZE employees are recomputed and written by a
+    single statement. Ids of employees that no longer exist are ignored.
+    """
+    employee_ids = sorted({pk for pk in employee_ids if pk is not None})
+    if not employee_ids:
+        return 0
+    refreshed = 0
+    for start in range(0, len(employee_ids), REBUILD_BATCH_SIZE):
+        refreshed += _upsert_snapshots(Employee.objects.filter(
+            pk__in=employee_ids[start:start + REBUILD_BATCH_SIZE]
+        ))
+    bump_version(PayrollSnapshot)
+    return refreshed
+
+
+def rebuild_payroll_snapshots(batch_size=REBUILD_BATCH_SIZE):
+    """Recompute the snapshot of every employee, batch_size at a time."""
+    refreshed = 0
+    last_pk = 0
+    while True:
+        batch = list(Employee.objects.filter(pk__gt=last_pk).order_by(
+            'pk'
+        ).values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return refreshed
+        with transaction.atomic():
+            refreshed += refresh_payroll_snapshots(batch)
+        last_pk = batch[-1]
+
+
+def diff_payroll_snapshots(chunk_size=REBUILD_BATCH_SIZE):
+    """Yield ``(employee, snapshot_pay, expected_pay)`` for every employee
+    whose snapshot is missing (``snapshot_pay`` is None) or differs from
+    ``Employee.calculate_monthly_pay``."""
+    employees = Employee.objects.select_related(
+        'payroll_snapshot'
+    ).prefetch_related('work_arrangements').order_by('pk')
+    for employee in employees.iterator(chunk_size=chunk_size):
+        expected = employee.calculate_monthly_pay()
+        try:
+            snapshot_pay = employee.payroll_snapshot.monthly_pay
+        except PayrollSnapshot.DoesNotExist:
+            snapshot_pay = None
+        if snapshot_pay != expected:
+            yield employee, snapshot_pay, expected
+
+
+def start_payroll_run(month, chunk_size=PAYROLL_CHUNK_SIZE):
+    """Create the payroll run of month with its chunks: consecutive
+    ranges of chunk_size employee ids, found with keyset pagination.
+
+    Employees created afterwards have higher ids and are left out.
+    """
+    with transaction.atomic():
+        run = PayrollRun.objects.create(month=month, chunk_size=chunk_size)
+        chunks = []
+        last_pk = 0
+        while True:
+            batch = list(Employee.objects.filter(pk__gt=last_pk).order_by(
+                'pk'
+            ).values_list('pk', flat=True)[:chunk_size])
+            if not batch:
+                break
+            chunks.append(PayrollRunChunk(
+                run=run, number=len(chunks) + 1,
+                first_employee_pk=batch[0], last_employee_pk=batch[-1],
+            ))
+            last_pk = batch[-1]
+        PayrollRunChunk.objects.bulk_create(chunks)
+    return run
+
+
+@contextlib.contextmanager
+def exported_snapshot():
+    """Yield the id of a snapshot of the database that other sessions
+    can read from with ``SET TRANSACTION SNAPSHOT``, or None when the
+    database isn't PostgreSQL.
+
+    The snapshot is exported by a transaction held open on a connection
+    of its own until the block ends.
+    """
+    if connection.vendor != 'postgresql':
+        yield None
+        return
+    exporter = connections.create_connection(DEFAULT_DB_ALIAS)
+    try:
+        exporter.set_autocommit(False)
+        with exporter.cursor() as cursor:
+            cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+            cursor.execute('SELECT pg_export_snapshot()')
+            yield cursor.fetchone()[0]
+    finally:
+        exporter.close()
+
+
+def compute_payroll_chunk(chunk_pk, snapshot=None):
+    """Compute the monthly pay of the employees in a payroll run chunk
+    with ``Employee.calculate_monthly_pay`` and store it, in a single
+    transaction. Completed chunks are left as they are.
+
+    With a snapshot id from exported_snapshot(), employees are read as
+    they were in the snapshot. The snapshot has to be set by the first
+    statements of a transaction, so it can't be used inside an atomic
+    block. Runs in the payroll worker processes.
+    """
+    if snapshot is not None and connection.in_atomic_block:
+        raise transaction.TransactionManagementError(
+            'compute_payroll_chunk() reads a snapshot in a transaction of '
+            'its own and cannot be called inside an atomic block'
+        )
+    started = time.perf_counter()
+    with transaction.atomic():
+        if snapshot is not None:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ'
+                )
+                cursor.execute('SET TRANSACTION SNAPSHOT %s', [snapshot])
+        chunk = PayrollRunChunk.objects.select_for_update().get(pk=chunk_pk)
+        if chunk.completed_at is not None:
+            return chunk
+        employees = Employee.objects.filter(pk__range=(
+            chunk.first_employee_pk, chunk.last_employee_pk
+        )).prefetch_related(Prefetch(
+            'work_arrangements',
+            queryset=WorkArrangement.objects.order_by('pk'),
+        )).order_by('pk')
+        entries = PayrollRunEntry.objects.bulk_create(
+            PayrollRunEntry(
+                run_id=chunk.run_id, employee=employee,
+                employee_code=employee.employee_id,
+                hourly_rate=employee.hourly_rate,
+                is_team_leader=employee.is_team_leader,
+                # Rounded as stored, so the chunk total adds up
+                monthly_pay=employee.calculate_monthly_pay().quantize(
+                    PAY_QUANTUM
+                ),
+            )
+            for employee in employees
+        )
+        chunk.employee_count = len(entries)
+        chunk.total_pay = sum(entry.monthly_pay for entry in entries)
+        chunk.completed_at = timezone.now()
+        chunk.duration_ms = (time.perf_counter() - started) * 1000
+        chunk.save(update_fields=['employee_count', 'total_pay',
+                                  'completed_at', 'duration_ms'])
+    return chunk
+
+
+def run_payroll(run, workers=1, progress=None):
+    """Compute the chunks of run not completed yet and complete it.
+
+    On PostgreSQL the chunks are computed by workers processes reading
+    one exported snapshot, so every chunk sees the same data. Other
+    databases compute them one after the other. progress is called with
+    each chunk as it completes. A run that stops keeps its completed
+    chunks, calling this again computes the others, from a new snapshot:
+    the run is then marked ``resumed``, and ``snapshot_at`` stays the
+    time of the snapshot the chunks completed first read.
+    """
+    pending = list(run.chunks.filter(completed_at__isnull=True).order_by(
+        'number'
+    ).values_list('pk', flat=True))
+    progress = progress or (lambda chunk: None)
+    with exported_snapshot() as snapshot:
+        if pending:
+            if run.chunks.filter(completed_at__isnull=False).exists():
+                run.resumed = True
+            else:
+                run.snapshot_at = timezone.now() if snapshot else None
+            run.save(update_fields=['snapshot_at', 'resumed'])
+        if snapshot is None or workers <= 1:
+            for chunk_pk in pending:
+                progress(compute_payroll_chunk(chunk_pk, snapshot))
+        elif pending:
+            # Spawned workers open their own connections instead of
+            # sharing the ones inherited from a forked parent
+            with ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context('spawn'),
+                initializer=setup_worker,
+                initargs=(connection.settings_dict['NAME'],),
+            ) as executor:
+                futures = [
+                    executor.submit(compute_payroll_chunk, chunk_pk,
+                                    snapshot)
+                    for chunk_pk in pending
+                ]
+                try:
+                    for future in as_completed(futures):
+                        progress(future.result())
+                except BaseException:
+                    executor.shutdown(cancel_futures=True)
+                    raise
+
+    totals = list(run.chunks.values_list('employee_count', 'total_pay'))
+    run.employee_count = sum(count for count, _ in totals)
+    run.total_pay = sum(pay for _, pay in totals)
+    run.completed_at = timezone.now()
+    run.save(update_fields=['employee_count', 'total_pay', 'completed_at'])
+    return run
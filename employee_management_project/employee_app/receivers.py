@@ -0,0 +1,59 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import bump_version
+from .models import (
+    Employee, Team, TeamEmployee, TeamLeader, WorkArrangement
+)
+from .payroll import refresh_payroll_snapshots
+from .signals import rows_changed
+
+
+def _deleted_with_employee(origin):
+    """Whether a post_delete comes from deleting the employee itself,
+    whose snapshot is deleted along with it."""
+    model = getattr(origin, 'model', type(origin))
+    return model is Employee
+
+
+@receiver(post_save, sender=Employee)
+def refresh_employee_payroll(sender, instance, **kwargs):
+    refresh_payroll_snapshots([instance.pk])
+    # Drop the pay loaded with the instance, by select_related or
+    # with_snapshot_pay(), it's stale now
+    instance._state.fields_cache.pop('payroll_snapshot', None)
+    instance.__dict__.pop('monthly_pay', None)
+
+
+@receiver(post_save, sender=WorkArrangement)
+def refresh_arrangement_payroll(sender, instance, **kwargs):
+    # The employee it was loaded with, if the save moved the arrangement
+    previous_employee_id = getattr(instance, '_loaded_employee_id', None)
+    refresh_payroll_snapshots([instance.employee_id, previous_employee_id])
+    instance._loaded_employee_id = instance.employee_id
+
+
+@receiver(post_delete, sender=WorkArrangement)
+def refresh_deleted_arrangement_payroll(sender, instance, origin=None,
+                                        **kwargs):
+    if not _deleted_with_employee(origin):
+        refresh_payroll_snapshots([instance.employee_id])
+
+
+@receiver(rows_changed)
+def refresh_bulk_payroll(sender, employee_ids, **kwargs):
+    if sender in (Employee, WorkArrangement):
+        refresh_payroll_snapshots(employee_ids)
+
+
+def bump_model_version(sender, **kwargs):
+    bump_version(sender)
+
+
+# Every write to a model invalidates the responses cached from it
+for model in (Employee, Team, TeamLeader, TeamEmployee, WorkArrangement):
+    post_save.connect(bump_model_version, sender=model,
+                      dispatch_uid=f'bump_version_{model.__name__}_save')
+    post_delete.connect(bump_model_version, sender=model,
+                        dispatch_uid=f'bump_version_{model.__name__}_delete')
+rows_changed.connect(bump_model_version, dispatch_uid='bump_version_rows')
@@ -0,0 +1,87 @@
+import decimal
+import io
+import math
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Floats Python's json writes without an exponent. orjson writes the
+# others differently (1e16 instead of 1e+16).
+PLAIN_FLOAT_RANGE = (1e-4, 1e16)
+
+_encoder = JSONEncoder()
+
+
+def _default(obj):
+    """Encode what orjson doesn't know the way DRF's encoder does.
+    Decimals written differently from it are refused."""
+    value = _encoder.default(obj)
+    if isinstance(obj, decimal.Decimal):
+        # DRF writes Decimals as floats
+        if not math.isfinite(value) or (
+            value and not PLAIN_FLOAT_RANGE[0] <= abs(value)
+            < PLAIN_FLOAT_RANGE[1]
+        ):
+            raise TypeError(f'{obj} has no plain float representation')
+    return value
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer writing with orjson when it is installed.
+
+    The output is the same bytes as JSONRenderer's, Decimals included.
+    Indented output, non-default JSON settings and values orjson can't
+    write the same way (big integers, non-string keys, extreme Decimals)
+    fall back to JSONRenderer, as does everything when orjson is
+    missing. Float NaN and infinity, which JSONRenderer refuses, are
+    written as null.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or not self.compact or
+                self.ensure_ascii or not api_settings.STRICT_JSON or
+                self.get_indent(accepted_media_type or '',
+                                renderer_context or {})):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        try:
+            content = orjson.dumps(
+                data, default=_default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        # Escaped by JSONRenderer for JavaScript, which can't have them
+        # in string literals
+        if b'\xe2\x80\xa8' in content or b'\xe2\x80\xa9' in content:
+            content = content.replace(
+                b'\xe2\x80\xa8', b'\\u2028'
+            ).replace(b'\xe2\x80\xa9', b'\\u2029')
+        return content
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser reading UTF-8 bodies with orjson when it is installed.
+
+    Bodies orjson rejects are parsed again by JSONParser, so errors are
+    reported the same way.
+    """
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        content = stream.read()
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(content), media_type,
+                                 parser_context)
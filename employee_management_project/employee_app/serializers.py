@@ -2,16 +2,83 @@ from rest_framework import serializers
 from .models import Employee, Team, TeamLeader, TeamEmployee, WorkArrangement
 
 
-class TeamSerializer(serializers.ModelSerializer):
+def parse_field_list(value):
+    """Field names in a comma separated query parameter, None when the
+    parameter is missing."""
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+class DynamicFieldsMixin:
+    """Let callers choose the fields a serializer renders.
+
+    ``fields`` keeps only the named fields. ``expand`` renders the named
+    ``expandable_fields``, foreign keys otherwise rendered as a primary
+    key, as nested objects. Fields left out are never computed, so their
+    related rows need not be loaded either.
+    """
+    # Foreign key field name: serializer rendering the related object
+    expandable_fields = {}
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.expanded = set(expand or ())
+        self.check_names('expand', self.expanded, self.expandable_fields)
+        if fields is not None:
+            self.check_names('fields', fields, self.fields)
+            for name in set(self.fields) - set(fields) - self.expanded:
+                self.fields.pop(name)
+        for name in self.expanded:
+            self.fields[name] = self.expandable_fields[name](read_only=True)
+
+    @staticmethod
+    def check_names(parameter, names, choices):
+        unknown = sorted(set(names) - set(choices))
+        if unknown:
+            raise serializers.ValidationError({parameter: [
+                f'Unknown field {", ".join(unknown)}. '
+                f'Choose from {", ".join(choices) or "none"}.'
+            ]})
+
+
+class TeamSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for Team model."""
     class Meta:
         model = Team
         fields = ['id', 'name']
 
 
-class WorkArrangementSerializer(serializers.ModelSerializer):
+class EmployeeSummarySerializer(serializers.ModelSerializer):
+    """Identifying fields of an employee, for expanded relations."""
+    class Meta:
+        model = Employee
+        fields = ['id', 'name', 'employee_id']
+
+
+class TeamCostSerializer(serializers.ModelSerializer):
+    """Read-only serializer for a team's labour cost rollup."""
+    # Computed in SQL by Team.objects.with_cost_rollup()
+    headcount = serializers.ReadOnlyField()
+    fte = serializers.ReadOnlyField()
+    weekly_hours = serializers.ReadOnlyField()
+    monthly_cost = serializers.ReadOnlyField()
+
+    class Meta:
+        model = Team
+        fields = ['id', 'name', 'headcount', 'fte', 'weekly_hours',
+                  'monthly_cost']
+        read_only_fields = fields
+
+
+class WorkArrangementSerializer(DynamicFieldsMixin,
+                                serializers.ModelSerializer):
     """Serializer for WorkArrangement model."""
     weekly_hours = serializers.SerializerMethodField()
+    expandable_fields = {
+        'employee': EmployeeSummarySerializer,
+        'team': TeamSerializer,
+    }
 
     class Meta:
         model = WorkArrangement
@@ -22,7 +89,7 @@ class WorkArrangementSerializer(serializers.ModelSerializer):
         return obj.weekly_hours()
 
 
-class EmployeeSerializer(serializers.ModelSerializer):
+class EmployeeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for Employee model."""
     # Method field to get teams
     teams = serializers.SerializerMethodField()
@@ -40,6 +107,15 @@ class EmployeeSerializer(serializers.ModelSerializer):
         ]
 
     def get_monthly_pay(self, obj):
+        # Prefer the value annotated by Employee.objects.with_monthly_pay()
+        # or with_snapshot_pay() when the queryset has it
+        monthly_pay = getattr(obj, 'monthly_pay', None)
+        if monthly_pay is not None:
+            return monthly_pay
+        # Then the snapshot kept up to date on every write
+        snapshot = getattr(obj, 'payroll_snapshot', None)
+        if snapshot is not None:
+            return snapshot.monthly_pay
         # Assuming a standard of 160 working hours per month
         # (40h/week * 4 weeks)
         return obj.calculate_monthly_pay()
@@ -55,19 +131,39 @@ class EmployeeSerializer(serializers.ModelSerializer):
         ]
 
 
-class TeamLeaderSerializer(serializers.ModelSerializer):
+class PayrollSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """Read-only serializer for the monthly payroll listing."""
+    # Computed in SQL by Employee.objects.with_monthly_pay()
+    monthly_pay = serializers.ReadOnlyField()
+
+    class Meta:
+        model = Employee
+        fields = [
+            'id', 'name', 'employee_id', 'hourly_rate',
+            'is_team_leader', 'monthly_pay'
+        ]
+        read_only_fields = fields
+
+
+class TeamLeaderSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for TeamLeader model."""
     # Nested employee details
     employee_details = EmployeeSerializer(source='employee',
                                           read_only=True)
+    expandable_fields = {'employee': EmployeeSummarySerializer}
 
     class Meta:
         model = TeamLeader
         fields = ['id', 'employee', 'employee_details']
 
 
-class TeamEmployeeSerializer(serializers.ModelSerializer):
+class TeamEmployeeSerializer(DynamicFieldsMixin,
+                             serializers.ModelSerializer):
     """Serializer for TeamEmployee model."""
+    expandable_fields = {
+        'employee': EmployeeSummarySerializer,
+        'team': TeamSerializer,
+    }
     # Read-only employee name
     employee_name = serializers.ReadOnlyField(source='employee.name')
     # Read-only team name
@@ -0,0 +1,40 @@
+import contextlib
+import contextvars
+
+from django.dispatch import Signal
+
+# Sent by the employee_app querysets after writes that skip Model.save()
+# and Model.delete(): update(), bulk_create() and bulk_update().
+# Arguments: sender (the model class) and employee_ids, the set of
+# employees whose rows changed (empty for models not tied to employees).
+rows_changed = Signal()
+
+# Changes collected by defer_rows_changed, per sender
+_deferred_changes = contextvars.ContextVar('deferred_rows_changed',
+                                           default=None)
+
+
+def send_rows_changed(sender, employee_ids):
+    """Send rows_changed, or collect it inside defer_rows_changed."""
+    deferred = _deferred_changes.get()
+    if deferred is None:
+        rows_changed.send(sender=sender, employee_ids=employee_ids)
+    else:
+        deferred.setdefault(sender, set()).update(employee_ids)
+
+
+@contextlib.contextmanager
+def defer_rows_changed():
+    """Send rows_changed once per model when the block exits, instead of
+    after every bulk write inside it. Nothing is sent if it raises."""
+    if _deferred_changes.get() is not None:
+        yield
+        return
+    deferred = {}
+    token = _deferred_changes.set(deferred)
+    try:
+        yield
+    finally:
+        _deferred_changes.reset(token)
+    for sender, employee_ids in deferred.items():
+        rows_changed.send(sender=sender, employee_ids=employee_ids)
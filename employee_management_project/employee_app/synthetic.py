@@ -0,0 +1,196 @@
+import math
+import random
+from decimal import Decimal
+
+from django.db import transaction
+
+from .models import Employee, Team, TeamEmployee, TeamLeader, WorkArrangement
+from .signals import defer_rows_changed
+
+# Rows inserted per bulk_create statement
+SEED_BATCH_SIZE = 2000
+
+# Each arrangement is at least this many percent, in steps of it
+PERCENTAGE_STEP = 5
+
+# Most employees work full time, the rest one of these percentages
+PART_TIME_PERCENTAGES = [50, 60, 75, 80, 90]
+FULL_TIME_SHARE = 0.75
+
+DEPARTMENTS = ['Engineering', 'Sales', 'Support', 'Finance', 'Marketing',
+               'Operations', 'Research', 'Design', 'Legal', 'People']
+FIRST_NAMES = ['Alice', 'Bob', 'Chen', 'Dara', 'Elena', 'Farid', 'Grace',
+               'Hiro', 'Ines', 'Jonas', 'Kemi', 'Liam', 'Maya', 'Noor',
+               'Omar', 'Priya', 'Quinn', 'Rosa', 'Sven', 'Tariq']
+LAST_NAMES = ['Tan', 'Smith', 'Garcia', 'Lim', 'Okafor', 'Novak', 'Khan',
+              'Lee', 'Silva', 'Muller', 'Wong', 'Haddad', 'Ito', 'Brown']
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _bulk_create(model, objs, batch_size):
+    """bulk_create objs one batch per call, so the payroll refresh each
+    bulk write triggers stays within the database's parameter limits."""
+    created = []
+    for batch in _batches(objs, batch_size):
+        created += model.objects.bulk_create(batch)
+    return created
+
+
+def create_employees(count, prefix='S', start=0,
+                     batch_size=SEED_BATCH_SIZE):
+    """Create count employees with ids prefix followed by a number."""
+    return _bulk_create(Employee, [
+        Employee(name=f'Employee {prefix}{index}',
+                 employee_id=f'{prefix}{index:08}',
+                 hourly_rate=Decimal('20.00') + index % 30)
+        for index in range(start, start + count)
+    ], batch_size)
+
+
+def _split_percentage(rng, total, parts):
+    """Split total into parts random multiples of PERCENTAGE_STEP."""
+    units = total // PERCENTAGE_STEP
+    cuts = sorted(rng.sample(range(1, units), parts - 1))
+    return [(end - start) * PERCENTAGE_STEP
+            for start, end in zip([0] + cuts, cuts + [units])]
+
+
+def _arrangement_counts(rng, employees, arrangements, most):
+    """How many arrangements each employee gets: one each (or a random
+    subset with one when there are fewer arrangements than employees),
+    extras spread at random, at most most per employee."""
+    if arrangements <= employees:
+        counts = [0] * employees
+        for index in rng.sample(range(employees), arrangements):
+            counts[index] = 1
+        return counts
+    counts = [1] * employees
+    for index in rng.choices(range(employees), k=arrangements - employees):
+        counts[index] += 1
+    # Hand arrangements above the limit to employees with room left
+    spill = sum(max(0, count - most) for count in counts)
+    counts = [min(count, most) for count in counts]
+    order = list(range(employees))
+    rng.shuffle(order)
+    while spill:
+        for index in order:
+            if spill and counts[index] < most:
+                counts[index] += 1
+                spill -= 1
+    return counts
+
+
+def generate_company(teams, employees, leaders=None, memberships=None,
+                     arrangements=None, seed=0, batch_size=SEED_BATCH_SIZE):
+    """Insert a synthetic company, the same one for the same arguments.
+
+    Team sizes are skewed, a few teams are much larger than the rest.
+    Hourly rates are log-normal around 30. Every employee's arrangements
+    are in distinct teams, the first one in their home team, and add up
+    to 100% (or a part-time percentage) at most.
+
+    ``leaders`` defaults to one per team, ``memberships`` to one per
+    employee (their home team) and ``arrangements`` to 1.2 per employee.
+    Raises ValueError when the sizes can't be satisfied.
+    """
+    leaders = min(teams, employees) if leaders is None else leaders
+    memberships = employees if memberships is None else memberships
+    if arrangements is None:
+        arrangements = round(employees * 1.2) if teams > 1 else employees
+    most_arrangements = min(teams, 100 // PERCENTAGE_STEP)
+    if teams < 1 or employees < 1:
+        raise ValueError('At least one team and one employee are needed.')
+    if leaders > employees:
+        raise ValueError('There are more leaders than employees.')
+    if memberships > employees * teams:
+        raise ValueError('Every employee can join each team only once, '
+                         f'at most {employees * teams} memberships.')
+    if arrangements > employees * most_arrangements:
+        raise ValueError(
+            f'At most {most_arrangements} arrangements per employee fit '
+            'in distinct teams and 100%, at most '
+            f'{employees * most_arrangements} arrangements.'
+        )
+
+    rng = random.Random(seed)
+    team_weights = [rng.paretovariate(1.5) for _ in range(teams)]
+    home_teams = rng.choices(range(teams), team_weights, k=employees)
+    leader_indexes = set(rng.sample(range(employees), leaders))
+
+    team_rows = [
+        Team(name=f'{DEPARTMENTS[index % len(DEPARTMENTS)]} {index + 1}')
+        for index in range(teams)
+    ]
+    employee_rows = [
+        Employee(
+            name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            employee_id=f'S{index:08}',
+            hourly_rate=Decimal(min(150.0, max(
+                15.0, rng.lognormvariate(math.log(30), 0.35)
+            ))).quantize(Decimal('0.01')),
+            is_team_leader=index in leader_indexes,
+        )
+        for index in range(employees)
+    ]
+
+    arrangement_pairs = []
+    counts = _arrangement_counts(rng, employees, arrangements,
+                                 most_arrangements)
+    for index, count in enumerate(counts):
+        if not count:
+            continue
+        home = home_teams[index]
+        others = [team for team in rng.sample(range(teams), count)
+                  if team != home][:count - 1] if count > 1 else []
+        total = (100 if rng.random() < FULL_TIME_SHARE
+                 else rng.choice(PART_TIME_PERCENTAGES))
+        if total < count * PERCENTAGE_STEP:
+            total = 100
+        for team, percentage in zip(
+            [home] + others, _split_percentage(rng, total, count)
+        ):
+            arrangement_pairs.append((index, team, percentage))
+
+    # Home teams first, then extra memberships in other teams
+    if memberships <= employees:
+        member_pairs = {(index, home_teams[index])
+                        for index in rng.sample(range(employees),
+                                                memberships)}
+    else:
+        member_pairs = set(enumerate(home_teams))
+    while len(member_pairs) < memberships:
+        member_pairs.add((rng.randrange(employees), rng.randrange(teams)))
+
+    # Payroll snapshots are computed once at the end, not per batch
+    with transaction.atomic(), defer_rows_changed():
+        team_rows = _bulk_create(Team, team_rows, batch_size)
+        employee_rows = _bulk_create(Employee, employee_rows, batch_size)
+        # Plain ids, assigning instances costs more than the insert
+        team_ids = [team.pk for team in team_rows]
+        employee_ids = [employee.pk for employee in employee_rows]
+        _bulk_create(WorkArrangement, [
+            WorkArrangement(employee_id=employee_ids[index],
+                            team_id=team_ids[team], percentage=percentage)
+            for index, team, percentage in arrangement_pairs
+        ], batch_size)
+        _bulk_create(TeamLeader, [
+            TeamLeader(employee_id=employee_ids[index])
+            for index in sorted(leader_indexes)
+        ], batch_size)
+        _bulk_create(TeamEmployee, [
+            TeamEmployee(employee_id=employee_ids[index],
+                         team_id=team_ids[team])
+            for index, team in sorted(member_pairs)
+        ], batch_size)
+
+    return {
+        'teams': teams,
+        'employees': employees,
+        'leaders': leaders,
+        'memberships': memberships,
+        'arrangements': len(arrangement_pairs),
+    }
@@ -1,11 +1,47 @@
+import csv
+import datetime
+import io
+import json
+import tempfile
+import threading
 from decimal import Decimal
-from django.db import IntegrityError
+from pathlib import Path
+from unittest import mock, skipUnless
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, Sum
 from django.forms import ValidationError
-from django.test import TestCase
-
+from django.http import HttpResponse
+from django.test import (
+    AsyncClient, RequestFactory, SimpleTestCase, TestCase,
+    TransactionTestCase, override_settings, skipUnlessDBFeature
+)
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from employee_app import openapi
+from employee_app.db_routers import (
+    PIN_COOKIE, ReplicaRouter, ReplicaRoutingMiddleware, read_from_replica
+)
+from employee_app.exports import iter_export
+from employee_app.filters import EmployeeFilter
+from employee_app.hr_import import FeedError, import_hr_feed
 from employee_app.models import (
-    Employee, Team, TeamLeader, TeamEmployee, WorkArrangement
+    Employee, PayrollRun, PayrollRunEntry, PayrollSnapshot, Team,
+    TeamLeader, TeamEmployee, WorkArrangement
 )
+from employee_app import payroll
+from employee_app.payroll import diff_payroll_snapshots
+from employee_app.renderers import FastJSONParser, FastJSONRenderer
+from employee_app.signals import rows_changed
+from employee_app.synthetic import generate_company
 from employee_app.serializers import (
     EmployeeSerializer, TeamSerializer, WorkArrangementSerializer,
     TeamLeaderSerializer, TeamEmployeeSerializer
@@ -212,6 +248,22 @@ class TeamEmployeeModelTest(TestCase):
             is_team_leader=False
         )
 
+    def test_employee_joins_team_once(self):
+        """Ensure an employee can't be added to the same team twice"""
+        TeamEmployee.objects.create(team=self.team, employee=self.employee)
+        with self.assertRaises(IntegrityError):
+            TeamEmployee.objects.create(team=self.team,
+                                        employee=self.employee)
+
+    def test_serializer_rejects_duplicate_membership(self):
+        """Ensure the API answers a duplicate with a validation error"""
+        TeamEmployee.objects.create(team=self.team, employee=self.employee)
+        serializer = TeamEmployeeSerializer(data={
+            'team': self.team.id, 'employee': self.employee.id
+        })
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('non_field_errors', serializer.errors)
+
     def test_create_team_employee(self):
         """Ensure that a TeamEmployee instance can be created successfully."""
         team_employee = TeamEmployee.objects.create(team=self.team,
@@ -571,3 +623,1917 @@ class TeamEmployeeSerializerTest(TestCase):
             'employee_name': self.employee.name
         }
         self.assertEqual(serializer.data, expected_data)
+
+
+class PayrollAnnotationTest(TestCase):
+    """Test suite to verify the SQL monthly pay annotation."""
+    def setUp(self):
+        self.team = Team.objects.create(name='Development')
+        self.second_team = Team.objects.create(name='DevOps')
+        self.full_timer = Employee.objects.create(
+            name='John Doe',
+            employee_id='E17006840',
+            hourly_rate=25.00,
+            is_team_leader=False
+        )
+        self.leader = Employee.objects.create(
+            name='Jane Doe',
+            employee_id='E17006841',
+            hourly_rate=Decimal('21.33'),
+            is_team_leader=True
+        )
+        self.without_arrangement = Employee.objects.create(
+            name='Bob Helen',
+            employee_id='E17006842',
+            hourly_rate=Decimal('19.99'),
+            is_team_leader=False
+        )
+        WorkArrangement.objects.create(employee=self.full_timer,
+                                       percentage=100, team=self.team)
+        WorkArrangement.objects.create(employee=self.leader,
+                                       percentage=33, team=self.team)
+        WorkArrangement.objects.create(employee=self.leader,
+                                       percentage=45, team=self.second_team)
+
+    def test_annotation_matches_calculate_monthly_pay(self):
+        # Every employee gets the same value as the python calculation
+        for employee in Employee.objects.with_monthly_pay():
+            self.assertEqual(employee.monthly_pay,
+                             employee.calculate_monthly_pay())
+
+    def test_annotation_without_arrangement_is_zero(self):
+        employee = Employee.objects.with_monthly_pay().get(
+            pk=self.without_arrangement.pk
+        )
+        self.assertEqual(employee.monthly_pay, Decimal('0.00'))
+
+    def test_annotation_is_single_query(self):
+        # All employees are computed in one aggregate query
+        with self.assertNumQueries(1):
+            list(Employee.objects.with_monthly_pay())
+
+    def test_employee_serializer_uses_annotation(self):
+        employee = Employee.objects.with_monthly_pay().get(pk=self.leader.pk)
+        serializer = EmployeeSerializer(employee)
+        # Serializing the annotated pay does not query work arrangements
+        with self.assertNumQueries(2):
+            data = serializer.data
+        self.assertEqual(data['monthly_pay'],
+                         self.leader.calculate_monthly_pay())
+
+
+class PayrollEndpointTest(TestCase):
+    """Test suite to verify the payroll endpoint."""
+    def setUp(self):
+        self.team = Team.objects.create(name='Development')
+        self.employee = Employee.objects.create(
+            name='John Doe',
+            employee_id='E17006840',
+            hourly_rate=30.00,
+            is_team_leader=True
+        )
+        WorkArrangement.objects.create(employee=self.employee,
+                                       percentage=75, team=self.team)
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user('payroll', password='pw')
+        )
+
+    def test_payroll_list(self):
+        response = self.client.get('/payroll/')
+        self.assertEqual(response.status_code, 200)
+        payroll = response.data['results']
+        self.assertEqual(payroll[0]['employee_id'], 'E17006840')
+        self.assertEqual(payroll[0]['monthly_pay'],
+                         self.employee.calculate_monthly_pay())
+
+    def test_payroll_is_read_only(self):
+        response = self.client.post('/payroll/', {'name': 'Jane Doe'})
+        self.assertEqual(response.status_code, 405)
+
+
+class ListQueryCountTest(TestCase):
+    """Test that list endpoints use a fixed number of queries,
+    no matter how many rows they serialize."""
+    LIST_URLS = [
+        '/employees/', '/teams/', '/team-leaders/', '/team-employees/',
+        '/work-arrangements/', '/payroll/',
+    ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user('reader', password='pw')
+        )
+
+    def grow_company(self, size):
+        """Bulk create rows for every model until there are size of each"""
+        start = Employee.objects.count()
+        teams = Team.objects.bulk_create(
+            Team(name=f'Team {index}') for index in range(start, size)
+        )
+        employees = Employee.objects.bulk_create(
+            Employee(name=f'Employee {index}', employee_id=f'E{index}',
+                     hourly_rate=Decimal('20.00'),
+                     is_team_leader=index % 10 == 0)
+            for index in range(start, size)
+        )
+        TeamLeader.objects.bulk_create(
+            TeamLeader(employee=employee) for employee in employees
+            if employee.is_team_leader
+        )
+        TeamEmployee.objects.bulk_create(
+            TeamEmployee(team=team, employee=employee)
+            for team, employee in zip(teams, employees)
+        )
+        WorkArrangement.objects.bulk_create(
+            WorkArrangement(team=team, employee=employee, percentage=80)
+            for team, employee in zip(teams, employees)
+        )
+
+    def count_list_queries(self):
+        """Request every list endpoint and count the queries it ran"""
+        counts = {}
+        for url in self.LIST_URLS:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            counts[url] = len(queries)
+        return counts
+
+    def test_list_query_count_is_constant(self):
+        self.grow_company(10)
+        small_counts = self.count_list_queries()
+        self.grow_company(1000)
+        large_counts = self.count_list_queries()
+        for url in self.LIST_URLS:
+            with self.subTest(url=url):
+                self.assertEqual(small_counts[url], large_counts[url])
+                # Prefetching keeps every list within a few queries
+                self.assertLessEqual(large_counts[url], 4)
+
+
+@override_settings(API_MAX_PAGE_SIZE=5)
+class CursorPaginationTest(TestCase):
+    """Test suite to verify keyset pagination of list endpoints."""
+    def setUp(self):
+        Team.objects.bulk_create(
+            Team(name=f'Team {index}') for index in range(12)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user('reader', password='pw')
+        )
+
+    def test_page_size_is_capped(self):
+        response = self.client.get('/teams/', {'page_size': 100})
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_pages_follow_id_order(self):
+        response = self.client.get('/teams/', {'page_size': 4})
+        first_page = [team['id'] for team in response.data['results']]
+        response = self.client.get(response.data['next'])
+        second_page = [team['id'] for team in response.data['results']]
+        self.assertEqual(first_page + second_page,
+                         sorted(first_page + second_page))
+        self.assertLess(first_page[-1], second_page[0])
+
+    def test_insert_between_pages_does_not_shift_pages(self):
+        response = self.client.get('/teams/', {'page_size': 5})
+        seen = [team['id'] for team in response.data['results']]
+        next_url = response.data['next']
+        # A team created while paging ends up on the last page
+        new_team = Team.objects.create(name='Late team')
+        while next_url:
+            response = self.client.get(next_url)
+            seen += [team['id'] for team in response.data['results']]
+            next_url = response.data['next']
+        self.assertEqual(seen, list(
+            Team.objects.order_by('id').values_list('id', flat=True)
+        ))
+        self.assertEqual(seen[-1], new_team.id)
+
+
+class EmployeeExportTest(TestCase):
+    """Test suite to verify the streaming employee export."""
+    def setUp(self):
+        self.team = Team.objects.create(name='Development')
+        self.employee = Employee.objects.create(
+            name='John Doe',
+            employee_id='E17006840',
+            hourly_rate=Decimal('25.00'),
+            is_team_leader=True
+        )
+        Employee.objects.create(
+            name='Jane Doe',
+            employee_id='E17006841',
+            hourly_rate=Decimal('20.00'),
+            is_team_leader=False
+        )
+        TeamEmployee.objects.create(team=self.team, employee=self.employee)
+        WorkArrangement.objects.create(employee=self.employee,
+                                       percentage=60, team=self.team)
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user('accountant', password='pw')
+        )
+
+    def test_ndjson_export_matches_serializer(self):
+        response = self.client.get('/employees/export/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(len(rows), 2)
+        expected = json.loads(json.dumps(
+            EmployeeSerializer(self.employee).data,
+            default=float
+        ))
+        self.assertEqual(rows[0], expected)
+
+    def test_csv_export(self):
+        response = self.client.get('/employees/export/', {'output': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['employee_id'], 'E17006840')
+        self.assertEqual(rows[0]['teams'], 'Development')
+        self.assertEqual(rows[0]['work_arrangements'], f'{self.team.id}:60')
+        self.assertEqual(rows[0]['weekly_hours'], '24.0')
+        self.assertEqual(Decimal(rows[0]['monthly_pay']),
+                         self.employee.calculate_monthly_pay())
+
+    def test_export_queries_do_not_grow_with_employees(self):
+        # The employees, with their snapshots, then their arrangements
+        # and teams
+        with self.assertNumQueries(3):
+            self.assertEqual(len(list(iter_export('ndjson'))), 2)
+        generate_company(teams=3, employees=30, seed=4)
+        with self.assertNumQueries(3):
+            self.assertEqual(len(list(iter_export('ndjson'))), 32)
+
+    def test_unknown_export_format(self):
+        response = self.client.get('/employees/export/', {'output': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_command(self):
+        output = io.StringIO()
+        call_command('export_employees', '--chunk-size', '1', stdout=output)
+        rows = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual([row['employee_id'] for row in rows],
+                         ['E17006840', 'E17006841'])
+
+
+class BulkEmployeeTest(TestCase):
+    """Test suite to verify bulk upsert of employees."""
+    def setUp(self):
+        self.existing = Employee.objects.create(
+            name='John Doe',
+            employee_id='E17006840',
+            hourly_rate=Decimal('20.00'),
+            is_team_leader=False
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user('hr', password='pw')
+        )
+
+    def test_bulk_create_and_update(self):
+        payload = [
+            {'employee_id': 'E17006840', 'hourly_rate': '22.50'},
+            {'name': 'Jane Doe', 'employee_id': 'E17006841',
+             'hourly_rate': '30.00', 'is_team_leader': True},
+        ]
+        response = self.client.post('/employees/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['errors'], [])
+        self.assertEqual(
+            [employee['employee_id'] for employee in response.data['results']],
+            ['E17006840', 'E17006841']
+        )
+        self.existing.refresh_from_db()
+        # Upsert keeps the existing row and only changes the given fields
+        self.assertEqual(self.existing.hourly_rate, Decimal('22.50'))
+        self.assertEqual(self.existing.name, 'John Doe')
+        self.assertEqual(Employee.objects.count(), 2)
+
+    def test_bulk_reports_item_errors_and_saves_the_rest(self):
+        payload = [
+            {'name': 'Jane Doe', 'employee_id': 'E17006841',
+             'hourly_rate': '30.00'},
+            {'name': 'No Rate', 'employee_id': 'E17006842'},
+            {'name': 'Jane Again', 'employee_id': 'E17006841',
+             'hourly_rate': '31.00'},
+        ]
+        response = self.client.post('/employees/', payload, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([error['index'] for error in response.data['errors']],
+                         [1, 2])
+        self.assertIn('hourly_rate', response.data['errors'][0]['errors'])
+        self.assertEqual(
+            Employee.objects.get(employee_id='E17006841').name, 'Jane Doe'
+        )
+        self.assertFalse(
+            Employee.objects.filter(employee_id='E17006842').exists()
+        )
+
+    def test_bulk_with_only_invalid_items(self):
+        response = self.client.post('/employees/', ['not an employee'],
+                                    format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['results'], [])
+
+    @override_settings(API_MAX_BULK_SIZE=1)
+    def test_bulk_size_is_capped(self):
+        payload = [{'employee_id': 'E1'}, {'employee_id': 'E2'}]
+        response = self.client.post('/employees/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_single_create_still_works(self):
+        payload = {'name': 'Jane Doe', 'employee_id': 'E17006841',
+                   'hourly_rate': '30.00'}
+        response = self.client.post('/employees/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['employee_id'], 'E17006841')
+
+
+class BulkWorkArrangementTest(TestCase):
+    """Test suite to verify bulk saving of work arrangements."""
+    def setUp(self):
+        self.team = Team.objects.create(name='Development')
+        self.employee = Employee.objects.create(
+            name='John Doe',
+            employee_id='E17006840',
+            hourly_rate=Decimal('20.00'),
+            is_team_leader=False
+        )
+        self.arrangement = WorkArrangement.objects.create(
+            employee=self.employee, percentage=60, team=self.team
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user('hr', password='pw')
+        )
+
+    def test_cap_is_checked_across_the_batch(self):
+        payload = [
+            {'employee': self.employee.id, 'team': self.team.id,
+             'percentage': 30},
+            # 60 + 30 + 20 is over 100%
+            {'employee': self.employee.id, 'team': self.team.id,
+             'percentage': 20},
+            {'employee': self.employee.id, 'team': self.team.id,
+             'percentage': 10},
+        ]
+        response = self.client.post('/work-arrangements/', payload,
+                                    format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([error['index'] for error in response.data['errors']],
+                         [1])
+        self.assertEqual(
+            sorted(self.employee.work_arrangements.values_list(
+                'percentage', flat=True
+            )),
+            [10, 30, 60]
+        )
+
+    def test_update_frees_previous_share(self):
+        payload = [
+            {'id': self.arrangement.id, 'percentage': 20},
+            {'employee': self.employee.id, 'team': self.team.id,
+             'percentage': 80},
+        ]
+        response = self.client.post('/work-arrangements/', payload,
+                                    format='json')
+        self.assertEqual(response.status_code, 201)
+        self.arrangement.refresh_from_db()
+        self.assertEqual(self.arrangement.percentage, 20)
+        self.assertEqual(self.employee.calculate_monthly_pay(),
+                         Decimal('20.00') * 160)
+
+    def test_cap_uses_arrangements_read_under_the_lock(self):
+        select_for_update = Employee.objects.select_for_update
+
+        def concurrent_change(*args, **kwargs):
+            # Another transaction commits right before the employee lock:
+            # 60% becomes 10%, and a new 50% arrangement is added
+            if not self.changed:
+                self.changed = True
+                WorkArrangement.objects.filter(pk=self.arrangement.pk).update(
+                    percentage=10
+                )
+                WorkArrangement.objects.bulk_create([WorkArrangement(
+                    employee=self.employee, team=self.team, percentage=50
+                )])
+            return select_for_update(*args, **kwargs)
+
+        self.changed = False
+        payload = [
+            {'id': self.arrangement.id, 'percentage': 40},
+            # 40 + 50 + 50 is over 100%
+            {'employee': self.employee.id, 'team': self.team.id,
+             'percentage': 50},
+        ]
+        with mock.patch.object(Employee.objects, 'select_for_update',
+                               concurrent_change):
+            response = self.client.post('/work-arrangements/', payload,
+                                        format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([error['index'] for error in response.data['errors']],
+                         [1])
+        self.assertEqual(sum(self.employee.work_arrangements.values_list(
+            'percentage', flat=True
+        )), 90)
+
+    def test_unknown_references_are_reported(self):
+        payload = [
+            {'employee': 0, 'team': self.team.id, 'percentage': 10},
+            {'employee': self.employee.id, 'team': 0, 'percentage': 10},
+            {'id': 0, 'percentage': 10},
+        ]
+        response = self.client.post('/work-arrangements/', payload,
+                                    format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [list(error['errors']) for error in response.data['errors']],
+            [['employee'], ['team'], ['id']]
+        )
+        self.assertEqual(WorkArrangement.objects.count(), 1)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class WorkArrangementConcurrencyTest(TransactionTestCase):
+    """Stress test the 100% cap with concurrent saves for one employee."""
+    THREADS = 12
+
+    def setUp(self):
+        self.team = Team.objects.create(name='Development')
+
+    def run_concurrently(self, target):
+        """Start every thread at the same time and wait for all of them"""
+        barrier = threading.Barrier(self.THREADS)
+        results = []
+
+        def worker():
+            barrier.wait()
+            try:
+                results.append(target())
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker)
+                   for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_creates_respect_cap(self):
+        for round_number in range(5):
+            employee = Employee.objects.create(
+                name='Jane Doe',
+                employee_id=f'E{round_number}',
+                hourly_rate=Decimal('20.00'),
+                is_team_leader=False
+            )
+
+            def create_arrangement():
+                try:
+                    WorkArrangement.objects.create(employee_id=employee.id,
+                                                   team_id=self.team.id,
+                                                   percentage=30)
+                except ValidationError:
+                    return False
+                return True
+
+            results = self.run_concurrently(create_arrangement)
+            # Only three 30% arrangements fit in 100%
+            self.assertEqual(results.count(True), 3)
+            self.assertEqual(sum(employee.work_arrangements.values_list(
+                'percentage', flat=True
+            )), 90)
+
+
+class TokenAuthenticationTest(TestCase):
+    """Test suite to verify JWT authentication of the API."""
+    def setUp(self):
+        get_user_model().objects.create_user('hr', password='secret-pw')
+        Team.objects.create(name='Development')
+        self.client = APIClient()
+
+    def obtain_tokens(self):
+        response = self.client.post('/api/token/', {
+            'username': 'hr', 'password': 'secret-pw'
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_access_token_authenticates_without_user_query(self):
+        tokens = self.obtain_tokens()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {tokens['access']}"
+        )
+        # Only the teams page is queried, the token needs no user lookup
+        with self.assertNumQueries(1):
+            response = self.client.get('/teams/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_refresh_token_issues_new_access_token(self):
+        tokens = self.obtain_tokens()
+        response = self.client.post('/api/token/refresh/', {
+            'refresh': tokens['refresh']
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {response.data['access']}"
+        )
+        self.assertEqual(self.client.get('/teams/').status_code, 200)
+
+    def test_invalid_token_is_rejected(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        self.assertEqual(self.client.get('/teams/').status_code, 401)
+
+    def test_basic_auth_is_disabled_by_default(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Basic aHI6c2VjcmV0LXB3')
+        self.assertEqual(self.client.get('/teams/').status_code, 401)
+
+
+class HealthCheckTest(TestCase):
+    """Test suite to verify the unauthenticated health probes."""
+    def test_liveness_does_no_database_work(self):
+        with self.assertNumQueries(0):
+            response = self.client.get('/health/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'ok'})
+
+    def test_readiness_checks_database(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/health/ready/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_probes_only_accept_get(self):
+        self.assertEqual(self.client.post('/health/').status_code, 405)
+
+
+class SeedDataCommandTest(TestCase):
+    """Test suite to verify the seed_data command."""
+    def test_seed_data_is_idempotent(self):
+        call_command('seed_data', stdout=io.StringIO())
+        call_command('seed_data', stdout=io.StringIO())
+        self.assertEqual(get_user_model().objects.filter(
+            is_superuser=True
+        ).count(), 1)
+        self.assertEqual(Employee.objects.count(), 2)
+        self.assertEqual(TeamLeader.objects.count(), 1)
+        self.assertEqual(WorkArrangement.objects.count(), 2)
+
+
+class PayrollSnapshotTest(TestCase):
+    """Test suite to verify payroll snapshots follow every write."""
+    def setUp(self):
+        self.team = Team.objects.create(name='Development')
+        self.employee = Employee.objects.create(
+            name='John Doe',
+            employee_id='E17006840',
+            hourly_rate=Decimal('25.00'),
+            is_team_leader=False
+        )
+        self.arrangement = WorkArrangement.objects.create(
+            employee=self.employee, percentage=60, team=self.team
+        )
+
+    def assertSnapshotIsCurrent(self, employee):
+        employee = Employee.objects.get(pk=employee.pk)
+        self.assertEqual(
+            PayrollSnapshot.objects.get(employee=employee).monthly_pay,
+            employee.calculate_monthly_pay()
+        )
+
+    def test_snapshot_follows_saves(self):
+        self.assertSnapshotIsCurrent(self.employee)
+        self.employee.hourly_rate = Decimal('30.00')
+        self.employee.save()
+        self.assertSnapshotIsCurrent(self.employee)
+        self.arrangement.percentage = 40
+        self.arrangement.save()
+        self.assertSnapshotIsCurrent(self.employee)
+        self.arrangement.delete()
+        self.assertSnapshotIsCurrent(self.employee)
+
+    def test_snapshot_follows_queryset_writes(self):
+        Employee.objects.filter(pk=self.employee.pk).update(
+            hourly_rate=Decimal('40.00')
+        )
+        self.assertSnapshotIsCurrent(self.employee)
+        WorkArrangement.objects.filter(employee=self.employee).update(
+            percentage=50
+        )
+        self.assertSnapshotIsCurrent(self.employee)
+        WorkArrangement.objects.bulk_create([
+            WorkArrangement(employee=self.employee, percentage=25,
+                            team=self.team)
+        ])
+        self.assertSnapshotIsCurrent(self.employee)
+        WorkArrangement.objects.filter(employee=self.employee).delete()
+        self.assertSnapshotIsCurrent(self.employee)
+
+    def test_snapshot_follows_moved_arrangement(self):
+        other = Employee.objects.create(
+            name='Jane Doe',
+            employee_id='E17006841',
+            hourly_rate=Decimal('20.00'),
+            is_team_leader=False
+        )
+        arrangement = WorkArrangement.objects.get(pk=self.arrangement.pk)
+        arrangement.employee = other
+        arrangement.save()
+        self.assertSnapshotIsCurrent(self.employee)
+        self.assertSnapshotIsCurrent(other)
+
+    def test_bulk_update_sends_rows_changed_once(self):
+        arrangements = [self.arrangement] + [
+            WorkArrangement.objects.create(employee=self.employee,
+                                           percentage=10, team=self.team)
+            for _ in range(2)
+        ]
+        for arrangement in arrangements:
+            arrangement.percentage = 20
+        received = []
+
+        def receiver(sender, employee_ids, **kwargs):
+            received.append((sender, set(employee_ids)))
+
+        rows_changed.connect(receiver)
+        self.addCleanup(rows_changed.disconnect, receiver)
+        # One UPDATE per batch, reported together afterwards
+        WorkArrangement.objects.bulk_update(arrangements, ['percentage'],
+                                            batch_size=1)
+        self.assertEqual(received, [(WorkArrangement, {self.employee.pk})])
+        self.assertSnapshotIsCurrent(self.employee)
+
+    def test_snapshot_follows_team_leader_changes(self):
+        leader = TeamLeader.objects.create(employee=self.employee)
+        self.assertSnapshotIsCurrent(self.employee)
+        leader.delete()
+        self.assertSnapshotIsCurrent(self.employee)
+        TeamLeader.objects.create(employee=self.employee)
+        TeamLeader.objects.filter(employee=self.employee).delete()
+        self.employee.refresh_from_db()
+        # Queryset deletes unset is_team_leader like TeamLeader.delete
+        self.assertFalse(self.employee.is_team_leader)
+        self.assertSnapshotIsCurrent(self.employee)
+
+    def test_deleting_employee_deletes_snapshot(self):
+        self.employee.delete()
+        self.assertEqual(PayrollSnapshot.objects.count(), 0)
+
+    def test_employee_update_returns_new_pay(self):
+        client = APIClient()
+        client.force_authenticate(
+            get_user_model().objects.create_user('hr', password='pw')
+        )
+        response = client.patch(f'/employees/{self.employee.pk}/',
+                                {'hourly_rate': '50.00'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['monthly_pay'],
+                         Decimal('50.00') * 160 * Decimal('0.6'))
+
+    def test_check_and_rebuild_commands(self):
+        call_command('check_payroll_snapshots', stdout=io.StringIO())
+        # Raw SQL writes bypass the snapshot maintenance
+        PayrollSnapshot.objects.update(monthly_pay=Decimal('1.00'))
+        with self.assertRaises(CommandError):
+            call_command('check_payroll_snapshots', stdout=io.StringIO())
+        call_command('rebuild_payroll_snapshots', stdout=io.StringIO())
+        call_command('check_payroll_snapshots', stdout=io.StringIO())
+        PayrollSnapshot.objects.all().delete()
+        call_command('check_payroll_snapshots', '--fix', stdout=io.StringIO())
+        self.assertSnapshotIsCurrent(self.employee)
+
+
+class TeamCostRollupTest(TestCase):
+    """Test suite to verify the per-team labour cost rollup."""
+    def setUp(self):
+        self.development = Team.objects.create(name='Development')
+        self.devops = Team.objects.create(name='DevOps')
+        self.empty_team = Team.objects.create(name='Design')
+        self.leader = Employee.objects.create(
+            name='John Doe',
+            employee_id='E17006840',
+            hourly_rate=Decimal('30.00'),
+            is_team_leader=True
+        )
+        self.employee = Employee.objects.create(
+            name='Jane Doe',
+            employee_id='E17006841',
+            hourly_rate=Decimal('21.33'),
+            is_team_leader=False
+        )
+        WorkArrangement.objects.create(employee=self.leader, percentage=60,
+                                       team=self.development)
+        WorkArrangement.objects.create(employee=self.leader, percentage=40,
+                                       team=self.devops)
+        WorkArrangement.objects.create(employee=self.employee,
+                                       percentage=75, team=self.development)
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user('finance', password='pw')
+        )
+
+    def test_rollup_of_every_team_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/teams/rollup/')
+        self.assertEqual(response.status_code, 200)
+        rollup = {team['name']: team for team in response.data}
+        development = rollup['Development']
+        self.assertEqual(development['headcount'], 2)
+        self.assertEqual(development['fte'], Decimal('1.35'))
+        self.assertEqual(development['weekly_hours'], Decimal('54'))
+        # 60% of a leader's pay plus 75% of an employee's
+        self.assertEqual(
+            development['monthly_cost'],
+            Decimal('30.00') * 160 * Decimal('0.60') * Decimal('1.10') +
+            Decimal('21.33') * 160 * Decimal('0.75')
+        )
+        self.assertEqual(rollup['Design']['headcount'], 0)
+        self.assertEqual(rollup['Design']['monthly_cost'], 0)
+
+    def test_team_costs_add_up_to_payroll(self):
+        response = self.client.get('/teams/rollup/')
+        total_cost = sum(team['monthly_cost'] for team in response.data)
+        self.assertEqual(total_cost, sum(
+            employee.calculate_monthly_pay()
+            for employee in Employee.objects.all()
+        ))
+
+    def test_cost_of_one_team(self):
+        response = self.client.get(f'/teams/{self.devops.id}/cost/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['headcount'], 1)
+        self.assertEqual(response.data['monthly_cost'],
+                         Decimal('30.00') * 160 * Decimal('0.40') *
+                         Decimal('1.10'))
+        self.assertEqual(self.client.get('/teams/0/cost/').status_code, 404)
+
+
+class ResponseCacheTest(TestCase):
+    """Read endpoints answer with ETags, 304s and cached responses"""
+    def setUp(self):
+        cache.clear()
+        self.team = Team.objects.create(name='Development')
+        self.employee = Employee.objects.create(
+            name='Jane Doe',
+            employee_id='E17006841',
+            hourly_rate=Decimal('21.33'),
+            is_team_leader=False
+        )
+        self.arrangement = WorkArrangement.objects.create(
+            employee=self.employee, percentage=50, team=self.team
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user('dashboard', password='pw')
+        )
+
+    def test_unchanged_poll_is_not_modified_without_queries(self):
+        response = self.client.get('/employees/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('"'))
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        with self.assertNumQueries(0):
+            response = self.client.get('/employees/',
+                                       HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_repeated_request_is_served_from_cache(self):
+        first = self.client.get(f'/work-arrangements/{self.arrangement.id}/')
+        with self.assertNumQueries(0):
+            second = self.client.get(
+                f'/work-arrangements/{self.arrangement.id}/'
+            )
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_other_queries_have_other_etags(self):
+        self.assertNotEqual(self.client.get('/teams/')['ETag'],
+                            self.client.get('/teams/?page_size=1')['ETag'])
+
+    def test_save_changes_etag_and_data(self):
+        etag = self.client.get('/teams/')['ETag']
+        Team.objects.create(name='DevOps')
+        response = self.client.get('/teams/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_queryset_update_changes_etag_and_data(self):
+        etag = self.client.get('/employees/')['ETag']
+        WorkArrangement.objects.filter(pk=self.arrangement.pk).update(
+            percentage=100
+        )
+        response = self.client.get('/employees/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['monthly_pay'],
+                         Decimal('21.33') * 160)
+
+    def test_bulk_create_changes_etag(self):
+        etag = self.client.get('/team-employees/')['ETag']
+        TeamEmployee.objects.bulk_create([
+            TeamEmployee(team=self.team, employee=self.employee)
+        ])
+        response = self.client.get('/team-employees/',
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_api_write_changes_etag(self):
+        etag = self.client.get('/teams/')['ETag']
+        self.client.patch(f'/teams/{self.team.id}/', {'name': 'Platform'},
+                          format='json')
+        response = self.client.get('/teams/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.data['results'][0]['name'], 'Platform')
+
+    def test_missing_object_is_not_cached(self):
+        self.assertEqual(self.client.get('/teams/0/').status_code, 404)
+        self.assertEqual(self.client.get('/teams/0/').status_code, 404)
+
+
+class OpenAPISchemaTest(TestCase):
+    """Test suite to verify the schema is generated once per version."""
+    def setUp(self):
+        schema_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(schema_dir.cleanup)
+        self.schema_dir = Path(schema_dir.name)
+        settings_override = override_settings(
+            OPENAPI_SCHEMA_DIR=self.schema_dir, APP_VERSION='v1'
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.clear_caches()
+        self.addCleanup(self.clear_caches)
+
+    def clear_caches(self):
+        openapi.code_version.cache_clear()
+        openapi.load_schema.cache_clear()
+
+    def test_command_writes_schema_of_current_version(self):
+        call_command('generate_openapi', stdout=io.StringIO())
+        schema = json.loads(
+            (self.schema_dir / 'openapi-v1.json').read_bytes()
+        )
+        self.assertEqual(schema['info']['title'], 'Employee Management Api')
+        self.assertIn('/employees/', schema['paths'])
+
+    def test_schema_served_from_artifact(self):
+        call_command('generate_openapi', stdout=io.StringIO())
+        with mock.patch.object(openapi, 'generate_schema') as generate:
+            response = self.client.get('/swagger.json')
+        generate.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content,
+                         (self.schema_dir / 'openapi-v1.json').read_bytes())
+        self.assertIn('max-age=', response['Cache-Control'])
+
+        response = self.client.get('/swagger.json',
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_missing_artifact_is_generated_once(self):
+        with mock.patch.object(openapi, 'generate_schema',
+                               wraps=openapi.generate_schema) as generate:
+            self.client.get('/swagger.json')
+            self.client.get('/swagger.json')
+        self.assertEqual(generate.call_count, 1)
+        self.assertTrue((self.schema_dir / 'openapi-v1.json').exists())
+
+    def test_new_version_regenerates_and_removes_stale_schema(self):
+        call_command('generate_openapi', stdout=io.StringIO())
+        self.clear_caches()
+        with override_settings(APP_VERSION='v2'):
+            call_command('generate_openapi', stdout=io.StringIO())
+        self.assertEqual(
+            sorted(path.name for path in self.schema_dir.iterdir()),
+            ['openapi-v2.json']
+        )
+
+    def test_swagger_ui_loads_pregenerated_schema(self):
+        response = self.client.get('/swagger/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('/swagger.json', response.content.decode())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN plans of PostgreSQL')
+class IndexPlanTest(TestCase):
+    """Test suite to verify the key queries are served by indexes at a
+    realistic size, instead of scanning whole tables."""
+    EMPLOYEES = 20000
+    TEAMS = 50
+    # Tables too large to read in full for a handful of rows
+    LARGE_TABLES = {
+        Employee._meta.db_table, WorkArrangement._meta.db_table,
+        TeamEmployee._meta.db_table, TeamLeader._meta.db_table,
+        PayrollSnapshot._meta.db_table,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        teams = Team.objects.bulk_create(
+            Team(name=f'Team {index}') for index in range(cls.TEAMS)
+        )
+        employees = Employee.objects.bulk_create(
+            Employee(name=f'Employee {index:05}', employee_id=f'E{index:05}',
+                     hourly_rate=Decimal('20.00'),
+                     # About one leader per team
+                     is_team_leader=index % (cls.EMPLOYEES // cls.TEAMS) == 0)
+            for index in range(cls.EMPLOYEES)
+        )
+        TeamLeader.objects.bulk_create(
+            TeamLeader(employee=employee) for employee in employees
+            if employee.is_team_leader
+        )
+        TeamEmployee.objects.bulk_create(
+            TeamEmployee(team=teams[index % cls.TEAMS], employee=employee)
+            for index, employee in enumerate(employees)
+        )
+        WorkArrangement.objects.bulk_create(
+            WorkArrangement(team=teams[(index + offset) % cls.TEAMS],
+                            employee=employee, percentage=50)
+            for index, employee in enumerate(employees)
+            for offset in (0, 1)
+        )
+        with connection.cursor() as cursor:
+            for table in cls.LARGE_TABLES:
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(table)}')
+        cls.team = teams[0]
+        cls.employee = employees[len(employees) // 2]
+        cls.page_ids = [employee.pk for employee in employees[1000:1050]]
+
+    def sequential_scans(self, queryset):
+        """Large tables the plan of queryset reads in full"""
+        plans = [json.loads(queryset.explain(format='json'))[0]['Plan']]
+        scanned = set()
+        while plans:
+            plan = plans.pop()
+            if (plan['Node Type'] == 'Seq Scan' and
+                    plan['Relation Name'] in self.LARGE_TABLES):
+                scanned.add(plan['Relation Name'])
+            plans.extend(plan.get('Plans', []))
+        return scanned
+
+    def test_key_queries_use_indexes(self):
+        queries = {
+            'employee by employee_id': Employee.objects.filter(
+                employee_id=self.employee.employee_id
+            ),
+            'team leaders': Employee.objects.filter(is_team_leader=True),
+            'employees by name': Employee.objects.order_by('name')[:50],
+            'employee page': Employee.objects.select_related(
+                'payroll_snapshot'
+            ).filter(pk__gt=self.employee.pk).order_by('id')[:50],
+            'arrangements of a page': WorkArrangement.objects.filter(
+                employee_id__in=self.page_ids
+            ),
+            'memberships of a page': TeamEmployee.objects.filter(
+                employee_id__in=self.page_ids
+            ),
+            'members of a team': TeamEmployee.objects.filter(team=self.team),
+            'membership lookup': TeamEmployee.objects.filter(
+                team=self.team, employee=self.employee
+            ),
+            'percentage cap': WorkArrangement.objects.filter(
+                employee=self.employee
+            ).exclude(pk=0),
+            'arrangement in a team': WorkArrangement.objects.filter(
+                employee=self.employee, team=self.team
+            ),
+            'payroll of a page': Employee.objects.filter(
+                pk__in=self.page_ids
+            ).with_monthly_pay(),
+        }
+        filters = {
+            'team filter': {'team': self.team.pk},
+            'arrangement team filter': {'arrangement_team': self.team.pk},
+            'hourly rate filter': {'hourly_rate_min': '100'},
+            'employee_id prefix filter': {'employee_id_prefix': 'E0123'},
+            'name search': {'search': 'loyee 0123'},
+        }
+        for name, params in filters.items():
+            queries[name] = EmployeeFilter(
+                params, queryset=Employee.objects.order_by('id')
+            ).qs[:50]
+        for name, queryset in queries.items():
+            with self.subTest(query=name):
+                self.assertEqual(self.sequential_scans(queryset), set())
+
+
+class EmployeeFilterTest(TestCase):
+    """Test suite to verify filtering and searching the employee list."""
+    def setUp(self):
+        cache.clear()
+        self.development = Team.objects.create(name='Development')
+        self.sales = Team.objects.create(name='Sales')
+        self.alice = Employee.objects.create(
+            name='Alice Tan', employee_id='ENG001',
+            hourly_rate=Decimal('40.00'), is_team_leader=True
+        )
+        self.bob = Employee.objects.create(
+            name='Bob Smith', employee_id='ENG002',
+            hourly_rate=Decimal('25.00')
+        )
+        self.carol = Employee.objects.create(
+            name='Carol Alison', employee_id='SAL001',
+            hourly_rate=Decimal('30.00')
+        )
+        TeamEmployee.objects.create(team=self.development,
+                                    employee=self.alice)
+        TeamEmployee.objects.create(team=self.development, employee=self.bob)
+        WorkArrangement.objects.create(employee=self.carol,
+                                       team=self.development, percentage=50)
+        WorkArrangement.objects.create(employee=self.bob, team=self.sales,
+                                       percentage=50)
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user('reader', password='pw')
+        )
+
+    def names(self, **params):
+        response = self.client.get('/employees/', params)
+        self.assertEqual(response.status_code, 200)
+        return [employee['name'] for employee in response.json()['results']]
+
+    def test_filters(self):
+        cases = [
+            ({'team': self.development.pk}, ['Alice Tan', 'Bob Smith']),
+            ({'arrangement_team': self.development.pk}, ['Carol Alison']),
+            ({'is_team_leader': 'true'}, ['Alice Tan']),
+            ({'hourly_rate_min': '26', 'hourly_rate_max': '35'},
+             ['Carol Alison']),
+            ({'employee_id_prefix': 'ENG'}, ['Alice Tan', 'Bob Smith']),
+            ({'search': 'ali'}, ['Alice Tan', 'Carol Alison']),
+            ({'search': 'ali', 'team': self.development.pk}, ['Alice Tan']),
+            ({'search': '  '}, ['Alice Tan', 'Bob Smith', 'Carol Alison']),
+        ]
+        for params, names in cases:
+            with self.subTest(params=params):
+                self.assertEqual(self.names(**params), names)
+
+    @override_settings(API_VALUES_SERIALIZATION=True)
+    def test_filters_apply_to_values_serialization(self):
+        self.assertEqual(self.names(team=self.sales.pk), [])
+        self.assertEqual(self.names(arrangement_team=self.sales.pk),
+                         ['Bob Smith'])
+
+    def test_invalid_values_are_rejected(self):
+        response = self.client.get('/employees/',
+                                   {'hourly_rate_min': 'lots'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('hourly_rate_min', response.json())
+
+    @skipUnless(connection.vendor == 'postgresql', 'pg_trgm similarity')
+    def test_search_tolerates_typos(self):
+        self.assertEqual(self.names(search='Alise Tan'), ['Alice Tan'])
+
+
+class SyntheticCompanyTest(TestCase):
+    """Test suite to verify the synthetic company generator."""
+    def company(self):
+        """Every generated row, in a comparable form"""
+        return (
+            list(Employee.objects.order_by('employee_id').values_list(
+                'employee_id', 'name', 'hourly_rate', 'is_team_leader'
+            )),
+            sorted(WorkArrangement.objects.values_list(
+                'employee__employee_id', 'team__name', 'percentage'
+            )),
+            sorted(TeamEmployee.objects.values_list(
+                'employee__employee_id', 'team__name'
+            )),
+        )
+
+    def test_sizes(self):
+        sizes = generate_company(teams=8, employees=300, leaders=10,
+                                 memberships=450, arrangements=500)
+        self.assertEqual(sizes['arrangements'], 500)
+        self.assertEqual(Team.objects.count(), 8)
+        self.assertEqual(Employee.objects.count(), 300)
+        self.assertEqual(TeamLeader.objects.count(), 10)
+        self.assertEqual(
+            Employee.objects.filter(is_team_leader=True).count(), 10
+        )
+        self.assertEqual(TeamEmployee.objects.count(), 450)
+        self.assertEqual(WorkArrangement.objects.count(), 500)
+
+    def test_arrangements_respect_the_cap(self):
+        generate_company(teams=4, employees=200, arrangements=700)
+        totals = WorkArrangement.objects.values('employee').annotate(
+            total=Sum('percentage'), teams=Count('team', distinct=True),
+            rows=Count('id')
+        )
+        for total in totals:
+            self.assertLessEqual(total['total'], 100)
+            self.assertEqual(total['teams'], total['rows'])
+
+    def test_same_seed_same_company(self):
+        generate_company(teams=5, employees=100, seed=7)
+        first = self.company()
+        WorkArrangement.objects.all().delete()
+        Employee.objects.all().delete()
+        Team.objects.all().delete()
+        generate_company(teams=5, employees=100, seed=7)
+        self.assertEqual(self.company(), first)
+
+    def test_snapshots_follow_generated_rows(self):
+        generate_company(teams=5, employees=120)
+        self.assertEqual(PayrollSnapshot.objects.count(), 120)
+        self.assertEqual(list(diff_payroll_snapshots()), [])
+
+    def test_impossible_sizes(self):
+        with self.assertRaises(ValueError):
+            generate_company(teams=2, employees=10, memberships=21)
+        with self.assertRaises(ValueError):
+            generate_company(teams=2, employees=10, arrangements=21)
+        self.assertFalse(Employee.objects.exists())
+
+    def test_seed_data_command(self):
+        out = io.StringIO()
+        call_command('seed_data', employees=200, teams=10, seed=3,
+                     stdout=out)
+        self.assertIn('200 employees', out.getvalue())
+        self.assertEqual(Employee.objects.count(), 200)
+        with self.assertRaises(CommandError):
+            call_command('seed_data', employees=200, stdout=io.StringIO())
+
+
+class HRFeedImportTest(TestCase):
+    """Test suite to verify the set-based HR feed import."""
+    def setUp(self):
+        self.development = Team.objects.create(name='Development')
+        self.employee = Employee.objects.create(
+            name='Jane Doe',
+            employee_id='E17006841',
+            hourly_rate=Decimal('21.33'),
+            is_team_leader=False
+        )
+        WorkArrangement.objects.create(employee=self.employee,
+                                       percentage=100,
+                                       team=self.development)
+
+    def feed(self, **files):
+        return {name: io.StringIO(content)
+                for name, content in files.items()}
+
+    def test_import_creates_and_updates(self):
+        summary, rejections = import_hr_feed(self.feed(
+            teams='name\nDevOps\nDevelopment\n',
+            employees=(
+                'employee_id,name,hourly_rate,is_team_leader\n'
+                'E17006841,Jane Smith,30.00,true\n'
+                'E1,"Doe, John",25.5,\n'
+            ),
+            memberships='team,employee_id\nDevOps,E1\nDevOps,E17006841\n',
+            arrangements=(
+                'employee_id,team,percentage\n'
+                'E17006841,DevOps,60\n'
+                'E17006841,Development,40\n'
+                'E1,DevOps,75\n'
+            ),
+        ))
+        self.assertEqual(rejections, [])
+        self.assertEqual(summary['teams_created'], 1)
+        self.assertEqual(summary['employees_written'], 2)
+        self.assertEqual(summary['arrangements_removed'], 1)
+        self.assertEqual(summary['arrangements_created'], 3)
+
+        self.employee.refresh_from_db()
+        self.assertEqual(self.employee.name, 'Jane Smith')
+        self.assertEqual(self.employee.hourly_rate, Decimal('30.00'))
+        self.assertTrue(TeamLeader.objects.filter(
+            employee=self.employee
+        ).exists())
+        new_employee = Employee.objects.get(employee_id='E1')
+        self.assertEqual(new_employee.name, 'Doe, John')
+        self.assertFalse(new_employee.is_team_leader)
+        self.assertEqual(sorted(self.employee.work_arrangements.values_list(
+            'team__name', 'percentage'
+        )), [('DevOps', 60), ('Development', 40)])
+        self.assertEqual(TeamEmployee.objects.filter(
+            team__name='DevOps'
+        ).count(), 2)
+        # Snapshots follow the merged rows
+        self.assertEqual(list(diff_payroll_snapshots()), [])
+        self.assertEqual(
+            self.employee.payroll_snapshot.monthly_pay,
+            Decimal('30.00') * 160 * Decimal('1.10')
+        )
+
+    def test_rejected_rows_are_reported_and_skipped(self):
+        summary, rejections = import_hr_feed(self.feed(
+            employees=(
+                'employee_id,name,hourly_rate,is_team_leader\n'
+                'E1,John Doe,25.00,false\n'
+                'E2,Bad Rate,12.345,false\n'
+                'E3,Twice,20.00,false\n'
+                'E3,Twice,20.00,false\n'
+                'E4,Leader,20.00,maybe\n'
+            ),
+            arrangements=(
+                'employee_id,team,percentage\n'
+                'E1,Development,70\n'
+                'E1,Development,40\n'
+                'E2,Development,50\n'
+                'E17006841,Nowhere,50\n'
+                'E17006841,Development,50\n'
+                'E5,Development,0\n'
+            ),
+        ))
+        self.assertEqual(rejections, [
+            ('employees', 3, 'hourly_rate must be a number with at most '
+                             '4 digits and 2 decimal places'),
+            ('employees', 4, 'Duplicate employee_id in this file'),
+            ('employees', 5, 'Duplicate employee_id in this file'),
+            ('employees', 6, 'is_team_leader must be true or false'),
+            ('arrangements', 2,
+             'Total work percentage of the employee exceeds 100%'),
+            ('arrangements', 3,
+             'Total work percentage of the employee exceeds 100%'),
+            ('arrangements', 4, 'Unknown employee_id'),
+            ('arrangements', 5, 'Unknown team'),
+            ('arrangements', 6, 'Another row of this employee was rejected'),
+            ('arrangements', 7, 'Unknown employee_id'),
+        ])
+        self.assertEqual(summary['employees_rejected'], 4)
+        self.assertEqual(summary['employees_written'], 1)
+        self.assertEqual(summary['arrangements_created'], 0)
+        self.assertEqual(
+            list(Employee.objects.order_by('employee_id').values_list(
+                'employee_id', flat=True
+            )),
+            ['E1', 'E17006841']
+        )
+        # The employee's arrangements were left as they were
+        self.assertEqual(
+            list(self.employee.work_arrangements.values_list(
+                'percentage', flat=True
+            )),
+            [100]
+        )
+
+    def test_dry_run_rolls_back(self):
+        summary, rejections = import_hr_feed(self.feed(
+            teams='name\nDevOps\n',
+            employees=('employee_id,name,hourly_rate,is_team_leader\n'
+                       'E1,John Doe,25.00,false\n'),
+        ), dry_run=True)
+        self.assertEqual(summary['teams_created'], 1)
+        self.assertEqual(summary['employees_written'], 1)
+        self.assertFalse(Team.objects.filter(name='DevOps').exists())
+        self.assertFalse(Employee.objects.filter(employee_id='E1').exists())
+
+    def test_wrong_columns(self):
+        with self.assertRaises(FeedError):
+            import_hr_feed(self.feed(teams='team\nDevOps\n'))
+        self.assertFalse(Team.objects.filter(name='DevOps').exists())
+
+    def test_command_writes_rejections(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        feed = Path(directory.name) / 'employees.csv'
+        feed.write_text('employee_id,name,hourly_rate,is_team_leader\n'
+                        'E1,John Doe,25.00,false\n'
+                        ',No Id,25.00,false\n')
+        rejects = Path(directory.name) / 'rejects.csv'
+        out = io.StringIO()
+        call_command('import_hr_feed', employees=str(feed),
+                     rejects=str(rejects), stdout=out)
+        self.assertIn('employees_written: 1', out.getvalue())
+        self.assertEqual(list(csv.reader(rejects.open())), [
+            ['file', 'line', 'reason'],
+            ['employees', '3',
+             'employee_id is required and at most 10 characters'],
+        ])
+        with self.assertRaises(CommandError):
+            call_command('import_hr_feed', stdout=io.StringIO())
+
+
+class RequestMetricsMiddlewareTest(TestCase):
+    """Test suite to verify the per-request SQL and timing metrics."""
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('ops', password='pw')
+
+    def client_for(self):
+        # The middleware chain is built on a client's first request
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client
+
+    @override_settings(REQUEST_METRICS_ENABLED=True)
+    def test_server_timing_header(self):
+        response = self.client_for().get('/health/ready/')
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^db;dur=[0-9.]+;desc="1 queries", app;dur=[0-9.]+, '
+            r'total;dur=[0-9.]+$'
+        )
+
+    def test_disabled_by_default(self):
+        response = self.client_for().get('/health/')
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(REQUEST_METRICS_ENABLED=True,
+                       REQUEST_METRICS_SLOW_MS=0,
+                       REQUEST_METRICS_LOGGED_QUERIES=1)
+    def test_slow_request_logged_with_slowest_query(self):
+        with self.assertLogs('employee_app.requests', 'WARNING') as logs:
+            self.client_for().get('/health/ready/')
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('Slow request GET /health/ready/: 200',
+                      logs.output[0])
+        self.assertIn('SELECT 1', logs.output[0])
+
+    @override_settings(REQUEST_METRICS_ENABLED=True,
+                       REQUEST_METRICS_SLOW_MS=60000,
+                       REQUEST_METRICS_MAX_QUERIES=0)
+    def test_request_over_query_limit_logged(self):
+        with self.assertLogs('employee_app.requests', 'WARNING') as logs:
+            self.client_for().get('/health/ready/')
+        self.assertIn('1 queries', logs.output[0])
+        with self.assertNoLogs('employee_app.requests', 'WARNING'):
+            self.client_for().get('/health/')
+
+    @override_settings(REQUEST_METRICS_ENABLED=True)
+    async def test_async_views_stay_async(self):
+        token = await sync_to_async(AccessToken.for_user)(self.user)
+        response = await AsyncClient().get(
+            '/async/teams/', headers={'Authorization': f'Bearer {token}'}
+        )
+        self.assertEqual(response.status_code, 200)
+        # The teams query of the async ORM is counted too
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+
+
+class AsyncReadEndpointTest(TestCase):
+    """Test suite to verify the async read endpoints match the DRF ones."""
+    PREFIXES = ['employees', 'teams', 'work-arrangements']
+
+    def setUp(self):
+        cache.clear()
+        generate_company(teams=4, employees=30, seed=1)
+        self.user = get_user_model().objects.create_user('reader',
+                                                         password='pw')
+        self.token = str(AccessToken.for_user(self.user))
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+    def test_list_and_retrieve_match_sync_endpoints(self):
+        for prefix in self.PREFIXES:
+            with self.subTest(prefix=prefix):
+                sync_page = self.client.get(f'/{prefix}/').json()
+                async_page = self.client.get(f'/async/{prefix}/').json()
+                self.assertEqual(async_page['results'],
+                                 sync_page['results'])
+                pk = sync_page['results'][-1]['id']
+                self.assertEqual(
+                    self.client.get(f'/async/{prefix}/{pk}/').json(),
+                    self.client.get(f'/{prefix}/{pk}/').json(),
+                )
+
+    def test_list_filters_and_pages_like_sync_endpoint(self):
+        team = Team.objects.order_by('pk').first()
+        params = {'team': team.pk, 'search': 'a', 'page_size': 3}
+        sync_page = self.client.get('/employees/', params).json()
+        async_page = self.client.get('/async/employees/', params).json()
+        self.assertTrue(async_page['results'])
+        self.assertEqual(list(async_page), ['next', 'previous', 'results'])
+        self.assertEqual(async_page['results'], sync_page['results'])
+        self.assertEqual(async_page['next'].replace('/async', ''),
+                         sync_page['next'])
+        second_page = self.client.get(async_page['next']).json()
+        self.assertEqual(
+            second_page,
+            json.loads(json.dumps(self.client.get(
+                sync_page['next']
+            ).json()).replace('/employees/', '/async/employees/'))
+        )
+        self.assertTrue(second_page['previous'])
+        response = self.client.get('/async/employees/', {'team': 'x'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(),
+                         self.client.get('/employees/', {'team': 'x'}).json())
+
+    async def test_sparse_fields_without_snapshot(self):
+        # Old rows may have no snapshot yet, their pay is then computed
+        # from the arrangements, which aren't prefetched for these fields
+        await PayrollSnapshot.objects.all().adelete()
+        employee = await Employee.objects.order_by('pk').afirst()
+        expected = await sync_to_async(employee.calculate_monthly_pay)()
+        headers = {'Authorization': f'Bearer {self.token}'}
+        for path in ['/async/employees/', f'/async/employees/{employee.pk}/']:
+            with self.subTest(path=path):
+                response = await AsyncClient().get(
+                    path, {'fields': 'id,monthly_pay'}, headers=headers
+                )
+                self.assertEqual(response.status_code, 200)
+                data = response.json()
+                data = data['results'][0] if 'results' in data else data
+                self.assertEqual(Decimal(str(data['monthly_pay'])),
+                                 expected)
+
+    def test_pages_follow_id_order(self):
+        seen = []
+        next_url = '/async/employees/?page_size=7'
+        while next_url:
+            response = self.client.get(next_url).json()
+            seen += [employee['id'] for employee in response['results']]
+            next_url = response['next']
+        self.assertEqual(seen, list(
+            Employee.objects.order_by('id').values_list('id', flat=True)
+        ))
+
+    def test_list_query_count_is_constant(self):
+        # The employee plus its snapshot, arrangements and memberships
+        with self.assertNumQueries(3):
+            response = self.client.get('/async/employees/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_unchanged_poll_is_not_modified(self):
+        etag = self.client.get('/async/teams/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/async/teams/',
+                                       HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Team.objects.create(name='New team')
+        response = self.client.get('/async/teams/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_requires_valid_token(self):
+        client = APIClient()
+        response = client.get('/async/teams/')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('WWW-Authenticate', response)
+        client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        self.assertEqual(client.get('/async/teams/').status_code, 401)
+
+    def test_missing_row_is_not_found(self):
+        response = self.client.get('/async/teams/999999/')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(),
+                         self.client.get('/teams/999999/').json())
+
+    async def test_served_by_asgi_handler(self):
+        response = await AsyncClient().get(
+            '/async/employees/', {'page_size': 5},
+            headers={'Authorization': f'Bearer {self.token}'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 5)
+        self.assertNotEqual(response.json()['next'], None)
+
+
+class SparseFieldsTest(TestCase):
+    """Test suite to verify ?fields= and ?expand= on the API."""
+    def setUp(self):
+        cache.clear()
+        generate_company(teams=3, employees=20, seed=2)
+        user = get_user_model().objects.create_user('reader', password='pw')
+        self.client = APIClient()
+        # A token, the async views don't support force_authenticate
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}'
+        )
+
+    def test_default_representation_is_unchanged(self):
+        employee = self.client.get('/employees/').json()['results'][0]
+        self.assertEqual(list(employee), [
+            'id', 'name', 'employee_id', 'teams', 'hourly_rate',
+            'is_team_leader', 'work_arrangements', 'monthly_pay',
+        ])
+
+    def test_fields_leave_out_related_queries(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/employees/',
+                                       {'fields': 'id,name,employee_id'})
+        self.assertEqual(list(response.json()['results'][0]),
+                         ['id', 'name', 'employee_id'])
+        # Only the snapshot is joined for monthly_pay
+        with self.assertNumQueries(1):
+            response = self.client.get('/employees/',
+                                       {'fields': 'id,monthly_pay'})
+        employee = Employee.objects.get(pk=response.json()['results'][0]['id'])
+        self.assertEqual(
+            Decimal(str(response.json()['results'][0]['monthly_pay'])),
+            employee.calculate_monthly_pay()
+        )
+
+    def test_monthly_pay_without_snapshots(self):
+        expected = {employee.pk: employee.calculate_monthly_pay()
+                    for employee in Employee.objects.all()}
+        # Rows may have no snapshot yet, their pay is then computed in
+        # the same query
+        PayrollSnapshot.objects.all().delete()
+        with self.assertNumQueries(1):
+            response = self.client.get('/employees/',
+                                       {'fields': 'id,monthly_pay',
+                                        'page_size': 50})
+        results = response.json()['results']
+        self.assertEqual(len(results), len(expected))
+        for employee in results:
+            self.assertEqual(Decimal(str(employee['monthly_pay'])),
+                             expected[employee['id']])
+
+    def test_expand_nests_related_objects(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/work-arrangements/', {
+                'fields': 'id,percentage', 'expand': 'employee,team'
+            })
+        arrangement = response.json()['results'][0]
+        self.assertEqual(list(arrangement),
+                         ['id', 'employee', 'team', 'percentage'])
+        self.assertEqual(list(arrangement['employee']),
+                         ['id', 'name', 'employee_id'])
+        team = Team.objects.get(pk=arrangement['team']['id'])
+        self.assertEqual(arrangement['team']['name'], team.name)
+
+    def test_expanded_objects_invalidate_cached_responses(self):
+        params = {'fields': 'id', 'expand': 'employee,team'}
+        before = self.client.get('/work-arrangements/', params)
+        arrangement = before.json()['results'][0]
+        employee = Employee.objects.get(pk=arrangement['employee']['id'])
+        employee.name = 'New Name'
+        employee.save()
+        team = Team.objects.get(pk=arrangement['team']['id'])
+        team.name = 'New Team'
+        team.save()
+
+        after = self.client.get('/work-arrangements/', params,
+                                HTTP_IF_NONE_MATCH=before['ETag'])
+        self.assertEqual(after.status_code, 200)
+        self.assertNotEqual(after['ETag'], before['ETag'])
+        arrangement = after.json()['results'][0]
+        self.assertEqual(arrangement['employee']['name'], 'New Name')
+        self.assertEqual(arrangement['team']['name'], 'New Team')
+
+    def test_retrieve_and_payroll_accept_fields(self):
+        pk = Employee.objects.values_list('pk', flat=True).first()
+        response = self.client.get(f'/employees/{pk}/', {'fields': 'name'})
+        self.assertEqual(list(response.json()), ['name'])
+        # The pay aggregate is skipped when monthly_pay is left out
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/payroll/', {'fields': 'id'})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('GROUP BY', queries[0]['sql'])
+        self.assertEqual(list(response.json()['results'][0]), ['id'])
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get('/employees/', {'fields': 'id,salary'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('salary', response.json()['fields'][0])
+        response = self.client.get('/employees/', {'expand': 'teams'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_writes_return_every_field(self):
+        response = self.client.post('/teams/?fields=id', {'name': 'Ops'},
+                                    format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(list(response.json()), ['id', 'name'])
+
+    def test_async_endpoints_accept_fields(self):
+        response = self.client.get('/async/work-arrangements/',
+                                   {'fields': 'id', 'expand': 'team'})
+        self.assertEqual(response.json()['results'],
+                         self.client.get('/work-arrangements/', {
+                             'fields': 'id', 'expand': 'team'
+                         }).json()['results'])
+        response = self.client.get('/async/employees/', {'fields': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ValuesSerializationTest(TestCase):
+    """Test that the values() fast path renders the same JSON as the
+    serializers."""
+    def setUp(self):
+        generate_company(teams=4, employees=40, arrangements=60, seed=5)
+        # An employee without arrangements, and one without a snapshot
+        Employee.objects.create(name='Idle', employee_id='IDLE',
+                                hourly_rate=Decimal('19.99'))
+        PayrollSnapshot.objects.filter(
+            employee=WorkArrangement.objects.first().employee
+        ).delete()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user('reader', password='pw')
+        )
+
+    def get_both(self, url):
+        """Response content from the serializers and from values()"""
+        contents = []
+        for enabled in (False, True):
+            cache.clear()
+            with override_settings(API_VALUES_SERIALIZATION=enabled):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            contents.append(response.content)
+        return contents
+
+    def test_same_json_as_serializers(self):
+        employee = Employee.objects.order_by('-id').first()
+        arrangement = WorkArrangement.objects.first()
+        self.assertFalse(PayrollSnapshot.objects.filter(
+            employee=arrangement.employee_id
+        ).exists())
+        for url in ['/employees/?page_size=500', '/employees/?page_size=7',
+                    f'/employees/{employee.pk}/',
+                    f'/employees/{arrangement.employee_id}/',
+                    '/work-arrangements/?page_size=500',
+                    f'/work-arrangements/{arrangement.pk}/']:
+            with self.subTest(url=url):
+                serialized, values = self.get_both(url)
+                self.assertEqual(values, serialized)
+
+    @override_settings(API_VALUES_SERIALIZATION=True)
+    def test_query_count_and_fallbacks(self):
+        cache.clear()
+        # The page, its memberships and its arrangements
+        with self.assertNumQueries(3):
+            self.client.get('/employees/')
+        response = self.client.get('/employees/0/')
+        self.assertEqual(response.status_code, 404)
+        # Sparse fieldsets go through the serializer
+        response = self.client.get('/employees/', {'fields': 'id'})
+        self.assertEqual(list(response.json()['results'][0]), ['id'])
+
+
+class FastJSONTest(TestCase):
+    """Test that the orjson renderer and parser match DRF's."""
+    PAYLOAD = {
+        'id': 1,
+        'name': 'Zoë\u2028\u2029 "quoted"',
+        'hourly_rate': '25.50',
+        'monthly_pay': Decimal('4488.000000'),
+        'fte': Decimal('0.75'),
+        'zero': Decimal('0'),
+        'created': datetime.datetime(2024, 5, 1, 8, 30, 15, 123456,
+                                     tzinfo=datetime.timezone.utc),
+        'day': datetime.date(2024, 5, 1),
+        'detail': ErrorDetail('Not found.', code='not_found'),
+        'teams': [{'id': 2, 'name': 'Sales'}],
+        'weekly_hours': 32.0,
+        'leader': None,
+    }
+
+    def assert_same_bytes(self, data, *args):
+        self.assertEqual(FastJSONRenderer().render(data, *args),
+                         JSONRenderer().render(data, *args))
+
+    def test_same_bytes_as_drf(self):
+        self.assert_same_bytes(self.PAYLOAD)
+        self.assert_same_bytes([self.PAYLOAD] * 3)
+        self.assert_same_bytes(None)
+
+    def test_falls_back_where_orjson_differs(self):
+        for data in [{'big': 2 ** 70}, {1: 'int key'},
+                     {'tiny': Decimal('0.00001')},
+                     {'huge': Decimal('1E+20')}]:
+            with self.subTest(data=data):
+                self.assert_same_bytes(data)
+        self.assert_same_bytes(self.PAYLOAD, 'application/json; indent=4')
+        for renderer in (FastJSONRenderer(), JSONRenderer()):
+            with self.assertRaises(ValueError):
+                renderer.render({'pay': Decimal('NaN')})
+
+    def test_without_orjson(self):
+        with mock.patch('employee_app.renderers.orjson', None):
+            self.assert_same_bytes(self.PAYLOAD)
+            self.assertEqual(
+                FastJSONParser().parse(io.BytesIO(b'{"a": [1, 2.5]}')),
+                {'a': [1, 2.5]}
+            )
+
+    def test_parser_matches_drf(self):
+        for body in [b'{"name": "Zo\xc3\xab", "rate": 25.5, "ids": [1]}',
+                     b'[%d]' % 2 ** 70]:
+            with self.subTest(body=body):
+                self.assertEqual(
+                    FastJSONParser().parse(io.BytesIO(body)),
+                    JSONParser().parse(io.BytesIO(body)),
+                )
+        for body in [b'{"name": ', b'{"rate": NaN}']:
+            with self.subTest(body=body), self.assertRaises(ParseError):
+                FastJSONParser().parse(io.BytesIO(body))
+
+    def test_api_uses_fast_json(self):
+        generate_company(teams=2, employees=10, seed=4)
+        client = APIClient()
+        client.force_authenticate(
+            get_user_model().objects.create_user('reader', password='pw')
+        )
+        cache.clear()
+        response = client.get('/employees/')
+        self.assertIsInstance(response.accepted_renderer, FastJSONRenderer)
+        self.assertEqual(response.content,
+                         JSONRenderer().render(response.data))
+        response = client.post('/teams/', {'name': 'Zoë'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['name'], 'Zoë')
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1', 'replica_2'])
+class ReplicaRouterTest(SimpleTestCase):
+    """Test suite to verify reads of safe requests go to the replicas."""
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def route(self, request, write=False):
+        """Databases the router picks for a read before and after an
+        optional write while the middleware handles request."""
+        databases = []
+
+        def view(request):
+            databases.append(self.router.db_for_read(Employee))
+            if write:
+                self.router.db_for_write(Employee)
+            databases.append(self.router.db_for_read(Employee))
+            return HttpResponse()
+        response = ReplicaRoutingMiddleware(view)(request)
+        return databases, response
+
+    def test_safe_request_reads_from_replica(self):
+        databases, response = self.route(self.factory.get('/employees/'))
+        self.assertIn(databases[0], ['replica_1', 'replica_2'])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_unsafe_request_reads_from_primary(self):
+        databases, response = self.route(self.factory.post('/employees/'))
+        self.assertEqual(databases, ['default', 'default'])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_write_pins_request_and_client_to_primary(self):
+        databases, response = self.route(self.factory.get('/employees/'),
+                                         write=True)
+        self.assertEqual(databases[1], 'default')
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 5)
+
+        request = self.factory.get('/employees/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        databases, response = self.route(request)
+        self.assertEqual(databases, ['default', 'default'])
+
+    def test_reads_outside_requests_go_to_primary(self):
+        self.assertEqual(self.router.db_for_read(Employee), 'default')
+        with read_from_replica():
+            self.assertIn(self.router.db_for_read(Employee),
+                          ['replica_1', 'replica_2'])
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_primary_without_replicas(self):
+        with read_from_replica():
+            self.assertEqual(self.router.db_for_read(Employee), 'default')
+
+    def test_migrations_only_on_primary(self):
+        self.assertTrue(self.router.allow_migrate('default', 'employee_app'))
+        self.assertFalse(self.router.allow_migrate('replica_1',
+                                                   'employee_app'))
+
+    async def test_async_request_reads_from_replica(self):
+        async def view(request):
+            return HttpResponse(self.router.db_for_read(Employee))
+        response = await ReplicaRoutingMiddleware(view)(
+            self.factory.get('/async/employees/')
+        )
+        self.assertIn(response.content, [b'replica_1', b'replica_2'])
+
+
+@override_settings(
+    DATABASE_REPLICAS=['replica_1'],
+    DATABASE_ROUTERS=['employee_app.db_routers.ReplicaRouter'],
+)
+class ReplicaPinningTest(TestCase):
+    """Test suite to verify clients see their writes through the API."""
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user('hr', password='pw')
+        )
+
+    def test_write_sets_pin_cookie(self):
+        response = self.client.post('/employees/', {
+            'name': 'Jane Doe', 'employee_id': 'E17006841',
+            'hourly_rate': '21.33', 'is_team_leader': False,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        # The test client sends the cookie back
+        pinned = self.client.get('/employees/')
+        self.assertEqual(len(pinned.data['results']), 1)
+
+    def test_pinned_clients_get_their_own_cached_responses(self):
+        unpinned = self.client.get('/employees/')
+        self.client.cookies[PIN_COOKIE] = '1'
+        pinned = self.client.get('/employees/')
+        self.assertNotEqual(unpinned['ETag'], pinned['ETag'])
+
+
+class RunPayrollCommandTest(TransactionTestCase):
+    """Test suite to verify the chunked, resumable payroll run."""
+    # Transactions of their own, so the worker processes of the
+    # PostgreSQL runs see the data
+    def setUp(self):
+        generate_company(teams=3, employees=25, seed=3)
+
+    def run_payroll(self, *args):
+        out = io.StringIO()
+        call_command('run_payroll', '--month', '2026-10', '--chunk-size',
+                     '10', *args, stdout=out)
+        return out.getvalue()
+
+    def assert_run_matches_employees(self):
+        run = PayrollRun.objects.get(month=datetime.date(2026, 10, 1))
+        self.assertIsNotNone(run.completed_at)
+        expected = {
+            employee.employee_id: employee.calculate_monthly_pay()
+            for employee in Employee.objects.all()
+        }
+        entries = dict(PayrollRunEntry.objects.filter(run=run).values_list(
+            'employee_code', 'monthly_pay'
+        ))
+        self.assertEqual(entries.keys(), expected.keys())
+        for code, pay in expected.items():
+            self.assertAlmostEqual(entries[code], pay, places=6)
+        self.assertEqual(run.employee_count, 25)
+        self.assertEqual(run.total_pay, sum(entries.values()))
+        return run
+
+    def test_run_computes_every_employee_in_chunks(self):
+        output = self.run_payroll('--workers', '1')
+        run = self.assert_run_matches_employees()
+        self.assertEqual(
+            list(run.chunks.order_by('number').values_list(
+                'number', 'employee_count'
+            )),
+            [(1, 10), (2, 10), (3, 5)],
+        )
+        self.assertIn('Chunk 3/3: 5 employees in', output)
+        self.assertIn('Computed 25 employees in', output)
+        self.assertFalse(run.resumed)
+
+    def test_resume_continues_after_last_completed_chunk(self):
+        compute = payroll.compute_payroll_chunk
+
+        def crash_on_second_chunk(chunk_pk, snapshot=None):
+            if PayrollRun.objects.get().chunks.filter(
+                completed_at__isnull=False
+            ).exists():
+                raise RuntimeError('worker crashed')
+            return compute(chunk_pk, snapshot)
+
+        with mock.patch('employee_app.payroll.compute_payroll_chunk',
+                        crash_on_second_chunk):
+            with self.assertRaisesMessage(CommandError, '--resume'):
+                self.run_payroll('--workers', '1')
+        self.assertEqual(PayrollRunEntry.objects.count(), 10)
+
+        with self.assertRaisesMessage(CommandError, 'unfinished'):
+            self.run_payroll()
+        output = self.run_payroll('--workers', '1', '--resume')
+        self.assertNotIn('Chunk 1/3', output)
+        self.assertIn('Computed 15 employees', output)
+        # The chunks completed before read an earlier snapshot
+        self.assertTrue(self.assert_run_matches_employees().resumed)
+
+        with self.assertRaisesMessage(CommandError, 'already run'):
+            self.run_payroll()
+        with self.assertRaisesMessage(CommandError, 'No unfinished'):
+            self.run_payroll('--resume')
+
+    def test_snapshot_needs_a_transaction_of_its_own(self):
+        run = payroll.start_payroll_run(datetime.date(2026, 10, 1), 10)
+        chunk = run.chunks.first()
+        with transaction.atomic():
+            with self.assertRaisesMessage(
+                transaction.TransactionManagementError, 'atomic block'
+            ):
+                payroll.compute_payroll_chunk(chunk.pk, '00000003-1')
+        chunk.refresh_from_db()
+        self.assertIsNone(chunk.completed_at)
+
+    def test_employees_deleted_later_keep_their_entries(self):
+        self.run_payroll('--workers', '1')
+        Employee.objects.all().delete()
+        self.assertEqual(PayrollRunEntry.objects.filter(
+            employee__isnull=True
+        ).count(), 25)
+
+    @skipUnless(connection.vendor == 'postgresql',
+                'Worker processes share exported snapshots on PostgreSQL')
+    def test_workers_compute_chunks_in_parallel(self):
+        self.run_payroll('--workers', '2')
+        self.assert_run_matches_employees()
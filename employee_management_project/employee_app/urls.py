@@ -1,8 +1,9 @@
 from rest_framework.routers import DefaultRouter
 from django.urls import path, include
+from . import async_views
 from .views import (
-    EmployeeViewSet, TeamViewSet, TeamLeaderViewSet,
-    TeamEmployeeViewSet, WorkArrangementViewSet
+    EmployeeViewSet, PayrollViewSet, TeamViewSet, TeamLeaderViewSet,
+    TeamEmployeeViewSet, WorkArrangementViewSet, health, readiness
 )
 
 # Use DRF's router to generate routes automatically
@@ -17,8 +18,27 @@ router.register(r'team-employees',
                 TeamEmployeeViewSet, basename='teamemployee')
 router.register(r'work-arrangements',
                 WorkArrangementViewSet, basename='workarrangement')
+router.register(r'payroll',
+                PayrollViewSet, basename='payroll')
 
 # Include the generated routes in urlpatterns
 urlpatterns = [
     path('', include(router.urls)),
+    # Unauthenticated probes for load balancers and orchestrators
+    path('health/', health, name='health'),
+    path('health/ready/', readiness, name='readiness'),
+    # Native async reads, for ASGI deployments
+    path('async/employees/', async_views.employees.list,
+         name='async-employee-list'),
+    path('async/employees/<int:pk>/', async_views.employees.retrieve,
+         name='async-employee-detail'),
+    path('async/teams/', async_views.teams.list,
+         name='async-team-list'),
+    path('async/teams/<int:pk>/', async_views.teams.retrieve,
+         name='async-team-detail'),
+    path('async/work-arrangements/', async_views.work_arrangements.list,
+         name='async-workarrangement-list'),
+    path('async/work-arrangements/<int:pk>/',
+         async_views.work_arrangements.retrieve,
+         name='async-workarrangement-detail'),
 ]
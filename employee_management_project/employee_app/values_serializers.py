@@ -0,0 +1,82 @@
+from collections import defaultdict
+
+from .models import (
+    Employee, TeamEmployee, WorkArrangement, monthly_pay, weekly_hours
+)
+from .serializers import EmployeeSerializer
+
+# Rendered by DRF's DecimalField: a string with two decimal places
+hourly_rate_field = EmployeeSerializer().fields['hourly_rate']
+
+
+class WorkArrangementValuesSerializer:
+    """Build WorkArrangementSerializer representations from ``values()``
+    rows, without model instances or serializer fields."""
+    model = WorkArrangement
+    columns = ('id', 'employee', 'team', 'percentage')
+
+    def values(self, queryset):
+        return queryset.values(*self.columns)
+
+    def to_representations(self, rows):
+        return [{
+            'id': row['id'],
+            'employee': row['employee'],
+            'team': row['team'],
+            'percentage': row['percentage'],
+            'weekly_hours': weekly_hours(row['percentage']),
+        } for row in rows]
+
+
+class EmployeeValuesSerializer:
+    """Build EmployeeSerializer representations from ``values()`` rows.
+
+    Teams and arrangements of the rows are read with one query each,
+    and monthly pay comes from the snapshot, or from the arrangements
+    when an employee has none, as in EmployeeSerializer.
+    """
+    model = Employee
+    columns = ('id', 'name', 'employee_id', 'hourly_rate', 'is_team_leader',
+               'payroll_snapshot__monthly_pay')
+
+    def values(self, queryset):
+        return queryset.values(*self.columns)
+
+    def to_representations(self, rows):
+        ids = [row['id'] for row in rows]
+        teams = defaultdict(list)
+        for employee_id, team_id, team_name in TeamEmployee.objects.filter(
+            employee__in=ids
+        ).order_by('id').values_list('employee', 'team', 'team__name'):
+            teams[employee_id].append({'id': team_id, 'name': team_name})
+        arrangements = defaultdict(list)
+        arrangement_serializer = WorkArrangementValuesSerializer()
+        for arrangement in arrangement_serializer.to_representations(
+            arrangement_serializer.values(
+                WorkArrangement.objects.filter(employee__in=ids)
+                .order_by('id')
+            )
+        ):
+            arrangements[arrangement['employee']].append(arrangement)
+
+        representations = []
+        for row in rows:
+            employee_arrangements = arrangements[row['id']]
+            pay = row['payroll_snapshot__monthly_pay']
+            if pay is None:
+                pay = monthly_pay(row['hourly_rate'], row['is_team_leader'],
+                                  [arrangement['percentage']
+                                   for arrangement in employee_arrangements])
+            representations.append({
+                'id': row['id'],
+                'name': row['name'],
+                'employee_id': row['employee_id'],
+                'teams': teams[row['id']],
+                'hourly_rate': hourly_rate_field.to_representation(
+                    row['hourly_rate']
+                ),
+                'is_team_leader': row['is_team_leader'],
+                'work_arrangements': employee_arrangements,
+                'monthly_pay': pay,
+            })
+        return representations
@@ -1,37 +1,322 @@
 # Create your views here.
-from rest_framework import viewsets
-from .models import Employee, Team, TeamLeader, TeamEmployee, WorkArrangement
+from django.conf import settings
+from django.db import DatabaseError, connection, router
+from django.db.models import Prefetch
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import etag, require_GET
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+from .bulk import bulk_save_work_arrangements, bulk_upsert_employees
+from .caching import VersionedCacheMixin
+from .exports import EXPORT_FORMATS, iter_export
+from .filters import EmployeeFilter
+from .openapi import load_schema
+from .models import (
+    Employee, PayrollSnapshot, Team, TeamLeader, TeamEmployee, WorkArrangement
+)
 from .serializers import (
-    EmployeeSerializer, TeamSerializer, TeamLeaderSerializer,
-    TeamEmployeeSerializer, WorkArrangementSerializer
+    EmployeeSerializer, PayrollSerializer, TeamCostSerializer, TeamSerializer,
+    TeamLeaderSerializer, TeamEmployeeSerializer, WorkArrangementSerializer,
+    parse_field_list
+)
+from .values_serializers import (
+    EmployeeValuesSerializer, WorkArrangementValuesSerializer
 )
 
 
-class EmployeeViewSet(viewsets.ModelViewSet):
+class BulkCreateMixin:
+    """Accept a list payload on create and save it as one batch.
+
+    Viewsets implement ``perform_bulk_save(items)`` returning the saved
+    instances and the per-item errors of the ones that were rejected.
+    """
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+        if len(request.data) > settings.API_MAX_BULK_SIZE:
+            return Response(
+                {'non_field_errors': [
+                    f'At most {settings.API_MAX_BULK_SIZE} items '
+                    'can be saved in one request.'
+                ]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        instances, errors = self.perform_bulk_save(request.data)
+        results = self.get_serializer(
+            self.get_bulk_results(instances), many=True
+        ).data
+        if not errors:
+            response_status = status.HTTP_201_CREATED
+        elif instances:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({'results': results, 'errors': errors},
+                        status=response_status)
+
+    def get_bulk_results(self, instances):
+        return instances
+
+
+class SparseFieldsMixin:
+    """Serve ``?fields=`` and ``?expand=`` on list and retrieve, and load
+    only the related rows the rendered fields need.
+
+    ``field_querysets`` maps serializer fields to a function adding the
+    select_related, prefetch_related or annotation the field reads to a
+    queryset. Expanded foreign keys are loaded with select_related.
+    """
+    field_querysets = {}
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request is not None and self.action in ('list', 'retrieve'):
+            params = self.request.query_params
+            kwargs.setdefault('fields',
+                              parse_field_list(params.get('fields')))
+            kwargs.setdefault('expand',
+                              parse_field_list(params.get('expand')))
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        return self.plan_queryset(super().get_queryset(),
+                                  self.get_serializer())
+
+    @classmethod
+    def plan_queryset(cls, queryset, serializer):
+        """Load what each field of serializer renders with queryset."""
+        expanded = getattr(serializer, 'expanded', ())
+        for name, field in serializer.fields.items():
+            if name in expanded:
+                queryset = queryset.select_related(field.source)
+            elif name in cls.field_querysets:
+                queryset = cls.field_querysets[name](queryset)
+        return queryset
+
+
+class ValuesFastPathMixin:
+    """Serve list and retrieve from ``values()`` rows when
+    ``API_VALUES_SERIALIZATION`` is on.
+
+    ``values_serializer_class`` builds the same representations as the
+    serializer without model instances, so the JSON is unchanged. Only
+    the full representation is built this way: requests with
+    ``?fields=`` or ``?expand=`` go through the serializer.
+    """
+    values_serializer_class = None
+
+    def use_values(self):
+        params = self.request.query_params
+        return (settings.API_VALUES_SERIALIZATION and
+                'fields' not in params and 'expand' not in params)
+
+    def get_values_queryset(self):
+        # The serializer's prefetch plan is not needed for values()
+        serializer = self.values_serializer_class()
+        return serializer, serializer.values(
+            self.filter_queryset(self.queryset.all())
+        )
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_values():
+            return super().list(request, *args, **kwargs)
+        serializer, queryset = self.get_values_queryset()
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(serializer.to_representations(queryset))
+        return self.get_paginated_response(
+            serializer.to_representations(page)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.use_values():
+            return super().retrieve(request, *args, **kwargs)
+        serializer, queryset = self.get_values_queryset()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(
+            queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        self.check_object_permissions(request, row)
+        return Response(serializer.to_representations([row])[0])
+
+
+class EmployeeViewSet(VersionedCacheMixin, ValuesFastPathMixin,
+                      SparseFieldsMixin, BulkCreateMixin,
+                      viewsets.ModelViewSet):
     """Viewset to handle CRUD operations for employee instances"""
-    queryset = Employee.objects.all()
+    queryset = Employee.objects.order_by('id')
     serializer_class = EmployeeSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = EmployeeFilter
+    # Teams and work arrangements are prefetched, so a page of employees
+    # is served in a fixed number of queries
+    field_querysets = {
+        'monthly_pay': lambda queryset: queryset.with_snapshot_pay(),
+        'work_arrangements': lambda queryset: queryset.prefetch_related(
+            Prefetch('work_arrangements',
+                     queryset=WorkArrangement.objects.order_by('id'))
+        ),
+        'teams': lambda queryset: queryset.prefetch_related(
+            Prefetch('team_membership',
+                     queryset=TeamEmployee.objects.select_related(
+                         'team'
+                     ).order_by('id'))
+        ),
+    }
+    values_serializer_class = EmployeeValuesSerializer
+    cache_models = (Employee, WorkArrangement, TeamEmployee, Team,
+                    PayrollSnapshot)
+
+    def perform_bulk_save(self, items):
+        # Upsert by employee_id
+        return bulk_upsert_employees(items)
+
+    def get_bulk_results(self, instances):
+        # Reload with the prefetch plan, keeping the payload order
+        employees = self.get_queryset().in_bulk(
+            [employee.pk for employee in instances]
+        )
+        return [employees[employee.pk] for employee in instances]
 
+    @action(detail=False, url_path='export')
+    def export(self, request):
+        """Stream every employee with teams, arrangements and pay
+        as NDJSON (default) or CSV (?output=csv)."""
+        export_format = request.query_params.get('output', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'output': f'Choose one of {", ".join(EXPORT_FORMATS)}.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        # The rows are read after the request's database routing ended,
+        # so the database is chosen now
+        response = StreamingHttpResponse(
+            iter_export(export_format,
+                        using=router.db_for_read(Employee)),
+            content_type=EXPORT_FORMATS[export_format],
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="employees.{export_format}"'
+        )
+        return response
 
-class TeamViewSet(viewsets.ModelViewSet):
+
+class TeamViewSet(VersionedCacheMixin, SparseFieldsMixin,
+                  viewsets.ModelViewSet):
     """Viewset to handle CRUD operations for team instances"""
-    queryset = Team.objects.all()
+    queryset = Team.objects.order_by('id')
     serializer_class = TeamSerializer
+    cache_models = (Team,)
+
+    def get_queryset(self):
+        if self.action in ('rollup', 'cost'):
+            return Team.objects.with_cost_rollup().order_by('id')
+        return super().get_queryset()
 
+    def get_serializer_class(self):
+        if self.action in ('rollup', 'cost'):
+            return TeamCostSerializer
+        return super().get_serializer_class()
 
-class TeamLeaderViewSet(viewsets.ModelViewSet):
+    @action(detail=False)
+    def rollup(self, request):
+        """Headcount, FTE, weekly hours and monthly cost of every team,
+        computed in one grouped query"""
+        serializer = self.get_serializer(self.get_queryset(), many=True)
+        return Response(serializer.data)
+
+    @action(detail=True)
+    def cost(self, request, pk=None):
+        """Headcount, FTE, weekly hours and monthly cost of one team"""
+        return Response(self.get_serializer(self.get_object()).data)
+
+
+class TeamLeaderViewSet(VersionedCacheMixin, SparseFieldsMixin,
+                        viewsets.ModelViewSet):
     """Viewset to handle CRUD operations for team leader instances"""
-    queryset = TeamLeader.objects.all()
+    queryset = TeamLeader.objects.order_by('id')
     serializer_class = TeamLeaderSerializer
+    # employee_details nests the full employee representation
+    field_querysets = {
+        'employee_details': lambda queryset: queryset.select_related(
+            'employee__payroll_snapshot'
+        ).prefetch_related(
+            'employee__work_arrangements',
+            Prefetch('employee__team_membership',
+                     queryset=TeamEmployee.objects.select_related('team')),
+        ),
+    }
+    cache_models = (TeamLeader, Employee, WorkArrangement, TeamEmployee,
+                    Team, PayrollSnapshot)
 
 
-class TeamEmployeeViewSet(viewsets.ModelViewSet):
+class TeamEmployeeViewSet(VersionedCacheMixin, SparseFieldsMixin,
+                          viewsets.ModelViewSet):
     """Viewset to handle CRUD operations for team employee instances"""
-    queryset = TeamEmployee.objects.all()
+    queryset = TeamEmployee.objects.order_by('id')
     serializer_class = TeamEmployeeSerializer
+    field_querysets = {
+        'employee_name': lambda queryset: queryset.select_related(
+            'employee'
+        ),
+        'team_name': lambda queryset: queryset.select_related('team'),
+    }
+    cache_models = (TeamEmployee, Employee, Team)
 
 
-class WorkArrangementViewSet(viewsets.ModelViewSet):
+class WorkArrangementViewSet(VersionedCacheMixin, ValuesFastPathMixin,
+                             SparseFieldsMixin, BulkCreateMixin,
+                             viewsets.ModelViewSet):
     """Viewset to handle CRUD operations for work management instances"""
-    queryset = WorkArrangement.objects.all()
+    queryset = WorkArrangement.objects.order_by('id')
     serializer_class = WorkArrangementSerializer
+    values_serializer_class = WorkArrangementValuesSerializer
+    cache_models = (WorkArrangement, Employee, Team)
+
+    def perform_bulk_save(self, items):
+        return bulk_save_work_arrangements(items)
+
+
+class PayrollViewSet(VersionedCacheMixin, SparseFieldsMixin,
+                     viewsets.ReadOnlyModelViewSet):
+    """Viewset to list monthly pay, computed in a single SQL aggregate"""
+    queryset = Employee.objects.order_by('id')
+    serializer_class = PayrollSerializer
+    field_querysets = {
+        'monthly_pay': lambda queryset: queryset.with_monthly_pay(),
+    }
+    cache_models = (Employee, WorkArrangement)
+
+
+@require_GET
+def health(request):
+    """Liveness probe: the process is up and serving, without any I/O"""
+    return JsonResponse({'status': 'ok'})
+
+
+@require_GET
+def readiness(request):
+    """Readiness probe: the database accepts queries"""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except DatabaseError:
+        return JsonResponse({'status': 'unavailable'}, status=503)
+    return JsonResponse({'status': 'ok'})
+
+
+@require_GET
+@etag(lambda request: load_schema()[1])
+def openapi_schema(request):
+    """OpenAPI schema, generated once per code version and served from
+    disk"""
+    response = HttpResponse(load_schema()[0],
+                            content_type='application/json')
+    # Browsers revalidate once max-age is over and get a 304 back unless
+    # a new version was deployed
+    response['Cache-Control'] = (
+        f'public, max-age={settings.OPENAPI_SCHEMA_MAX_AGE}'
+    )
+    return response
@@ -0,0 +1,13 @@
+import django
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def setup_worker(database_name):
+    """ProcessPoolExecutor initializer for spawned worker processes.
+
+    Sets Django up from DJANGO_SETTINGS_MODULE and connects to the
+    database the parent uses, which is the test database under tests.
+    This module imports no models, so it loads before Django is set up.
+    """
+    django.setup()
+    connections[DEFAULT_DB_ALIAS].settings_dict['NAME'] = database_name
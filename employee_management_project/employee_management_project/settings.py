@@ -10,8 +10,13 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import copy
+import os
+from datetime import timedelta
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -20,9 +25,11 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = {
+# It also signs the API's JWT access and refresh tokens.
+SECRET_KEY = os.environ.get(
+    'DJANGO_SECRET_KEY',
     'django-insecure-+mc+pz1-7ah*f_ot)59vla$@uxi3xz5r%2q@w5*mxhrlxm3+@a'
-}
+)
 
 # SECURITY WARNING: don't run with debug
 # turned on in production!
@@ -41,11 +48,16 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',  # Adding rest framework
+    'rest_framework_simplejwt',  # Adding JWT authentication
     'drf_yasg',  # Adding drf_yasg for swagger/openapi documentation
+    'django_filters',  # Adding django-filter for list filters
     'employee_app',  # Adding employee app
 ]
 
 MIDDLEWARE = [
+    # First, so its timings include the rest of the middleware
+    'employee_app.middleware.RequestMetricsMiddleware',
+    'employee_app.db_routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -82,12 +94,128 @@ WSGI_APPLICATION = 'employee_management_project.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'employee_app_db',
-        'USER': 'postgres',
-        'PASSWORD': 'Admin@123',
-        'HOST': 'localhost',  # or the IP address of your PostgreSQL server
-        'PORT': '5432',        # default PostgreSQL port
+        'NAME': os.environ.get('DB_NAME', 'employee_app_db'),
+        'USER': os.environ.get('DB_USER', 'postgres'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', 'Admin@123'),
+        # or the IP address of your PostgreSQL server
+        'HOST': os.environ.get('DB_HOST', 'localhost'),
+        # default PostgreSQL port
+        'PORT': os.environ.get('DB_PORT', '5432'),
+        # Keep each worker's connection open between requests instead of
+        # reconnecting every time, and check it is still usable on reuse
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
+    }
+}
+
+# DB_POOL=true replaces persistent connections with a connection pool per
+# worker process (psycopg_pool, installed with psycopg[pool]). Size it so
+# workers * DB_POOL_MAX_SIZE stays below PostgreSQL's max_connections.
+if os.environ.get('DB_POOL', 'false').lower() == 'true':
+    from psycopg_pool import ConnectionPool
+
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+        'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+        # Seconds a request waits for a free connection before failing
+        'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+        # Connections idle for longer than this are closed
+        'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', '300')),
+        # Ping connections when they are handed out of the pool
+        'check': ConnectionPool.check_connection,
+    }
+
+# Read replicas: DB_REPLICA_HOSTS=host1,host2:5433 adds the aliases
+# replica_1, replica_2, ... with the primary's other settings. Reads of
+# GET requests then go to a random replica, everything else to the
+# primary. Without replicas the router and its middleware aren't used.
+DATABASE_REPLICAS = []
+for number, address in enumerate(
+    filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), 1
+):
+    host, _, port = address.strip().partition(':')
+    alias = f'replica_{number}'
+    DATABASES[alias] = copy.deepcopy(DATABASES['default'])
+    DATABASES[alias].update({
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        # Tests read the replicas' data from the test primary
+        'TEST': {'MIRROR': 'default'},
+    })
+    DATABASE_REPLICAS.append(alias)
+if DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ['employee_app.db_routers.ReplicaRouter']
+# Seconds the replicas may lag behind the primary: clients read from the
+# primary for this long after writing, and responses read from a replica
+# are cached no longer
+DATABASE_REPLICA_MAX_LAG = int(os.environ.get('DB_REPLICA_MAX_LAG', '5'))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+# The response cache and its version counters must be shared by every
+# worker, otherwise writes only invalidate one worker's cache and the
+# others serve stale responses and ETags. Set REDIS_URL in any deployment
+# running more than one process. Without it, startup fails unless DEBUG is
+# on or ALLOW_LOCAL_CACHE=true says there is a single process.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    if not DEBUG and (
+        os.environ.get('ALLOW_LOCAL_CACHE', 'false').lower() != 'true'
+    ):
+        raise ImproperlyConfigured(
+            'Set REDIS_URL to share the API response cache between '
+            'workers, or ALLOW_LOCAL_CACHE=true when running a single '
+            'process'
+        )
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
     }
+
+# Seconds a cached API response is kept
+API_CACHE_TIMEOUT = int(os.environ.get('API_CACHE_TIMEOUT', '300'))
+
+
+# Request metrics: Server-Timing headers with SQL query count and time,
+# and a warning log for requests slower than REQUEST_METRICS_SLOW_MS or
+# with more than REQUEST_METRICS_MAX_QUERIES queries. When disabled the
+# middleware is removed at startup.
+REQUEST_METRICS_ENABLED = (
+    os.environ.get('REQUEST_METRICS_ENABLED', 'false').lower() == 'true'
+)
+REQUEST_METRICS_SLOW_MS = int(os.environ.get('REQUEST_METRICS_SLOW_MS',
+                                             '500'))
+REQUEST_METRICS_MAX_QUERIES = int(
+    os.environ.get('REQUEST_METRICS_MAX_QUERIES', '50')
+)
+# Slowest queries logged with a slow request
+REQUEST_METRICS_LOGGED_QUERIES = int(
+    os.environ.get('REQUEST_METRICS_LOGGED_QUERIES', '5')
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'employee_app': {
+            'handlers': ['console'],
+            'level': os.environ.get('APP_LOG_LEVEL', 'INFO'),
+        },
+    },
 }
 
 
@@ -137,11 +265,78 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Basic authentication runs the PBKDF2 password hasher on every request,
+# so it is only enabled when API_BASIC_AUTH_ENABLED=true
+API_BASIC_AUTH_ENABLED = (
+    os.environ.get('API_BASIC_AUTH_ENABLED', 'false').lower() == 'true'
+)
+
 REST_FRAMEWORK = {
+    # Access tokens are verified from their signature alone,
+    # without a database lookup
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.BasicAuthentication',
+        'rest_framework_simplejwt.authentication.'
+        'JWTStatelessUserAuthentication',
+    ) + (
+        ('rest_framework.authentication.BasicAuthentication',)
+        if API_BASIC_AUTH_ENABLED else ()
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # orjson backed JSON, the same bytes as DRF's renderer and parser
+    'DEFAULT_RENDERER_CLASSES': (
+        'employee_app.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'employee_app.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    'DEFAULT_PAGINATION_CLASS': 'employee_app.pagination.IdCursorPagination',
+    'PAGE_SIZE': 50,
+}
+
+# Upper bound for the page_size query parameter on list endpoints
+API_MAX_PAGE_SIZE = 500
+
+# Build full employee and work arrangement representations from
+# values() rows instead of model instances and serializer fields. The
+# JSON is the same either way.
+API_VALUES_SERIALIZATION = (
+    os.environ.get('API_VALUES_SERIALIZATION', 'false').lower() == 'true'
+)
+
+# Upper bound for the number of items in one bulk create request
+API_MAX_BULK_SIZE = 1000
+
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    'AUTH_HEADER_TYPES': ('Bearer',),
+}
+
+# Identifies the deployed code, e.g. the git commit. When unset, a hash of
+# the Python sources is used instead.
+APP_VERSION = os.environ.get('APP_VERSION')
+
+# The OpenAPI schema is generated once per code version into this directory
+OPENAPI_SCHEMA_DIR = os.environ.get('OPENAPI_SCHEMA_DIR',
+                                    BASE_DIR / 'openapi')
+
+# Seconds browsers may use the schema before revalidating it
+OPENAPI_SCHEMA_MAX_AGE = 3600
+
+SWAGGER_SETTINGS = {
+    # Swagger UI loads the pre-generated schema instead of having the UI
+    # view introspect every viewset on each request
+    'SPEC_URL': 'openapi-schema',
+    'SECURITY_DEFINITIONS': {
+        'Bearer': {
+            'type': 'apiKey',
+            'name': 'Authorization',
+            'in': 'header',
+        },
+    },
 }
@@ -19,39 +19,46 @@ from django.urls import path, include
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from rest_framework.permissions import AllowAny
+from rest_framework_simplejwt.views import (
+    TokenObtainPairView, TokenRefreshView, TokenVerifyView
+)
+from employee_app.openapi import API_INFO
+from employee_app.views import openapi_schema
 
-# Define Basic Auth Parameter
-basic_auth = openapi.Parameter(
+# Define JWT Auth Parameter
+jwt_auth = openapi.Parameter(
     'Authorization',  # Parameter name
     openapi.IN_HEADER,  # In the header
-    description="Basic Authentication. Example:"
-                "'Basic <base64-encoded-credentials>'",
+    description="JWT Authentication, get a token from /api/token/. "
+                "Example: 'Bearer <access-token>'",
     type=openapi.TYPE_STRING,
     required=False,  # Not required for the documentation to display
 )
 
-# Set up Schema View
+# Set up Schema View, it only renders the Swagger UI page. The schema
+# itself is served pre-generated by openapi_schema.
 schema_view = get_schema_view(
-    openapi.Info(
-        title="Employee Management Api",
-        default_version='v1',
-        description="API for employee management",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="contact@hiew.local"),
-        license=openapi.License(name="BSD License"),
-    ),
+    API_INFO,
     public=True,
     permission_classes=(AllowAny,),
 )
 
-# Add Basic Auth Parameter to Schema
+# Add JWT Auth Parameter to Schema
 schema_view._swagger_schema = lambda: {
-    'parameters': [basic_auth],
+    'parameters': [jwt_auth],
 }
 
 urlpatterns = [
     path('', include('employee_app.urls')),
     path('admin/', admin.site.urls),
+    # Exchange username/password for an access and refresh token pair
+    path('api/token/', TokenObtainPairView.as_view(),
+         name='token_obtain_pair'),
+    path('api/token/refresh/', TokenRefreshView.as_view(),
+         name='token_refresh'),
+    path('api/token/verify/', TokenVerifyView.as_view(),
+         name='token_verify'),
+    path('swagger.json', openapi_schema, name='openapi-schema'),
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0),
          name='schema-swagger-ui'),
 ]